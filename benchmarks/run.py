@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+插件基准测试：在本地站点替身（standin.py）上运行插件主流程，统计吞吐量、请求延迟分位数与内存峰值。
+
+测试过程不访问任何外部站点：
+- 插件数据与站点统计写入临时 CONFIG_DIR 中的独立数据库，结束后删除；
+- SitesHelper 返回生成的测试站点，所有 requests 请求（包括站点处理器中写死的域名与 OCR 服务）
+  都改写到本地替身，保留原路径；
+- 不配置大模型，不启用仿真浏览器与消息通知。
+
+场景：
+- signin：AutoSignInNew 签到（通用 attendance.php、HDSky 验证码签到、52PT / CHDBits 签到问答）
+- login：AutoSignInNew 模拟登录
+- opencheck：SiteOpenCheck 检查全部站点开注状态
+- redpacket：TangPingHelper 领红包
+- lottery：TangPingHelper 抽奖
+- summary：TangPingHelper 抽奖权益汇总行解析（纯 CPU，使用 tests/fixtures 中保存的抽奖响应，条目为解析的行数）
+- tasks：TangPingHelper 任务页面解析（纯 CPU，使用 tests/fixtures 中保存的 task.php 页面，条目为解析的页面数）
+
+需要完整的 MoviePilot 运行环境：在 MoviePilot 源码目录下安装依赖，并将 plugins.v2 中的插件目录
+链接或复制到 app/plugins，然后运行：
+    python benchmarks/run.py --moviepilot /path/to/MoviePilot --sites 50 --iterations 3
+    python benchmarks/run.py --moviepilot /path/to/MoviePilot --scenario signin --latency 200 --error-rate 0.05
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Optional
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import TrackerStandin, StandinConfig  # noqa: E402
+
+SCENARIOS = ("signin", "login", "opencheck", "redpacket", "lottery", "summary", "tasks")
+# 带专用处理器的站点，覆盖验证码与签到问答流程
+HANDLER_DOMAINS = ("hdsky.me", "52pt.site", "ptchdbits.co")
+TANGPT_DOMAIN = "www.tangpt.top"
+# 保存的站点页面
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "fixtures")
+BENCH_UA = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+class Recorder:
+    """
+    记录当前场景的请求延迟与状态码，由改写后的 requests 在各线程中调用
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+
+    def reset(self):
+        with self._lock:
+            self.latencies = []
+            self.statuses = {}
+
+    def request(self, latency: float, status: Optional[int]):
+        key = str(status) if status is not None else "error"
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法分位数"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def peak_rss_mb() -> float:
+    """进程内存峰值（MB），Linux 下 ru_maxrss 单位为 KB，macOS 下为字节"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def install_router(standin: TrackerStandin, recorder: Recorder):
+    """将所有 requests 请求改写到本地替身，并记录客户端观测到的延迟"""
+    import requests
+
+    target = urlparse(standin.base_url)
+    original = requests.Session.request
+
+    def request(session, method, url, *args, **kwargs):
+        parsed = urlparse(url)
+        if parsed.netloc != target.netloc:
+            url = parsed._replace(scheme=target.scheme, netloc=target.netloc).geturl()
+        kwargs.pop("proxies", None)
+        start = time.perf_counter()
+        try:
+            res = original(session, method, url, *args, **kwargs)
+        except Exception:
+            recorder.request(time.perf_counter() - start, None)
+            raise
+        recorder.request(time.perf_counter() - start, res.status_code)
+        return res
+
+    requests.Session.request = request
+
+
+def build_sites(count: int, handlers: bool) -> List[Dict[str, Any]]:
+    """生成测试站点"""
+    domains = [f"bench{i:03d}.nexus.local" for i in range(count)]
+    if handlers:
+        domains += list(HANDLER_DOMAINS)
+    return [{
+        "id": 90000 + i,
+        "name": domain.split(".")[0],
+        "domain": domain,
+        "url": f"https://{domain}/",
+        "cookie": "c_secure_uid=1; c_secure_pass=bench",
+        "ua": BENCH_UA,
+        "public": False,
+        "proxy": False,
+        "render": False,
+        "timeout": 30,
+    } for i, domain in enumerate(domains)]
+
+
+def install_sites(sites: List[Dict[str, Any]]):
+    """让 SitesHelper 只返回测试站点"""
+    from app.helper.sites import SitesHelper
+
+    tangpt = {
+        "id": 99999,
+        "name": "躺平PT",
+        "domain": TANGPT_DOMAIN,
+        "url": f"https://{TANGPT_DOMAIN}/",
+        "cookie": "c_secure_uid=1; c_secure_pass=bench",
+        "ua": BENCH_UA,
+        "public": False,
+        "proxy": False,
+    }
+    SitesHelper.get_indexers = lambda self, *args, **kwargs: [dict(s) for s in sites + [tangpt]]
+    SitesHelper.get_indexsites = lambda self, *args, **kwargs: {s["domain"]: dict(s) for s in sites}
+    SitesHelper.get_indexer = lambda self, url, *args, **kwargs: next(
+        (dict(s) for s in sites + [tangpt] if s["domain"] in url), None)
+    return tangpt
+
+
+def scenario_runners(args, sites: List[Dict[str, Any]], tangpt: Dict[str, Any],
+                     standin: TrackerStandin) -> Dict[str, Callable[[], int]]:
+    """构建各场景的单次运行函数，返回值为本次处理的条目数（站点数 / 红包数 / 抽奖次数）"""
+    from app.plugins.autosigninnew import AutoSignInNew
+    from app.plugins.siteopencheck import SiteOpenCheck
+    from app.plugins.tangpinghelper import TangPingHelper
+
+    runners = {}
+
+    signin = AutoSignInNew()
+    signin.init_plugin({"enabled": True, "notify": False, "queue_cnt": args.concurrency})
+
+    def run_signin(type_str: str):
+        def run() -> int:
+            # 忽略今日已签到记录，每次都完整执行
+            signin._clean = True
+            signin._AutoSignInNew__do(datetime.now(), type_str, [])
+            return len(sites)
+
+        return run
+
+    runners["signin"] = run_signin("签到")
+    runners["login"] = run_signin("登录")
+
+    opencheck = SiteOpenCheck()
+    opencheck.init_plugin({"enabled": True, "notify": False, "timeout": 15, "check_interval": 0})
+
+    def run_opencheck() -> int:
+        opencheck._SiteOpenCheck__check_all_sites(force=True)
+        return len(sites)
+
+    runners["opencheck"] = run_opencheck
+
+    tangping = TangPingHelper()
+    tangping.init_plugin({"enabled": False, "notify": False})
+    if args.no_pacing:
+        # 去掉客户端限速，只测处理能力
+        tangping.REDPACKET_RATE = 1000.0
+        tangping.REDPACKET_BURST = 1000
+        tangping.LOTTERY_DELAY = 0
+        tangping.LOTTERY_MIN_DELAY = 0
+
+    def run_tangping(func: Callable[[Dict], Dict], key: str):
+        def run() -> int:
+            # 每次从新的一天开始：重置替身的红包 / 抽奖次数，清除插件当日统计
+            standin.reset()
+            for prefix in tangping.DAILY_DATA_PREFIXES:
+                tangping.del_data(tangping._today_key(prefix))
+            site_info = dict(tangpt, session=tangping._open_session())
+            try:
+                stats = func(site_info) or {}
+            finally:
+                site_info["session"].close()
+            return stats.get(key, 0)
+
+        return run
+
+    runners["redpacket"] = run_tangping(tangping._run_redpacket, "claimed_count")
+    runners["lottery"] = run_tangping(tangping._run_lottery, "total_draws")
+
+    # 抽奖响应中的权益汇总行：使用 tests/fixtures 中保存的抽奖响应，每个响应的汇总行解析一次
+    with open(os.path.join(FIXTURES_DIR, "tangpinghelper", "lottery_draw.json"), encoding="utf-8") as f:
+        recorded = [p.get("summary_lines") or p.get("summary_text") for p in json.load(f) if p.get("ok")]
+    recorded = [lines.split("\n") if isinstance(lines, str) else lines for lines in recorded if lines]
+    summary_batches = []
+    summary_total = 0
+    while summary_total < args.summary_lines:
+        lines = recorded[len(summary_batches) % len(recorded)]
+        summary_batches.append(lines)
+        summary_total += len(lines)
+
+    def run_summary() -> int:
+        # 每次从空缓存开始，包含首次解析与缓存命中
+        tangping._summary_line_cache.clear()
+        for lines in summary_batches:
+            tangping._parse_summary_lines(lines)
+        return summary_total
+
+    runners["summary"] = run_summary
+
+    task_dir = os.path.join(FIXTURES_DIR, "tangpinghelper")
+    task_pages = []
+    for name in sorted(os.listdir(task_dir)):
+        if name.startswith("task_") and name.endswith(".html"):
+            with open(os.path.join(task_dir, name), encoding="utf-8") as f:
+                task_pages.append(f.read())
+
+    task_rounds = max(args.task_pages // max(len(task_pages), 1), 1)
+
+    def run_tasks() -> int:
+        for _ in range(task_rounds):
+            for html in task_pages:
+                tangping._parse_tasks(html)
+        return task_rounds * len(task_pages)
+
+    runners["tasks"] = run_tasks
+    return runners
+
+
+def run_scenario(name: str, runner: Callable[[], int], recorder: Recorder, iterations: int) -> Dict[str, Any]:
+    """运行场景并汇总结果"""
+    recorder.reset()
+    durations, items = [], 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        items += runner() or 0
+        durations.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    latencies = recorder.latencies
+    return {
+        "scenario": name,
+        "iterations": iterations,
+        "elapsed": elapsed,
+        "items": items,
+        "items_per_sec": items / elapsed if elapsed else 0.0,
+        "requests": len(latencies),
+        "requests_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "iteration_p50_s": percentile(durations, 50),
+        "statuses": dict(recorder.statuses),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(results: List[Dict[str, Any]]):
+    header = (f"{'场景':<10}{'条目/s':>10}{'请求/s':>10}{'请求数':>8}"
+              f"{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'单次(s)':>10}{'RSS(MB)':>10}  状态码")
+    print(header)
+    for r in results:
+        statuses = " ".join(f"{k}:{v}" for k, v in sorted(r["statuses"].items()))
+        print(f"{r['scenario']:<10}{r['items_per_sec']:>10.2f}{r['requests_per_sec']:>10.2f}{r['requests']:>8}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+              f"{r['iteration_p50_s']:>10.2f}{r['peak_rss_mb']:>10.1f}  {statuses}")
+    print("RSS 为进程启动以来的内存峰值，按场景运行顺序累计")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="插件基准测试（本地站点替身）")
+    parser.add_argument("--moviepilot", default=os.environ.get("MOVIEPILOT_ROOT", "."),
+                        help="MoviePilot 源码目录，插件需已放入 app/plugins")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--sites", type=int, default=20, help="通用 NexusPHP 测试站点数")
+    parser.add_argument("--no-handlers", action="store_true", help="不包含 HDSky / 52PT / CHDBits 专用处理器站点")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=5, help="签到并发数（queue_cnt）")
+    parser.add_argument("--latency", type=float, default=50, help="替身平均响应延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0.5, help="替身延迟抖动比例")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="替身返回 HTTP 502 的概率")
+    parser.add_argument("--page-size", type=int, default=32, help="替身 HTML 页面大小（KB）")
+    parser.add_argument("--redpackets", type=int, default=20, help="每日可领红包数")
+    parser.add_argument("--lottery-draws", type=int, default=200, help="每日可抽奖次数")
+    parser.add_argument("--no-pacing", action="store_true", help="关闭躺平PT红包 / 抽奖的客户端限速")
+    parser.add_argument("--summary-lines", type=int, default=100000, help="权益汇总行解析场景每次解析的行数")
+    parser.add_argument("--task-pages", type=int, default=300, help="任务页面解析场景每次解析的页面数")
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    args = parser.parse_args()
+
+    # 必须在导入 app 之前设置，数据库与配置写入临时目录
+    config_dir = tempfile.mkdtemp(prefix="mp-bench-")
+    os.environ["CONFIG_DIR"] = config_dir
+    os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+    sys.path.insert(0, os.path.abspath(args.moviepilot))
+
+    standin = TrackerStandin(StandinConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                           page_size=args.page_size, redpackets=args.redpackets,
+                                           lottery_draws=args.lottery_draws)).start()
+    recorder = Recorder()
+    try:
+        from app.db.init import init_db
+        init_db()
+        install_router(standin, recorder)
+        sites = build_sites(args.sites, handlers=not args.no_handlers)
+        tangpt = install_sites(sites)
+        runners = scenario_runners(args, sites, tangpt, standin)
+
+        names = SCENARIOS if args.scenario == "all" else (args.scenario,)
+        results = []
+        for name in names:
+            print(f"运行场景 {name} ...")
+            results.append(run_scenario(name, runners[name], recorder, args.iterations))
+        print_report(results)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+    finally:
+        standin.stop()
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+本地站点替身：模拟 NexusPHP 站点与躺平PT接口，供基准测试使用，不访问任何真实站点。
+
+支持的路径（与请求的域名无关，所有站点共用同一个替身）：
+- /、/index.php、/attendance.php：已登录首页 / 签到页
+- /bakatest.php：GET 返回签到问题，POST 返回签到结果（52PT、CHDBits 等）
+- /image_code_ajax.php、/image.php、/showup.php：验证码签到（HDSky）
+- /signup.php：注册页，按 open_ratio 随机返回开放 / 关闭
+- /captcha/base64：MoviePilot 远程 OCR 接口
+- /api/redpacket/latest、/api/redpacket/claim：躺平PT红包
+- /omnibot_lottery.php、/web/omnibot/lottery/draw：躺平PT抽奖
+
+可单独启动用于手工调试：
+    python benchmarks/standin.py --port 8800 --latency 50 --error-rate 0.01
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+# 1x1 PNG，作为验证码图片
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000100ffff03000006000557bfabd40000000049454e44ae426082"
+)
+
+
+
+def _load_draw_summaries() -> Dict[int, list]:
+    """读取 tests/fixtures 中保存的抽奖响应，返回 {抽奖数: 权益汇总行}"""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "tests", "fixtures", "tangpinghelper", "lottery_draw.json")
+    summaries = {}
+    with open(path, encoding="utf-8") as f:
+        for payload in json.load(f):
+            lines = payload.get("summary_lines") or payload.get("summary_text")
+            if payload.get("ok") and lines:
+                summaries.setdefault(payload["draw_count"], lines)
+    return summaries
+
+
+# 抽奖响应的权益汇总行使用保存的响应，没有相同抽奖数的响应时使用抽奖数最接近的一份
+_DRAW_SUMMARIES = _load_draw_summaries()
+
+
+class StandinConfig:
+    """
+    替身行为配置
+    :param latency: 平均响应延迟（毫秒）
+    :param jitter: 延迟抖动比例，实际延迟在 latency × (1 ± jitter) 之间均匀分布
+    :param error_rate: 返回 HTTP 502 的概率
+    :param page_size: HTML 页面大小（KB），不足时以注释填充
+    :param open_ratio: 注册页开放注册的概率
+    :param redpackets: 每日可领红包数
+    :param lottery_draws: 每日可抽奖次数
+    """
+
+    def __init__(self, latency: float = 50, jitter: float = 0.5, error_rate: float = 0.0, page_size: int = 32,
+                 open_ratio: float = 0.1, redpackets: int = 20, lottery_draws: int = 200):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self.open_ratio = open_ratio
+        self.redpackets = redpackets
+        self.lottery_draws = lottery_draws
+
+
+class TrackerStandin:
+    """
+    本地站点替身服务，在后台线程中运行
+    """
+
+    def __init__(self, config: StandinConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StandinConfig()
+        self._lock = threading.Lock()
+        # 每个路径的请求数
+        self.hits: Dict[str, int] = {}
+        self._state: Dict[str, Any] = {}
+        self.reset()
+        self._server = ThreadingHTTPServer((host, port), self.__handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "TrackerStandin":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="TrackerStandin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        """重置每日状态（红包、抽奖次数）与请求计数"""
+        with self._lock:
+            self.hits.clear()
+            self._state = {
+                "packet_seq": 0,
+                "packets_left": self.config.redpackets,
+                "draws_left": self.config.lottery_draws,
+                "bonus": 100000.0,
+            }
+
+    def __handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.__dispatch("GET")
+
+            def do_POST(self):
+                self.__dispatch("POST")
+
+            def __dispatch(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                path = urlparse(self.path).path
+                status, content_type, payload = standin.handle(method, path, body)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def __sleep(self):
+        config = self.config
+        if config.latency > 0:
+            delay = config.latency * random.uniform(1 - config.jitter, 1 + config.jitter)
+            time.sleep(max(delay, 0) / 1000)
+
+    def __page(self, body: str) -> bytes:
+        """包装为已登录的 NexusPHP 页面并填充到指定大小"""
+        html = ('<html><head><title>NexusPHP</title></head><body>'
+                '<a href="userdetails.php?id=1">bench</a> <a href="logout.php">退出</a>'
+                f'{body}')
+        padding = self.config.page_size * 1024 - len(html.encode("utf-8")) - 20
+        if padding > 0:
+            html += "<!--" + "x" * padding + "-->"
+        return (html + "</body></html>").encode("utf-8")
+
+    def handle(self, method: str, path: str, body: bytes) -> Tuple[int, str, bytes]:
+        """按路径生成响应：(状态码, Content-Type, 内容)"""
+        with self._lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+        self.__sleep()
+        if random.random() < self.config.error_rate:
+            return 502, "text/html; charset=utf-8", b"<html><body>502 Bad Gateway</body></html>"
+
+        form = {k: v[-1] for k, v in parse_qs(body.decode("utf-8", "ignore")).items()}
+        handler = self._routes.get(path)
+        if handler:
+            return handler(self, method, form, body)
+        return 200, "text/html; charset=utf-8", self.__page("<p>首页</p>")
+
+    @staticmethod
+    def __json(data: Any, status: int = 200) -> Tuple[int, str, bytes]:
+        return status, "application/json", json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    # ==================== NexusPHP ====================
+
+    def _attendance(self, method: str, form: dict, body: bytes):
+        return 200, "text/html; charset=utf-8", self.__page("<p>签到成功，获得 10 魔力值</p>")
+
+    def _bakatest(self, method: str, form: dict, body: bytes):
+        if method == "POST":
+            return 200, "text/html; charset=utf-8", self.__page("<p>回答正确，获得 10点魔力值</p>")
+        question = ('<form method="post"><table><tr><td class="text">请问：以下哪部是电影？</td></tr>'
+                    '<input type="hidden" name="questionid" value="450"/>'
+                    + "".join(f'<input type="checkbox" name="choice[]" value="{i}"/>选项{i}' for i in range(1, 5))
+                    + '</table></form>')
+        return 200, "text/html; charset=utf-8", self.__page(question)
+
+    def _image_code_ajax(self, method: str, form: dict, body: bytes):
+        return self.__json({"success": True, "code": "%032x" % random.getrandbits(128)})
+
+    def _image(self, method: str, form: dict, body: bytes):
+        return 200, "image/png", _PNG
+
+    def _showup(self, method: str, form: dict, body: bytes):
+        if len(form.get("imagestring", "")) == 6:
+            return self.__json({"success": True, "message": 10})
+        return self.__json({"success": False, "message": "invalid_imagehash"})
+
+    def _signup(self, method: str, form: dict, body: bytes):
+        if random.random() < self.config.open_ratio:
+            signup = '<form method="post" action="takesignup.php"><input type="submit" value="注册"/></form>'
+        else:
+            signup = "<p>自由注册当前关闭</p>"
+        return 200, "text/html; charset=utf-8", self.__page(signup)
+
+    def _ocr(self, method: str, form: dict, body: bytes):
+        return self.__json({"result": "%06x" % random.getrandbits(24)})
+
+    # ==================== 躺平PT ====================
+
+    def _redpacket_latest(self, method: str, form: dict, body: bytes):
+        with self._lock:
+            count = min(self._state["packets_left"], 5)
+            start = self._state["packet_seq"]
+            self._state["packet_seq"] += count
+        if not count:
+            return self.__json({"ok": False, "items": []})
+        return self.__json({"ok": True, "items": [{"id": start + i + 1} for i in range(count)]})
+
+    def _redpacket_claim(self, method: str, form: dict, body: bytes):
+        with self._lock:
+            if self._state["packets_left"] <= 0:
+                return self.__json({"ok": False, "message": f"每天最多领 {self.config.redpackets} 个"}, 422)
+            self._state["packets_left"] -= 1
+            remain = self._state["packets_left"]
+        return self.__json({"ok": True, "magic_amount": random.randint(1, 50), "remain_count": remain})
+
+    def _lottery_page(self, method: str, form: dict, body: bytes):
+        with self._lock:
+            remaining = self._state["draws_left"]
+        script = f'<script>window.__STATE__={{"dailyDrawRemaining":{remaining}}}</script>'
+        return 200, "text/html; charset=utf-8", self.__page(script)
+
+    def _lottery_draw(self, method: str, form: dict, body: bytes):
+        count = int(form.get("count") or 1)
+        with self._lock:
+            if self._state["draws_left"] <= 0:
+                return self.__json({"ok": False, "message": "今日抽奖次数已用完",
+                                    "user_bonus_after": self._state["bonus"]})
+            count = min(count, self._state["draws_left"])
+            self._state["draws_left"] -= count
+            cost = count * 100
+            awarded = sum(random.choice((0, 0, 50, 100, 500)) for _ in range(count))
+            self._state["bonus"] += awarded - cost
+            bonus = self._state["bonus"]
+        lines = _DRAW_SUMMARIES[min(_DRAW_SUMMARIES, key=lambda n: abs(n - count))]
+        return self.__json({
+            "ok": True,
+            "draw_count": count,
+            "total_cost": cost,
+            "total_awarded_bonus": awarded,
+            "total_compensated_bonus": 0,
+            "user_bonus_after": bonus,
+            "summary_lines" if isinstance(lines, list) else "summary_text": lines,
+        })
+
+    _routes = {
+        "/attendance.php": _attendance,
+        "/bakatest.php": _bakatest,
+        "/image_code_ajax.php": _image_code_ajax,
+        "/image.php": _image,
+        "/showup.php": _showup,
+        "/signup.php": _signup,
+        "/captcha/base64": _ocr,
+        "/api/redpacket/latest": _redpacket_latest,
+        "/api/redpacket/claim": _redpacket_claim,
+        "/omnibot_lottery.php": _lottery_page,
+        "/web/omnibot/lottery/draw": _lottery_draw,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地站点替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=50, help="平均响应延迟（毫秒）")
+    parser.add_argument("--jitter", type=float, default=0.5, help="延迟抖动比例")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 HTTP 502 的概率")
+    parser.add_argument("--page-size", type=int, default=32, help="HTML 页面大小（KB）")
+    args = parser.parse_args()
+
+    standin = TrackerStandin(StandinConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                           page_size=args.page_size),
+                             host=args.host, port=args.port).start()
+    print(f"站点替身已启动：{standin.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
+import contextlib
+import copy
+import functools
 import re
+import threading
+import time
 import traceback
+import uuid
 from datetime import datetime, timedelta
 from multiprocessing.dummy import Pool as ThreadPool
 from multiprocessing.pool import ThreadPool
@@ -14,7 +20,6 @@ from app.db.site_oper import SiteOper
 from app.helper.browser import PlaywrightHelper
 from app.helper.cloudflare import under_challenge
 from app.helper.module import ModuleHelper
-from app.helper.sites import SitesHelper
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas.types import EventType, NotificationType
@@ -24,8 +29,14 @@ from app.utils.string import StringUtils
 from app.utils.timer import TimerUtils
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from fastapi.responses import PlainTextResponse
 from ruamel.yaml import CommentedMap
+from app.plugins.autosigninnew.fixtures import HttpFixture
+from app.plugins.autosigninnew.metrics import metrics
 from app.plugins.autosigninnew.openai import OpenAi
+from app.plugins.autosigninnew.result import SiteResult, SiteState
+from app.plugins.autosigninnew.sitecache import site_cache
+from app.plugins.autosigninnew.tracing import PHASES, PHASE_NAMES, site_trace, span
 
 
 class AutoSignInNew(_PluginBase):
@@ -36,7 +47,7 @@ class AutoSignInNew(_PluginBase):
     # 插件图标
     plugin_icon = "signin.png"
     # 插件版本
-    plugin_version = "3.5"
+    plugin_version = "3.27"
     # 插件作者
     plugin_author = "liheji"
     # 作者主页
@@ -73,6 +84,30 @@ class AutoSignInNew(_PluginBase):
     _openai_url: str = ''
     _openai_key: str = ''
     _openai_model: str = ''
+    # 请求录制|回放：空-关闭，record-录制，replay-回放
+    _fixture_mode: str = ''
+    # 执行中的签到|登录 {执行ID: 进度与耗时记录}，签到、登录与手动执行可能同时进行，各自独立记录
+    _runs: Dict[str, dict] = {}
+    # 执行结束时通知，退出插件时等待进行中的执行结束后再关闭大模型客户端
+    _runs_lock = threading.Condition()
+    STOP_WAIT_TIMEOUT = 30
+    # 签到详情批量保存：每完成若干个站点或间隔若干秒保存一次，结束时保存剩余部分
+    DETAIL_SAVE_BATCH = 20
+    DETAIL_SAVE_INTERVAL = 30
+    _details_lock = threading.Lock()
+
+    # 每天保留的执行耗时记录次数
+    TRACE_KEEP_RUNS = 5
+    # 耗时瀑布图各阶段颜色
+    _phase_colors = {
+        "wait": "#B0BEC5",
+        "fetch": "#81D4FA",
+        "decode": "#B39DDB",
+        "parse": "#A5D6A7",
+        "ocr": "#FFE082",
+        "llm": "#F8BBD0",
+        "submit": "#80CBC4",
+    }
 
     def init_plugin(self, config: dict = None):
 
@@ -96,6 +131,7 @@ class AutoSignInNew(_PluginBase):
             self._openai_url = config.get("openai_url") or ''
             self._openai_key = config.get("openai_key") or ''
             self._openai_model = config.get("openai_model") or ''
+            self._fixture_mode = config.get("fixture_mode") or ''
             try:
                 self.safe_eval(self._notify_filters or 'True', {
                     'type_str': '',
@@ -107,13 +143,16 @@ class AutoSignInNew(_PluginBase):
                 self._notify_filters = ''
                 logger.error(f"表达式：{self._notify_filters}， 错误信息：{str(e)}")
 
-            # 过滤掉已删除的站点
-            all_sites = [site.id for site in SiteOper().list_order_by_pri()] + [site.get("id") for site in
-                                                                                self.__custom_sites()]
-            self._sign_sites = [site_id for site_id in all_sites if site_id in self._sign_sites]
-            self._login_sites = [site_id for site_id in all_sites if site_id in self._login_sites]
-            # 保存配置
-            self.__update_config()
+            # 过滤掉已删除的站点，站点列表为空时可能是读取失败，保留原有选择
+            indexer_sites = SiteOper().list_order_by_pri()
+            if indexer_sites:
+                all_sites = [site.id for site in indexer_sites] + [site.get("id") for site in self.__custom_sites()]
+                self._sign_sites = [site_id for site_id in all_sites if site_id in self._sign_sites]
+                self._login_sites = [site_id for site_id in all_sites if site_id in self._login_sites]
+                # 保存配置
+                self.__update_config()
+            else:
+                logger.warn("未读取到任何站点，跳过清理已删除的站点")
 
         if self._openai_url and self._openai_key:
             self._openai = OpenAi(
@@ -189,6 +228,7 @@ class AutoSignInNew(_PluginBase):
                 "openai_url": self._openai_url,
                 "openai_key": self._openai_key,
                 "openai_model": self._openai_model,
+                "fixture_mode": self._fixture_mode,
             }
         )
 
@@ -224,8 +264,23 @@ class AutoSignInNew(_PluginBase):
             "methods": ["GET"],
             "summary": "站点签到",
             "description": "使用站点域名签到站点",
+        }, {
+            "path": "/metrics",
+            "endpoint": self.metrics_api,
+            "methods": ["GET"],
+            "auth": "apikey",
+            "summary": "运行指标",
+            "description": "Prometheus 文本格式的签到结果、耗时、重试、验证码与大模型调用统计，使用 apikey 参数认证",
         }]
 
+    @staticmethod
+    def metrics_api(apikey: str = None) -> PlainTextResponse:
+        """API: Prometheus 文本格式的运行指标"""
+        # 接口内再校验 apikey，不依赖主程序版本是否支持路由认证
+        if not apikey or apikey != settings.API_TOKEN:
+            return PlainTextResponse("API密钥错误\n", status_code=401)
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
     def get_service(self) -> List[Dict[str, Any]]:
         """
         注册插件公共服务
@@ -484,6 +539,10 @@ class AutoSignInNew(_PluginBase):
                         'content': [
                             {
                                 'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 8
+                                },
                                 'content': [
                                     {
                                         'component': 'VTextField',
@@ -494,6 +553,27 @@ class AutoSignInNew(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'fixture_mode',
+                                            'label': '请求录制|回放',
+                                            'items': [
+                                                {'title': '关闭', 'value': ''},
+                                                {'title': '录制', 'value': 'record'},
+                                                {'title': '回放', 'value': 'replay'},
+                                            ]
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -664,6 +744,29 @@ class AutoSignInNew(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VAlert',
+                                        'props': {
+                                            'type': 'info',
+                                            'variant': 'tonal',
+                                            'text': '请求录制|回放：录制时正常签到|登录，并把各站点的请求与响应保存到插件数据目录 fixtures 下（包含站点页面内容，请勿外传）；'
+                                                    '回放时不访问站点，使用录制的响应执行签到|登录，只输出日志，不记录签到结果、不发送通知，用于排查站点适配问题。'
+                                                    '仿真浏览器与大模型请求不在录制范围内。'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -703,6 +806,7 @@ class AutoSignInNew(_PluginBase):
             "openai_url": '',
             "openai_key": '',
             "openai_model": '',
+            "fixture_mode": '',
         }
 
     def __custom_sites(self) -> List[Any]:
@@ -728,10 +832,8 @@ class AutoSignInNew(_PluginBase):
         sites_info = {}  # 记录站点信息
 
         # 获取站点信息
-        site_indexers = SitesHelper().get_indexers()
-        for site in site_indexers:
-            if not site.get("public"):
-                sites_info[site.get("id")] = site.get("name")
+        for site in site_cache.snapshot().private_sites:
+            sites_info[site.get("id")] = site.get("name")
 
         # 自定义站点
         custom_sites = self.__custom_sites()
@@ -833,9 +935,12 @@ class AutoSignInNew(_PluginBase):
 
                     sign_dates.add(day_str)
 
+        # 执行中的进度，已完成站点的结果分批保存，刷新页面即可看到
+        progress = self.__progress_card()
+
         # 如果没有数据，显示提示信息
         if not all_data["signin"] and not all_data["login"]:
-            return [{
+            return [*progress, {
                 'component': 'VAlert',
                 'props': {
                     'type': 'info',
@@ -1077,6 +1182,7 @@ class AutoSignInNew(_PluginBase):
                 }
                 """
             },
+            *progress,
             {
                 'component': 'VRow',
                 'props': {
@@ -1302,9 +1408,141 @@ class AutoSignInNew(_PluginBase):
                         ]
                     }
                 ]
-            }
+            },
+            *self.__trace_waterfall()
         ]
 
+    def __progress_card(self) -> List[dict]:
+        """正在执行的签到|登录进度，每次执行一条"""
+        with self._runs_lock:
+            runs = sorted(self._runs.values(), key=lambda r: r["perf"])
+        return [self.__progress_alert(progress) for progress in runs]
+
+    @staticmethod
+    def __progress_alert(progress: dict) -> dict:
+        total = progress.get("total") or 1
+        return {
+            'component': 'VAlert',
+            'props': {
+                'type': 'info',
+                'variant': 'tonal',
+                'class': 'mt-2 mb-2',
+                'prepend-icon': 'mdi-progress-clock'
+            },
+            'content': [
+                {
+                    'component': 'div',
+                    'text': f"{progress.get('type')}进行中（{progress.get('started')} 开始）："
+                            f"已完成 {progress.get('done')}/{progress.get('total')}，失败 {progress.get('failed')}"
+                },
+                {
+                    'component': 'VProgressLinear',
+                    'props': {
+                        'model-value': round(progress.get('done', 0) * 100 / total),
+                        'color': 'teal-lighten-3',
+                        'height': 6,
+                        'rounded': True,
+                        'class': 'mt-2'
+                    }
+                }
+            ]
+        }
+
+    def __trace_waterfall(self) -> List[dict]:
+        """今日最近一次签到|登录的分阶段耗时瀑布图，横轴为本次执行的时间线"""
+        runs = self.get_data(key=f"trace-{datetime.now().strftime('%Y-%m-%d')}")
+        if not runs or not runs[-1].get("sites"):
+            return []
+        run = runs[-1]
+        # 旧版本记录中的 connect 阶段即 wait 阶段
+        phases = ["wait" if phase == "connect" else phase for phase in run.get("phases") or PHASES]
+        elapsed = max([run.get("elapsed") or 0] + [r[1] + r[2] for r in run["sites"]]) or 1
+
+        def pct(ms) -> float:
+            return round(ms * 100 / elapsed, 2)
+
+        totals = {}
+        rows = []
+        for row in run["sites"]:
+            name, start, total, success = row[:4]
+            # 站点整体耗时作为底色，未被阶段覆盖的部分为处理器内其他耗时
+            bars = [{
+                'component': 'div',
+                'props': {
+                    'style': f'position: absolute; top: 0; bottom: 0; left: {pct(start)}%; width: {pct(total)}%; '
+                             f'background: rgba(0,0,0,0.06); border-radius: 3px'
+                }
+            }]
+            for idx, offset, duration in zip(row[4::3], row[5::3], row[6::3]):
+                phase = phases[idx] if idx < len(phases) else str(idx)
+                totals[phase] = totals.get(phase, 0) + duration
+                bars.append({
+                    'component': 'div',
+                    'props': {
+                        'title': f'{PHASE_NAMES.get(phase, phase)} {duration}ms',
+                        'style': f'position: absolute; top: 1px; bottom: 1px; left: {pct(start + offset)}%; '
+                                 f'width: {max(pct(duration), 0.3)}%; background: {self._phase_colors.get(phase, "#BDBDBD")}; '
+                                 f'border-radius: 2px'
+                    }
+                })
+            rows.append({
+                'component': 'div',
+                'props': {'class': 'd-flex align-center mb-1'},
+                'content': [
+                    {'component': 'span',
+                     'props': {'class': 'text-caption text-truncate', 'style': 'width: 110px'},
+                     'text': name},
+                    {'component': 'div',
+                     'props': {'class': 'flex-grow-1 mx-2', 'style': 'position: relative; height: 14px'},
+                     'content': bars},
+                    {'component': 'span',
+                     'props': {'class': 'text-caption text-right',
+                               'style': f"width: 60px; color: {'#80CBC4' if success else '#FFAB91'}"},
+                     'text': f'{total / 1000:.2f}s'},
+                ]
+            })
+
+        legend = [{
+            'component': 'VChip',
+            'props': {'size': 'x-small', 'variant': 'flat', 'class': 'mr-1 mb-1',
+                      'color': self._phase_colors.get(phase, '#BDBDBD')},
+            'text': f'{PHASE_NAMES.get(phase, phase)} {totals[phase] / 1000:.1f}s'
+        } for phase in phases if phase in totals]
+
+        return [{
+            'component': 'VRow',
+            'content': [{
+                'component': 'VCol',
+                'props': {'cols': 12},
+                'content': [{
+                    'component': 'VCard',
+                    'props': {'variant': 'flat', 'class': 'mb-4 signin-card'},
+                    'content': [
+                        {
+                            'component': 'VCardTitle',
+                            'props': {'class': 'gradient-title d-flex align-center pa-4'},
+                            'content': [
+                                {'component': 'VIcon',
+                                 'props': {'class': 'mr-2', 'color': 'teal-lighten-3', 'size': 'small',
+                                           'icon': 'mdi-chart-gantt'}},
+                                {'component': 'span', 'props': {'class': 'font-weight-medium'},
+                                 'text': f"最近一次{run.get('type', '')}耗时"},
+                                {'component': 'VSpacer'},
+                                {'component': 'VChip',
+                                 'props': {'color': 'teal-lighten-5', 'size': 'x-small', 'variant': 'elevated'},
+                                 'text': f"{run.get('time', '')} · {len(run['sites'])} 个站点 · {elapsed / 1000:.1f}s"}
+                            ]
+                        },
+                        {
+                            'component': 'VCardText',
+                            'props': {'class': 'pa-3'},
+                            'content': [{'component': 'div', 'props': {'class': 'mb-2'}, 'content': legend}] + rows
+                        }
+                    ]
+                }]
+            }]
+        }]
+
     @staticmethod
     def _create_expansion_panel(site_name, records, status_color, status_icon, latest_status):
         """创建站点折叠面板"""
@@ -1481,21 +1719,23 @@ class AutoSignInNew(_PluginBase):
         self.del_data(key=f"freq-{yesterday_str}")
         self.del_data(key=type_str + "-" + yesterday_str)
         self.del_data(key=f"{yesterday.month}月{yesterday.day}日")
+        self.del_data(key=f"trace-{yesterday_str}")
 
         # 查看今天有没有签到|登录历史
         today = today.strftime('%Y-%m-%d')
         today_history = self.get_data(key=type_str + "-" + today)
 
-        # 查询所有站点
-        all_sites = [site for site in SitesHelper().get_indexers() if not site.get("public")] + self.__custom_sites()
-        # 过滤掉没有选中的站点
+        # 查询所有站点，每次执行重新加载以使用最新的 Cookie
+        snapshot = site_cache.snapshot(refresh=True)
+        all_sites = snapshot.private_sites + self.__custom_sites()
+        # 过滤掉没有选中的站点，复制一份，签到过程会修改站点信息
         if do_sites:
-            do_sites = [site for site in all_sites if site.get("id") in do_sites]
+            do_sites = [copy.copy(site) for site in all_sites if site.get("id") in do_sites]
         else:
-            do_sites = all_sites
+            do_sites = [copy.copy(site) for site in all_sites]
 
-        # 今日没数据
-        if not today_history or self._clean:
+        # 今日没数据，回放时不受今日记录影响
+        if not today_history or self._clean or self.__replaying:
             logger.info(f"今日 {today} 未{type_str}，开始{type_str}已选站点")
             if self._clean:
                 # 关闭开关
@@ -1522,101 +1762,102 @@ class AutoSignInNew(_PluginBase):
             logger.info(f"没有需要{type_str}的站点")
             return
 
-        # 执行签到
+        # 执行签到，站点完成一个处理一个，不等待全部站点结束
         logger.info(f"开始执行{type_str}任务 ...")
-        if type_str == "签到":
-            with ThreadPool(min(len(do_sites), int(self._queue_cnt))) as p:
-                status = p.map(self.signin_site, do_sites)
-        else:
+        if self._openai:
+            self._openai.reset_metrics()
+        replay = self.__replaying
+        selected = self._sign_sites if type_str == "签到" else self._login_sites
+        # 今日签到详情
+        key = f"{datetime.now().month}月{datetime.now().day}日"
+        # 尚未保存的签到详情
+        unsaved: List[dict] = []
+        last_save = time.monotonic()
+        retry_pattern = re.compile(self._retry_keyword) if self._retry_keyword else None
+
+        status: List[SiteResult] = []
+        # 命中重试词的站点id
+        retry_sites = []
+        # 命中重试词的站点结果
+        retry_msg: List[SiteResult] = []
+        # 失败｜错误
+        failed_msg: List[SiteResult] = []
+        # 尚未完成的站点
+        pending = {site.get("id") for site in do_sites}
+
+        run = self.__start_run(type_str, len(do_sites))
+        try:
+            func = functools.partial(self.signin_site if type_str == "签到" else self.login_site, run=run)
             with ThreadPool(min(len(do_sites), int(self._queue_cnt))) as p:
-                status = p.map(self.login_site, do_sites)
+                for result in p.imap_unordered(func, do_sites):
+                    status.append(result)
+                    pending.discard(result.site_id)
+                    run["done"] += 1
+                    if not result.ok:
+                        run["failed"] += 1
+                    if replay:
+                        # 回放只输出结果，不记录历史、不触发事件、不发送通知
+                        logger.info(f"[回放] {result}")
+                        continue
+
+                    # 分批保存签到详情，执行中断时最多丢失一批未保存的结果
+                    unsaved.append(result.to_record())
+                    if len(unsaved) >= self.DETAIL_SAVE_BATCH \
+                            or time.monotonic() - last_save >= self.DETAIL_SAVE_INTERVAL:
+                        self.__append_details(key, unsaved)
+                        unsaved, last_save = [], time.monotonic()
+
+                    if result.state == SiteState.COOKIE_EXPIRED and self.__is_indexer_site(snapshot, result):
+                        # 触发自动登录插件登录
+                        logger.info(f"触发站点 {result.name} 自动登录更新Cookie和Ua")
+                        self.eventmanager.send_event(EventType.PluginAction,
+                                                     {
+                                                         "site_id": result.site_id,
+                                                         "action": "site_refresh"
+                                                     })
+                    # 记录本次命中重试关键词的站点
+                    if retry_pattern and result.site_id is not None and retry_pattern.search(result.message):
+                        logger.debug(f"站点 {result.name} 命中重试关键词 {self._retry_keyword}")
+                        retry_sites.append(result.site_id)
+                        # 命中的站点
+                        retry_msg.append(result)
+                        continue
+
+                    if not result.ok:
+                        failed_msg.append(result)
+        finally:
+            with self._runs_lock:
+                self._runs.pop(run["id"], None)
+                self._runs_lock.notify_all()
+            if unsaved:
+                self.__append_details(key, unsaved)
+            self.__save_trace(today, f"{type_str}（回放）" if replay else type_str, run)
+            if status and not replay:
+                if not self._retry_keyword:
+                    # 没设置重试关键词则重试已选站点
+                    retry_sites = selected
+                elif pending:
+                    # 执行中断，未完成的站点下次重试
+                    retry_sites = retry_sites + [site_id for site_id in pending if site_id is not None]
+                logger.debug(f"下次{type_str}重试站点 {retry_sites}")
+                # 存入历史
+                self.save_data(key=type_str + "-" + today,
+                               value={
+                                   "do": selected,
+                                   "retry": retry_sites
+                               })
+
+        if replay:
+            logger.info(f"站点{type_str}回放完成，共 {len(status)} 个站点")
+            if event:
+                self.post_message(channel=event.event_data.get("channel"),
+                                  title=f"站点{type_str}回放完成！", userid=event.event_data.get("user"))
+            return
 
         if status:
             logger.info(f"站点{type_str}任务完成！")
-            # 获取今天的日期
-            key = f"{datetime.now().month}月{datetime.now().day}日"
-            today_data = self.get_data(key)
-            if today_data:
-                if not isinstance(today_data, list):
-                    today_data = [today_data]
-                for s in status:
-                    today_data.append({
-                        "site": s[0],
-                        "status": s[1]
-                    })
-            else:
-                today_data = [{
-                    "site": s[0],
-                    "status": s[1]
-                } for s in status]
-            # 保存数据
-            self.save_data(key, today_data)
-
-            # 命中重试词的站点id
-            retry_sites = []
-            # 命中重试词的站点签到msg
-            retry_msg = []
-            # 登录成功
-            login_success_msg = []
-            # 签到成功
-            sign_success_msg = []
-            # 已签到
-            already_sign_msg = []
-            # 仿真签到成功
-            fz_sign_msg = []
-            # 失败｜错误
-            failed_msg = []
-
-            sites = {site.get('name'): site.get("id") for site in SitesHelper().get_indexers() if
-                     not site.get("public")}
-            for s in status:
-                site_name = s[0]
-                site_id = None
-                if site_name:
-                    site_id = sites.get(site_name)
-
-                if 'Cookie已失效' in str(s) and site_id:
-                    # 触发自动登录插件登录
-                    logger.info(f"触发站点 {site_name} 自动登录更新Cookie和Ua")
-                    self.eventmanager.send_event(EventType.PluginAction,
-                                                 {
-                                                     "site_id": site_id,
-                                                     "action": "site_refresh"
-                                                 })
-                # 记录本次命中重试关键词的站点
-                if self._retry_keyword:
-                    if site_id:
-                        match = re.search(self._retry_keyword, s[1])
-                        if match:
-                            logger.debug(f"站点 {site_name} 命中重试关键词 {self._retry_keyword}")
-                            retry_sites.append(site_id)
-                            # 命中的站点
-                            retry_msg.append(s)
-                            continue
-
-                if "登录成功" in str(s):
-                    login_success_msg.append(s)
-                elif "仿真签到成功" in str(s):
-                    fz_sign_msg.append(s)
-                    continue
-                elif "签到成功" in str(s):
-                    sign_success_msg.append(s)
-                elif '已签到' in str(s):
-                    already_sign_msg.append(s)
-                else:
-                    failed_msg.append(s)
-
-            if not self._retry_keyword:
-                # 没设置重试关键词则重试已选站点
-                retry_sites = self._sign_sites if type_str == "签到" else self._login_sites
-            logger.debug(f"下次{type_str}重试站点 {retry_sites}")
-
-            # 存入历史
-            self.save_data(key=type_str + "-" + today,
-                           value={
-                               "do": self._sign_sites if type_str == "签到" else self._login_sites,
-                               "retry": retry_sites
-                           })
+            if self._retry_keyword and retry_sites:
+                metrics.inc("retry_sites_total", len(retry_sites), type=type_str)
 
             # 自动Cloudflare IP优选
             if self._auto_cf and int(self._auto_cf) > 0 and retry_msg and len(retry_msg) >= int(self._auto_cf):
@@ -1627,6 +1868,12 @@ class AutoSignInNew(_PluginBase):
             # 签到详细信息 仅失败--命中重试
             signin_message = failed_msg + retry_msg
 
+            # 大模型调用统计
+            llm_report = self.__llm_report()
+            llm_line = f"{llm_report}\n" if llm_report else ""
+            if llm_report:
+                logger.info(llm_report)
+
             # 获取已经发送的数量
             cur_freq = int(self.get_data(key=f"freq-{today}") or 0)
 
@@ -1643,12 +1890,13 @@ class AutoSignInNew(_PluginBase):
 
             # 发送通知
             if self._notify and len(signin_message) > 0 and need_notify:
-                signin_message = "\n".join([f'【{s[0]}】{s[1]}' for s in signin_message if s])
+                signin_message = "\n".join([str(result) for result in signin_message])
                 self.post_message(title=f"【站点自动{type_str}】",
                                   mtype=NotificationType.SiteMessage,
-                                  text=f"全部{type_str}数量: {len(self._sign_sites if type_str == '签到' else self._login_sites)} \n"
+                                  text=f"全部{type_str}数量: {len(selected)} \n"
                                        f"本次{type_str}数量: {len(do_sites)} \n"
                                        f"下次{type_str}数量: {len(retry_sites) if self._retry_keyword else 0} \n"
+                                       f"{llm_line}"
                                        f"{signin_message}"
                                   )
                 self.save_data(f"freq-{today}", cur_freq + 1)
@@ -1666,6 +1914,106 @@ class AutoSignInNew(_PluginBase):
         # 保存配置
         self.__update_config()
 
+    def __llm_report(self) -> str:
+        """本次任务的大模型调用统计，无调用时返回空"""
+        if not self._openai:
+            return ""
+        metrics = self._openai.get_metrics()
+        if not metrics["requests"] and not metrics["errors"]:
+            return ""
+        return (f"大模型调用: {metrics['requests']} 次"
+                f"（合并 {metrics['coalesced']}，失败 {metrics['errors']}），"
+                f"平均耗时 {metrics['avg_latency']:.1f}s，最长 {metrics['max_latency']:.1f}s，"
+                f"tokens {metrics['prompt_tokens']}/{metrics['completion_tokens']}")
+
+    @property
+    def __replaying(self) -> bool:
+        return self._fixture_mode == "replay"
+
+    def __fixture(self, folder: str, site_info: CommentedMap):
+        """
+        录制|回放站点请求，未开启时不做任何事
+        :param folder: 录制目录，签到与登录分开保存
+        """
+        if self._fixture_mode not in HttpFixture.MODES:
+            return contextlib.nullcontext()
+        name = StringUtils.get_url_domain(site_info.get("url")) or site_info.get("name")
+        return HttpFixture(self.get_data_path() / "fixtures" / folder, self._fixture_mode).use(name)
+
+    def __start_run(self, type_str: str, total: int) -> dict:
+        """登记一次批量执行，返回该次执行的进度与耗时记录"""
+        run = {
+            "id": uuid.uuid4().hex,
+            "type": type_str,
+            "total": total,
+            "done": 0,
+            "failed": 0,
+            "started": datetime.now().strftime('%H:%M:%S'),
+            "perf": time.perf_counter(),
+            "traces": [],
+        }
+        with self._runs_lock:
+            self._runs[run["id"]] = run
+        return run
+
+    def __append_details(self, key: str, records: List[dict]):
+        """追加签到详情，同时进行的执行共用当天的记录，读取与保存之间加锁"""
+        with self._details_lock:
+            details = self.get_data(key) or []
+            if not isinstance(details, list):
+                details = [details]
+            details.extend(records)
+            self.save_data(key, details)
+
+    @staticmethod
+    def __record_trace(run: Optional[dict], trace, success: bool):
+        """记录单个站点的耗时，仅在批量执行中记录"""
+        if run is not None:
+            # list.append 是原子操作，各线程直接追加到所属执行的记录中
+            run["traces"].append(trace.to_row(run["perf"], success))
+
+    @staticmethod
+    def __is_indexer_site(snapshot, result: SiteResult) -> bool:
+        """是否为站点管理中的站点（自定义站点的 ID 不能用于站点管理）"""
+        site = snapshot.get(result.site_id)
+        return bool(site) and StringUtils.get_url_domain(site.get("url")) == result.domain
+
+    @staticmethod
+    def __observe_site(type_str: str, trace, result: SiteResult):
+        """记录站点签到|登录结果与各阶段耗时指标"""
+        metrics.inc("signin_total", type=type_str, site=trace.site, outcome=result.state.value)
+        metrics.observe("signin_duration_seconds", trace.total, type=type_str)
+        for idx, _, duration in trace.spans:
+            metrics.observe("phase_duration_seconds", duration, phase=PHASES[idx])
+
+    def __save_trace(self, today: str, type_str: str, run: dict):
+        """保存本次执行的站点耗时，每天保留最近 TRACE_KEEP_RUNS 次"""
+        rows = list(run["traces"])
+        if not rows:
+            return
+        elapsed = int(round((time.perf_counter() - run["perf"]) * 1000))
+        with self._details_lock:
+            runs = self.get_data(key=f"trace-{today}") or []
+            runs.append({
+                "time": datetime.now().strftime('%H:%M:%S'),
+                "type": type_str,
+                "elapsed": elapsed,
+                "phases": list(PHASES),
+                "sites": sorted(rows, key=lambda r: r[1]),
+            })
+            self.save_data(key=f"trace-{today}", value=runs[-self.TRACE_KEEP_RUNS:])
+
+        # 各阶段累计耗时，找出本次的瓶颈
+        totals = {}
+        for row in rows:
+            for idx, duration in zip(row[4::3], row[6::3]):
+                totals[idx] = totals.get(idx, 0) + duration
+        if totals:
+            idx = max(totals, key=totals.get)
+            slowest = max(rows, key=lambda r: r[2])
+            logger.info(f"{type_str}耗时 {elapsed / 1000:.1f}s，最慢站点 {slowest[0]}（{slowest[2] / 1000:.1f}s），"
+                        f"累计耗时最多的阶段：{PHASE_NAMES[PHASES[idx]]}（{totals[idx] / 1000:.1f}s）")
+
     @staticmethod
     def safe_eval(expr: str, variables: dict):
         # 将 C 风格逻辑换成 Python 风格
@@ -1692,43 +2040,47 @@ class AutoSignInNew(_PluginBase):
         if apikey != settings.API_TOKEN:
             return schemas.Response(success=False, message="API密钥错误")
         domain = StringUtils.get_url_domain(url)
-        site_info = SitesHelper().get_indexer(domain)
+        site_info = site_cache.snapshot().by_domain.get(domain)
         if not site_info:
             return schemas.Response(
                 success=True,
                 message=f"站点【{url}】不存在"
             )
         else:
-            site_name, message = self.signin_site(site_info)
+            result = self.signin_site(copy.copy(site_info))
             return schemas.Response(
                 success=True,
-                message=f"站点【{site_name}】{message or '签到成功'}"
+                message=f"站点【{result.name}】{result.message or '签到成功'}"
             )
 
-    def signin_site(self, site_info: CommentedMap) -> Tuple[str, str]:
+    def signin_site(self, site_info: CommentedMap, run: dict = None) -> SiteResult:
         """
         签到一个站点
+        :param run: 所属的批量执行，记录耗时用，单独签到时为空
         """
         site_module = self.__build_class(site_info.get("url"))
-        # 开始记时
-        start_time = datetime.now()
-        if site_module and hasattr(site_module, "signin"):
-            try:
-                site_info.setdefault("openai", self._openai)
-                state, message = site_module().signin(site_info)
-            except Exception as e:
-                traceback.print_exc()
-                state, message = False, f"签到失败：{str(e)}"
-        else:
-            state, message = self.__signin_base(site_info)
+        # 开始记时，分阶段耗时由各处理步骤记录
+        with self.__fixture("signin", site_info), site_trace(site_info.get("name")) as trace:
+            if site_module and hasattr(site_module, "signin"):
+                try:
+                    site_info.setdefault("openai", self._openai)
+                    state, message = site_module().signin(site_info)
+                except Exception as e:
+                    traceback.print_exc()
+                    state, message = False, f"签到失败：{str(e)}"
+            else:
+                state, message = self.__signin_base(site_info)
+        result = SiteResult(site_info, state, message, elapsed=trace.total)
+        self.__record_trace(run, trace, result.ok)
+        if self.__replaying:
+            return result
+        self.__observe_site("签到", trace, result)
         # 统计
-        seconds = (datetime.now() - start_time).seconds
-        domain = StringUtils.get_url_domain(site_info.get('url'))
-        if state:
-            SiteOper().success(domain=domain, seconds=seconds)
+        if result.ok:
+            SiteOper().success(domain=result.domain, seconds=int(round(result.elapsed)))
         else:
-            SiteOper().fail(domain)
-        return site_info.get("name"), message
+            SiteOper().fail(result.domain)
+        return result
 
     @staticmethod
     def __signin_base(site_info: CommentedMap) -> Tuple[bool, str]:
@@ -1759,12 +2111,15 @@ class AutoSignInNew(_PluginBase):
                 checkin_url = urljoin(site_url, "attendance.php")
             logger.info(f"开始站点签到：{site}，地址：{checkin_url}...")
             if render:
-                page_source = PlaywrightHelper().get_page_source(url=checkin_url,
-                                                                 cookies=site_cookie,
-                                                                 ua=ua,
-                                                                 proxies=proxy_server,
-                                                                 timeout=timeout)
-                if not SiteUtils.is_logged_in(page_source):
+                with span("submit"):
+                    page_source = PlaywrightHelper().get_page_source(url=checkin_url,
+                                                                     cookies=site_cookie,
+                                                                     ua=ua,
+                                                                     proxies=proxy_server,
+                                                                     timeout=timeout)
+                with span("parse"):
+                    logged_in = SiteUtils.is_logged_in(page_source)
+                if not logged_in:
                     if under_challenge(page_source):
                         return False, f"无法通过Cloudflare！"
                     return False, f"仿真登录失败，Cookie已失效！"
@@ -1775,21 +2130,27 @@ class AutoSignInNew(_PluginBase):
                         return True, f"签到成功"
                     return True, "仿真签到成功"
             else:
-                res = RequestUtils(cookies=site_cookie,
-                                   ua=ua,
-                                   proxies=proxies,
-                                   timeout=timeout
-                                   ).get_res(url=checkin_url)
-                if not res and site_url != checkin_url:
-                    logger.info(f"开始站点模拟登录：{site}，地址：{site_url}...")
+                with span("submit") as s:
                     res = RequestUtils(cookies=site_cookie,
                                        ua=ua,
                                        proxies=proxies,
                                        timeout=timeout
-                                       ).get_res(url=site_url)
+                                       ).get_res(url=checkin_url)
+                    s.response(res)
+                if not res and site_url != checkin_url:
+                    logger.info(f"开始站点模拟登录：{site}，地址：{site_url}...")
+                    with span("fetch") as s:
+                        res = RequestUtils(cookies=site_cookie,
+                                           ua=ua,
+                                           proxies=proxies,
+                                           timeout=timeout
+                                           ).get_res(url=site_url)
+                        s.response(res)
                 # 判断登录状态
                 if res and res.status_code in [200, 500, 403]:
-                    if not SiteUtils.is_logged_in(res.text):
+                    with span("parse"):
+                        logged_in = SiteUtils.is_logged_in(res.text)
+                    if not logged_in:
                         if under_challenge(res.text):
                             msg = "站点被Cloudflare防护，请打开站点浏览器仿真"
                         elif res.status_code == 200:
@@ -1812,29 +2173,33 @@ class AutoSignInNew(_PluginBase):
             traceback.print_exc()
             return False, f"签到失败：{str(e)}！"
 
-    def login_site(self, site_info: CommentedMap) -> Tuple[str, str]:
+    def login_site(self, site_info: CommentedMap, run: dict = None) -> SiteResult:
         """
         模拟登录一个站点
+        :param run: 所属的批量执行，记录耗时用，单独登录时为空
         """
         site_module = self.__build_class(site_info.get("url"))
-        # 开始记时
-        start_time = datetime.now()
-        if site_module and hasattr(site_module, "login"):
-            try:
-                state, message = site_module().login(site_info)
-            except Exception as e:
-                traceback.print_exc()
-                state, message = False, f"模拟登录失败：{str(e)}"
-        else:
-            state, message = self.__login_base(site_info)
+        # 开始记时，分阶段耗时由各处理步骤记录
+        with self.__fixture("login", site_info), site_trace(site_info.get("name")) as trace:
+            if site_module and hasattr(site_module, "login"):
+                try:
+                    state, message = site_module().login(site_info)
+                except Exception as e:
+                    traceback.print_exc()
+                    state, message = False, f"模拟登录失败：{str(e)}"
+            else:
+                state, message = self.__login_base(site_info)
+        result = SiteResult(site_info, state, message, elapsed=trace.total)
+        self.__record_trace(run, trace, result.ok)
+        if self.__replaying:
+            return result
+        self.__observe_site("登录", trace, result)
         # 统计
-        seconds = (datetime.now() - start_time).seconds
-        domain = StringUtils.get_url_domain(site_info.get('url'))
-        if state:
-            SiteOper().success(domain=domain, seconds=seconds)
+        if result.ok:
+            SiteOper().success(domain=result.domain, seconds=int(round(result.elapsed)))
         else:
-            SiteOper().fail(domain)
-        return site_info.get("name"), message
+            SiteOper().fail(result.domain)
+        return result
 
     @staticmethod
     def __login_base(site_info: CommentedMap) -> Tuple[bool, str]:
@@ -1862,26 +2227,33 @@ class AutoSignInNew(_PluginBase):
             site_url = str(site_url).replace("attendance.php", "")
             logger.info(f"开始站点模拟登录：{site}，地址：{site_url}...")
             if render:
-                page_source = PlaywrightHelper().get_page_source(url=site_url,
-                                                                 cookies=site_cookie,
-                                                                 ua=ua,
-                                                                 proxies=proxy_server,
-                                                                 timeout=timeout)
-                if not SiteUtils.is_logged_in(page_source):
+                with span("fetch"):
+                    page_source = PlaywrightHelper().get_page_source(url=site_url,
+                                                                     cookies=site_cookie,
+                                                                     ua=ua,
+                                                                     proxies=proxy_server,
+                                                                     timeout=timeout)
+                with span("parse"):
+                    logged_in = SiteUtils.is_logged_in(page_source)
+                if not logged_in:
                     if under_challenge(page_source):
                         return False, f"无法通过Cloudflare！"
                     return False, f"仿真登录失败，Cookie已失效！"
                 else:
                     return True, "模拟登录成功"
             else:
-                res = RequestUtils(cookies=site_cookie,
-                                   ua=ua,
-                                   proxies=proxies,
-                                   timeout=timeout
-                                   ).get_res(url=site_url)
+                with span("fetch") as s:
+                    res = RequestUtils(cookies=site_cookie,
+                                       ua=ua,
+                                       proxies=proxies,
+                                       timeout=timeout
+                                       ).get_res(url=site_url)
+                    s.response(res)
                 # 判断登录状态
                 if res and res.status_code in [200, 500, 403]:
-                    if not SiteUtils.is_logged_in(res.text):
+                    with span("parse"):
+                        logged_in = SiteUtils.is_logged_in(res.text)
+                    if not logged_in:
                         if under_challenge(res.text):
                             msg = "站点被Cloudflare防护，请打开站点浏览器仿真"
                         elif res.status_code == 200:
@@ -1914,14 +2286,40 @@ class AutoSignInNew(_PluginBase):
                 if self._scheduler.running:
                     self._scheduler.shutdown()
                 self._scheduler = None
+            if self._openai:
+                # 之后开始的站点不再使用大模型，进行中的执行结束后再关闭共用的事件循环与连接
+                openai, self._openai = self._openai, None
+                if self.__wait_runs(self.STOP_WAIT_TIMEOUT):
+                    openai.close()
+                else:
+                    logger.warn("仍有签到|登录在执行，结束后再关闭大模型客户端")
+                    threading.Thread(target=self.__close_after_runs, args=(openai,),
+                                     name="AutoSignInNew-close", daemon=True).start()
         except Exception as e:
             logger.error("退出插件失败：%s" % str(e))
 
+    def __wait_runs(self, timeout: Optional[float] = None) -> bool:
+        """等待进行中的签到|登录结束，超时返回 False"""
+        with self._runs_lock:
+            return self._runs_lock.wait_for(lambda: not self._runs, timeout=timeout)
+
+    def __close_after_runs(self, openai: OpenAi):
+        self.__wait_runs()
+        openai.close()
+
+    @eventmanager.register(EventType.SiteUpdated)
+    def site_updated(self, event):
+        """
+        站点更新时刷新站点缓存
+        """
+        site_cache.invalidate()
+
     @eventmanager.register(EventType.SiteDeleted)
     def site_deleted(self, event):
         """
         删除对应站点选中
         """
+        site_cache.invalidate()
         site_id = event.event_data.get("site_id")
         config = self.get_config()
         if config:
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+import base64
+import re
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+from typing import Optional, Dict, Tuple, List
+
+from app.helper.ocr import OcrHelper
+from app.log import logger
+from app.plugins.autosigninnew.metrics import metrics
+from app.plugins.autosigninnew.openai import OpenAi
+from app.plugins.autosigninnew.sites import _ISiteSigninHandler
+from app.plugins.autosigninnew.tracing import span
+
+
+class _ICaptchaSolver(metaclass=ABCMeta):
+    """
+    验证码识别器基类，实现 solve 方法，返回识别出的字符串
+    """
+    # 识别器名称，用于统计与日志
+    name = ""
+
+    def available(self) -> bool:
+        """识别器当前是否可用"""
+        return True
+
+    @abstractmethod
+    def solve(self, image: bytes, mime_type: str) -> Optional[str]:
+        """
+        识别验证码
+        :param image: 图片内容
+        :param mime_type: 图片 MIME 类型
+        :return: 识别结果，失败返回 None
+        """
+        pass
+
+
+class LocalOcrSolver(_ICaptchaSolver):
+    """
+    进程内 CPU OCR（ddddocr），适合 NexusPHP 定长字母数字验证码，未安装 ddddocr 时不可用
+    """
+    name = "local"
+
+    _engine = None
+    _engine_failed = False
+    _engine_lock = threading.Lock()
+
+    @classmethod
+    def _get_engine(cls):
+        """首次使用时加载模型，所有实例共享"""
+        if cls._engine is None and not cls._engine_failed:
+            with cls._engine_lock:
+                if cls._engine is None and not cls._engine_failed:
+                    try:
+                        import ddddocr
+                        cls._engine = ddddocr.DdddOcr(show_ad=False)
+                        logger.info("本地OCR模型加载完成")
+                    except Exception as e:
+                        cls._engine_failed = True
+                        logger.debug(f"本地OCR不可用：{str(e)}")
+        return cls._engine
+
+    def available(self) -> bool:
+        return self._get_engine() is not None
+
+    def solve(self, image: bytes, mime_type: str) -> Optional[str]:
+        engine = self._get_engine()
+        if not engine:
+            return None
+        # 推理会话不保证线程安全，多个站点同时签到时串行识别
+        with self._engine_lock:
+            return engine.classification(image)
+
+
+class RemoteOcrSolver(_ICaptchaSolver):
+    """
+    MoviePilot 远程 OCR 服务
+    """
+    name = "remote"
+
+    def solve(self, image: bytes, mime_type: str) -> Optional[str]:
+        return OcrHelper().get_captcha_text(image_b64=base64.b64encode(image).decode("utf-8"))
+
+
+class LlmSolver(_ICaptchaSolver):
+    """
+    大模型识别，未配置大模型时不可用
+    """
+    name = "llm"
+
+    def __init__(self, openai: Optional[OpenAi]):
+        self._openai = openai
+
+    def available(self) -> bool:
+        return self._openai is not None
+
+    def solve(self, image: bytes, mime_type: str) -> Optional[str]:
+        ok, text = self._openai.get_captcha_with_img(
+            _ISiteSigninHandler.prepare_image(image, mime_type, "captcha")
+        )
+        return text if ok else None
+
+
+class CaptchaSolver:
+    """
+    按实测准确率与耗时选择验证码识别器。
+    每个站点、每个识别器分别统计：期望代价 = 平均耗时 + 错误率 × 识别错误代价，越小越先尝试；
+    准确率做拉普拉斯平滑，没有记录时按 50% 计；
+    结果格式不符或被站点拒绝计为识别错误，依次回退到下一个识别器。
+    """
+    # {(站点, 识别器): {"calls", "latency", "attempts", "success"}}，进程内共享
+    _stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+    _stats_lock = threading.Lock()
+    # 无实测数据时的先验耗时（秒）
+    _prior_latency = {"local": 0.1, "remote": 2.0, "llm": 8.0}
+    # 识别错误的代价（秒）：提交错误验证码导致本次签到失败，需等下次重试
+    _failure_cost = 30.0
+
+    def __init__(self, site: str, openai: Optional[OpenAi] = None, length: int = None):
+        """
+        :param site: 站点名称
+        :param openai: 大模型客户端，为空时不使用大模型识别
+        :param length: 验证码长度，识别结果长度不符时视为错误
+        """
+        self._site = site
+        self._length = length
+        self._solvers: List[_ICaptchaSolver] = [
+            solver for solver in (LocalOcrSolver(), RemoteOcrSolver(), LlmSolver(openai)) if solver.available()
+        ]
+        self._last_solver: Optional[str] = None
+
+    def __record(self, solver: str, latency: float = None, success: bool = None):
+        with self._stats_lock:
+            stats = self._stats.setdefault((self._site, solver),
+                                           {"calls": 0, "latency": 0.0, "attempts": 0, "success": 0})
+            if latency is not None:
+                stats["calls"] += 1
+                stats["latency"] += latency
+            if success is not None:
+                stats["attempts"] += 1
+                stats["success"] += 1 if success else 0
+
+    def __expected_cost(self, solver: _ICaptchaSolver) -> float:
+        with self._stats_lock:
+            stats = dict(self._stats.get((self._site, solver.name)) or {})
+        if stats.get("calls"):
+            latency = stats["latency"] / stats["calls"]
+        else:
+            latency = self._prior_latency.get(solver.name, 5.0)
+        accuracy = (stats.get("success", 0) + 1) / (stats.get("attempts", 0) + 2)
+        return latency + (1 - accuracy) * self._failure_cost
+
+    def solve(self, image: bytes, mime_type: str = "image/png") -> Optional[str]:
+        """依次尝试识别器，返回第一个格式正确的结果"""
+        self._last_solver = None
+        for solver in sorted(self._solvers, key=self.__expected_cost):
+            start = time.perf_counter()
+            try:
+                with span("llm" if solver.name == "llm" else "ocr"):
+                    text = solver.solve(image, mime_type)
+            except Exception as e:
+                logger.debug(f"{self._site} 验证码识别器 {solver.name} 异常：{str(e)}")
+                text = None
+            latency = time.perf_counter() - start
+            self.__record(solver.name, latency=latency)
+            metrics.observe("captcha_solve_duration_seconds", latency, solver=solver.name)
+
+            text = re.sub(r"\s", "", text or "")
+            if text and (not self._length or len(text) == self._length):
+                logger.info(f"{self._site} 验证码识别（{solver.name}，{latency:.2f}s）：{text}")
+                metrics.inc("captcha_solves_total", solver=solver.name, result="ok")
+                self._last_solver = solver.name
+                return text
+
+            logger.info(f"{self._site} 验证码识别器 {solver.name} 结果无效：{text}")
+            metrics.inc("captcha_solves_total", solver=solver.name, result="invalid")
+            self.__record(solver.name, success=False)
+        return None
+
+    def report(self, success: bool):
+        """回报最近一次识别结果是否被站点接受，用于调整识别器顺序"""
+        if self._last_solver:
+            self.__record(self._last_solver, success=success)
+            metrics.inc("captcha_reports_total", solver=self._last_solver,
+                        result="accepted" if success else "rejected")
+            self._last_solver = None
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# 站点开注检查插件在安装了本插件时复用本模块录制|回放请求，本模块是唯一的一份
+import base64
+import gzip
+import json
+import re
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from app.log import logger
+
+# 录制时保留的响应头，响应体保存的是解压后的内容
+_KEEP_HEADERS = ("Content-Type", "Location", "Refresh")
+# 保存当前线程录制|回放会话的线程变量
+_local = threading.local()
+_install_lock = threading.Lock()
+# 进行中的录制|回放数量，以及替换前的 requests.Session.request
+_active = 0
+_original = None
+
+
+def _request(session, method, url, *args, **kwargs):
+    """替换后的 requests.Session.request，未进入录制|回放的线程原样发出请求"""
+    fixture = getattr(_local, "fixture", None)
+    if fixture is None:
+        return _original(session, method, url, *args, **kwargs)
+    return fixture.handle(_original, session, method, url, *args, **kwargs)
+
+
+@contextmanager
+def _patched():
+    """
+    只在有录制|回放进行时替换 requests.Session.request，最后一个结束时恢复
+    处理器通过 RequestUtils 发出的请求大多不使用可挂载适配器的共用会话，因此需要在 Session 层拦截
+    """
+    global _active, _original
+    with _install_lock:
+        if not _active:
+            _original = requests.Session.request
+            requests.Session.request = _request
+        _active += 1
+    try:
+        yield
+    finally:
+        with _install_lock:
+            _active -= 1
+            if not _active:
+                # 期间被其他代码再次替换时无法安全恢复，保留替换（其他线程的请求仍原样发出）
+                if requests.Session.request is _request:
+                    requests.Session.request = _original
+                else:
+                    logger.warn("requests.Session.request 已被其他代码替换，录制|回放结束后无法恢复")
+
+
+class _FixtureSession:
+    """
+    单个站点的一次录制|回放
+    """
+
+    def __init__(self, path: Path, mode: str):
+        self.path = path
+        self.mode = mode
+        self.exchanges: List[dict] = []
+        # {请求键: [记录序号]}，请求键为 (方法, URL) 与 (方法, 去掉查询参数的 URL)
+        self._index: Dict[Tuple[str, str], List[int]] = {}
+        self._used = set()
+        if mode == "replay":
+            self.__load()
+
+    @staticmethod
+    def __keys(method: str, url: str) -> Tuple[Tuple[str, str], Tuple[str, str]]:
+        parts = urlsplit(url)
+        method = method.upper()
+        return (method, url), (method, f"{parts.scheme}://{parts.netloc}{parts.path}")
+
+    def __load(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                self.exchanges = json.load(f).get("exchanges") or []
+        except FileNotFoundError:
+            logger.warn(f"没有回放数据：{self.path}")
+        except Exception as e:
+            logger.error(f"读取回放数据 {self.path} 失败：{str(e)}")
+        for idx, exchange in enumerate(self.exchanges):
+            for key in self.__keys(exchange["method"], exchange["url"]):
+                self._index.setdefault(key, []).append(idx)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            json.dump({"version": 1, "exchanges": self.exchanges}, f, ensure_ascii=False)
+        logger.info(f"已录制 {len(self.exchanges)} 个请求：{self.path}")
+
+    def handle(self, original, session, method: str, url: str, *args, **kwargs):
+        if self.mode == "record":
+            return self.__record(original, session, method, url, *args, **kwargs)
+        return self.__replay(method, url)
+
+    def __record(self, original, session, method: str, url: str, *args, **kwargs):
+        exchange = {"method": method.upper(), "url": url}
+        self.exchanges.append(exchange)
+        try:
+            res = original(session, method, url, *args, **kwargs)
+        except Exception as e:
+            exchange["error"] = str(e)
+            raise
+        exchange.update({
+            "status": res.status_code,
+            "final_url": res.url,
+            "headers": {k: res.headers[k] for k in _KEEP_HEADERS if k in res.headers},
+            "encoding": res.encoding,
+            "elapsed": res.elapsed.total_seconds(),
+            "content": base64.b64encode(res.content or b"").decode("ascii"),
+        })
+        return res
+
+    def __match(self, method: str, url: str) -> Optional[dict]:
+        """按录制顺序取第一个未使用的匹配记录，全部用过时重复最后一个（对应重试请求）"""
+        for key in self.__keys(method, url):
+            indexes = self._index.get(key)
+            if not indexes:
+                continue
+            for idx in indexes:
+                if idx not in self._used:
+                    self._used.add(idx)
+                    return self.exchanges[idx]
+            return self.exchanges[indexes[-1]]
+        return None
+
+    def __replay(self, method: str, url: str) -> requests.Response:
+        exchange = self.__match(method, url)
+        if exchange is None:
+            raise requests.exceptions.ConnectionError(f"回放数据中没有请求：{method.upper()} {url}")
+        if exchange.get("error"):
+            raise requests.exceptions.ConnectionError(exchange["error"])
+
+        res = requests.Response()
+        res.status_code = exchange["status"]
+        res.url = exchange.get("final_url") or url
+        res.headers = CaseInsensitiveDict(exchange.get("headers") or {})
+        res.encoding = exchange.get("encoding")
+        res._content = base64.b64decode(exchange.get("content") or "")
+        # 回放不模拟网络延迟
+        res.elapsed = timedelta(0)
+        res.request = requests.Request(method=method.upper(), url=url).prepare()
+        return res
+
+
+class HttpFixture:
+    """
+    站点 HTTP 请求录制与回放，作用于 RequestUtils 等所有基于 requests 的请求（仿真浏览器与大模型请求除外）
+    - record：正常访问站点，同时把请求与响应按站点保存为 {目录}/{站点}.json.gz；
+    - replay：不访问网络，按录制顺序返回相同请求（方法 + URL，找不到时忽略查询参数）的响应，
+      没有录制数据的请求按连接失败处理。
+    只影响进入 use() 的线程，其他线程（包括其他插件）的请求照常发出。
+    """
+    MODES = ("record", "replay")
+
+    def __init__(self, root: Path, mode: str):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown fixture mode: {mode}")
+        self._root = Path(root)
+        self.mode = mode
+
+    @contextmanager
+    def use(self, name: str):
+        """
+        在当前线程中录制|回放站点请求
+        :param name: 站点名称（通常为域名），决定录制文件名
+        """
+        filename = re.sub(r"[^\w.-]", "_", name or "unknown")
+        session = _FixtureSession(self._root / f"{filename}.json.gz", self.mode)
+        previous = getattr(_local, "fixture", None)
+        _local.fixture = session
+        try:
+            with _patched():
+                yield session
+        finally:
+            _local.fixture = previous
+            if self.mode == "record":
+                try:
+                    session.save()
+                except Exception as e:
+                    logger.error(f"保存录制数据 {session.path} 失败：{str(e)}")
@@ -1,19 +1,37 @@
 # -*- coding: UTF-8 -*-
 
-from typing import List, Union, Tuple, Optional, Dict
-from openai import OpenAI
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import threading
+import time
+from typing import List, Union, Tuple, Optional, Dict, Any
+
 import httpx
+from openai import AsyncOpenAI
 from app.log import logger
+from app.plugins.autosigninnew.metrics import metrics
+from app.plugins.autosigninnew.tracing import span
 
 
 class OpenAi(object):
-    """基于 OpenAI SDK 的大模型调用封装"""
+    """
+    基于 OpenAI SDK 的大模型调用封装
+    1. 请求统一交给独立事件循环线程中的异步客户端，所有站点共享同一个 httpx 连接池；
+    2. 同时进行的请求数受 concurrency 限制，超出的请求在事件循环中排队，不额外占用连接；
+       排队与请求的总等待时间不超过 timeout，超时后取消请求，释放并发名额；
+    3. 进行中的完全相同请求（模型、消息、参数一致）合并为一次调用；
+    4. 记录调用耗时与 token 用量，供签到报告使用。
+    """
 
     def __init__(self,
                  api_key: str = None,
                  api_url: str = None,
                  proxy: dict = None,
-                 model: str = "gpt-4o"):
+                 model: str = "gpt-4o",
+                 concurrency: int = 4,
+                 timeout: float = 60.0):
 
         if not api_key or not api_url:
             raise ValueError("API key and API URL are required for OpenAi initialization.")
@@ -21,23 +39,77 @@ class OpenAi(object):
         self._api_key = api_key
         self._api_url = api_url
         self._model = model
+        self._timeout = timeout
+        self._concurrency = max(int(concurrency or 1), 1)
 
-        # 配置代理客户端
-        http_client = None
-        if proxy and proxy.get("https"):
-            http_client = httpx.Client(
-                proxy=proxy.get("https"),
-                timeout=60.0
-            )
+        # 共享连接池的异步客户端，配置代理
+        self._http_client = httpx.AsyncClient(
+            proxy=proxy.get("https") if proxy and proxy.get("https") else None,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=self._concurrency,
+                                max_keepalive_connections=self._concurrency)
+        )
 
         # 初始化 OpenAI 客户端
-        self._client = OpenAI(
+        self._client = AsyncOpenAI(
             api_key=self._api_key,
             base_url=self._api_url,
-            http_client=http_client,
-            timeout=60.0  # 默认超时 60 秒
+            http_client=self._http_client,
+            timeout=timeout
         )
 
+        # 事件循环线程，以下属性只在该线程中访问
+        self._loop = asyncio.new_event_loop()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # 进行中的请求 {请求指纹: [请求任务, 等待方数量]}
+        self._inflight: Dict[str, list] = {}
+        self._thread = threading.Thread(target=self._loop.run_forever, name="OpenAi-loop", daemon=True)
+        self._thread.start()
+
+        self._metrics_lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+        self.reset_metrics()
+
+    def close(self):
+        """关闭客户端与事件循环"""
+        if self._loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result(timeout=5)
+        except Exception as e:
+            logger.debug(f"关闭大模型客户端失败：{str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+
+    def reset_metrics(self):
+        """清空调用统计"""
+        with self._metrics_lock:
+            self._metrics = {
+                "requests": 0,
+                "coalesced": 0,
+                "errors": 0,
+                "latency": 0.0,
+                "max_latency": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+            }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """调用统计：请求数、合并数、失败数、耗时（秒）与 token 用量"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["avg_latency"] = metrics["latency"] / metrics["requests"] if metrics["requests"] else 0.0
+        return metrics
+
+    def __record(self, **values):
+        with self._metrics_lock:
+            for key, value in values.items():
+                if key == "max_latency":
+                    self._metrics[key] = max(self._metrics[key], value)
+                else:
+                    self._metrics[key] += value
+
     def _build_messages(self,
                         message: Union[str, List[dict]],
                         prompt: str = None,
@@ -68,25 +140,88 @@ class OpenAi(object):
 
         return messages
 
+    async def _achat(self, messages: List[dict], user: str, **kwargs) -> str:
+        """在事件循环中执行请求，相同请求进行中时等待其结果；等待超过 timeout 时放弃"""
+        key = hashlib.sha1(
+            json.dumps([self._model, user, messages, kwargs], sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        entry = self._inflight.get(key)
+        if entry:
+            self.__record(coalesced=1)
+            metrics.inc("llm_coalesced_total")
+        else:
+            entry = [asyncio.ensure_future(self.__create(messages, user, **kwargs)), 0]
+            self._inflight[key] = entry
+            entry[0].add_done_callback(lambda _: self.__release(key, entry))
+        entry[1] += 1
+        try:
+            # shield：单个等待方超时或取消不影响其他合并的等待方
+            return await asyncio.wait_for(asyncio.shield(entry[0]), self._timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"大模型请求超时（{self._timeout:g}秒）") from None
+        finally:
+            entry[1] -= 1
+            if not entry[1] and not entry[0].done():
+                # 所有等待方都已放弃，取消请求（包括仍在排队的请求），释放并发名额
+                self.__release(key, entry)
+                entry[0].cancel()
+
+    def __release(self, key: str, entry: list):
+        """移除进行中的请求，已被同指纹的新请求替换时保留"""
+        if self._inflight.get(key) is entry:
+            self._inflight.pop(key)
+
+    async def __create(self, messages: List[dict], user: str, **kwargs) -> str:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                completion = await self._client.chat.completions.create(
+                    model=self._model,
+                    user=user,
+                    messages=messages,
+                    **kwargs
+                )
+            except Exception:
+                self.__record(errors=1)
+                metrics.inc("llm_requests_total", outcome="error")
+                raise
+            latency = time.perf_counter() - start
+
+        usage = completion.usage
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        self.__record(requests=1,
+                      latency=latency,
+                      max_latency=latency,
+                      prompt_tokens=prompt_tokens,
+                      completion_tokens=completion_tokens)
+        metrics.inc("llm_requests_total", outcome="ok")
+        metrics.observe("llm_request_duration_seconds", latency)
+        metrics.inc("llm_tokens_total", prompt_tokens, kind="prompt")
+        metrics.inc("llm_tokens_total", completion_tokens, kind="completion")
+        return completion.choices[0].message.content.strip()
+
     def _chat(self,
               message: Union[str, List[dict]],
               prompt: str = None,
               img_url: str = None,
               user: str = "MoviePilot",
               **kwargs) -> str:
-        """通用请求方法"""
-        if not self._client:
+        """通用请求方法，可在任意线程中调用"""
+        if not self._client or self._loop.is_closed():
             raise ValueError("OpenAI client not initialized.")
 
         messages = self._build_messages(message, prompt, img_url)
-
-        completion = self._client.chat.completions.create(
-            model=self._model,
-            user=user,
-            messages=messages,
-            **kwargs
-        )
-        return completion.choices[0].message.content.strip()
+        with span("llm"):
+            future = asyncio.run_coroutine_threadsafe(self._achat(messages, user, **kwargs), self._loop)
+            try:
+                # 超时由事件循环中的 _achat 控制，这里只为事件循环无响应时兜底
+                return future.result(timeout=self._timeout + 5)
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                raise TimeoutError(f"大模型请求超时（{self._timeout:g}秒）") from None
 
     def get_answer_with_img(self, text: str, image: str = None) -> Tuple[bool, str]:
         """
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from enum import Enum
+from typing import Any, Optional
+
+from app.utils.string import StringUtils
+
+
+class SiteState(Enum):
+    """
+    站点签到|登录结果，取值即指标中的 outcome 标签
+    """
+    # 签到|登录成功
+    SUCCESS = "success"
+    # 今日已签到
+    ALREADY = "already"
+    # 仿真签到成功
+    EMULATED = "emulated"
+    # Cookie 失效，需要重新登录
+    COOKIE_EXPIRED = "cookie_expired"
+    # 其他失败
+    FAILED = "failed"
+
+    @property
+    def ok(self) -> bool:
+        return self in (SiteState.SUCCESS, SiteState.ALREADY, SiteState.EMULATED)
+
+    @classmethod
+    def classify(cls, state: bool, message: str) -> "SiteState":
+        """按站点处理器返回的 (是否成功, 消息) 分类，只在产生结果时判断一次"""
+        message = message or ""
+        if state:
+            if "已签到" in message:
+                return cls.ALREADY
+            if "仿真签到成功" in message:
+                return cls.EMULATED
+            return cls.SUCCESS
+        if "Cookie已失效" in message:
+            return cls.COOKIE_EXPIRED
+        return cls.FAILED
+
+
+class SiteResult:
+    """
+    单个站点一次签到|登录的结果
+    """
+    __slots__ = ("site_id", "name", "domain", "state", "message", "elapsed")
+
+    def __init__(self, site_info: dict, state: bool, message: str, elapsed: float = 0.0):
+        """
+        :param site_info: 站点信息，内置站点与自定义站点都带有 ID
+        :param state: 站点处理器返回的是否成功
+        :param message: 站点处理器返回的消息
+        :param elapsed: 耗时（秒）
+        """
+        self.site_id: Optional[Any] = site_info.get("id")
+        self.name: str = site_info.get("name")
+        self.domain: str = StringUtils.get_url_domain(site_info.get("url"))
+        self.state: SiteState = SiteState.classify(state, message)
+        self.message: str = message or ""
+        self.elapsed: float = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.state.ok
+
+    def to_record(self) -> dict:
+        """签到详情中保存的记录"""
+        return {
+            "site": self.name,
+            "status": self.message
+        }
+
+    def __str__(self):
+        return f"【{self.name}】{self.message}"
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# autosigninnew、siteopencheck 各有一份 sitecache.py：插件独立安装，不能互相导入。
+# SiteSnapshot 与 SiteCache 两份相同，修改时同步（tests/test_sitecache.py 校验一致），文件末尾的站点来源各插件不同。
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.helper.sites import SitesHelper
+from app.log import logger
+from app.utils.string import StringUtils
+
+
+class SiteSnapshot:
+    """
+    某一时刻的站点列表及索引，构建后不再修改，可在多个线程间共享
+    站点信息为只读，需要修改时先复制
+    """
+    __slots__ = ("version", "built_at", "sites", "by_id", "by_name", "by_domain")
+
+    def __init__(self, version: int, entries: Iterable[Tuple[str, Dict[str, Any]]]):
+        self.version = version
+        self.built_at = time.time()
+        self.sites: List[Dict[str, Any]] = []
+        self.by_id: Dict[Any, Dict[str, Any]] = {}
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        self.by_domain: Dict[str, Dict[str, Any]] = {}
+        for domain, site in entries:
+            self.sites.append(site)
+            if site.get("id") is not None:
+                self.by_id[site.get("id")] = site
+            if site.get("name"):
+                self.by_name.setdefault(site.get("name"), site)
+            if domain:
+                self.by_domain.setdefault(domain, site)
+
+    @property
+    def private_sites(self) -> List[Dict[str, Any]]:
+        """非公开站点，保持原有顺序"""
+        return [site for site in self.sites if not site.get("public")]
+
+    def get(self, site_id: Any) -> Optional[Dict[str, Any]]:
+        """按站点 ID 查找，兼容字符串形式的 ID"""
+        site = self.by_id.get(site_id)
+        if site is None and isinstance(site_id, str) and site_id.isdigit():
+            site = self.by_id.get(int(site_id))
+        return site
+
+
+class SiteCache:
+    """
+    站点快照缓存：首次使用或失效后重新加载，站点变更事件调用 invalidate() 使其失效，
+    另有过期时间兜底（站点 Cookie 等也可能在不发送事件的情况下更新）
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[Tuple[str, Dict[str, Any]]]], ttl: int = 300):
+        """
+        :param loader: 加载站点列表，返回 (域名, 站点信息) 序列
+        :param ttl: 快照最长使用时间（秒）
+        """
+        self._loader = loader
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[SiteSnapshot] = None
+
+    def snapshot(self, refresh: bool = False) -> SiteSnapshot:
+        """
+        获取当前快照
+        :param refresh: 忽略缓存重新加载
+        """
+        current = self._snapshot
+        if not refresh and current and time.time() - current.built_at < self._ttl:
+            return current
+        with self._lock:
+            current = self._snapshot
+            if refresh or not current or time.time() - current.built_at >= self._ttl:
+                try:
+                    current = SiteSnapshot(self._version + 1, self._loader())
+                except Exception as e:
+                    logger.error(f"加载站点信息失败：{str(e)}")
+                    # 加载失败时沿用旧快照，没有时返回空快照且不缓存，下次重新加载
+                    return current or SiteSnapshot(self._version, [])
+                self._version = current.version
+                self._snapshot = current
+        return current
+
+    def invalidate(self):
+        """使当前快照失效，下次使用时重新加载"""
+        self._snapshot = None
+
+
+def _load_indexers() -> Iterable[Tuple[str, Dict[str, Any]]]:
+    for site in SitesHelper().get_indexers():
+        yield StringUtils.get_url_domain(site.get("url")), site
+
+
+# 已添加站点的快照，插件内各处共用
+site_cache = SiteCache(_load_indexers)
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 import base64
+import hashlib
+import io
 import re
+import threading
 from abc import ABCMeta, abstractmethod
-from typing import Tuple
+from collections import OrderedDict
+from typing import Tuple, Optional
 
 import chardet
 from ruamel.yaml import CommentedMap
@@ -10,6 +14,7 @@ from ruamel.yaml import CommentedMap
 from app.core.config import settings
 from app.helper.browser import PlaywrightHelper
 from app.log import logger
+from app.plugins.autosigninnew.tracing import span
 from app.utils.http import RequestUtils
 from app.utils.string import StringUtils
 
@@ -22,6 +27,17 @@ class _ISiteSigninHandler(metaclass=ABCMeta):
     # 匹配的站点Url，每一个实现类都需要设置为自己的站点Url
     site_url = ""
 
+    # 发送给大模型前的图片处理方式：最长边像素、编码格式、编码参数
+    # captcha：验证码保持无损，避免字符边缘失真；poster：海报缩放后有损压缩
+    _image_profiles = {
+        "captcha": {"max_side": 320, "format": "PNG", "mime": "image/png", "params": {"optimize": True}},
+        "poster": {"max_side": 768, "format": "JPEG", "mime": "image/jpeg", "params": {"quality": 80, "optimize": True}},
+    }
+    # 处理后的图片缓存 {(内容哈希, 用途): data URI}，重试时不重复处理
+    _image_cache: OrderedDict = OrderedDict()
+    _image_cache_size = 32
+    _image_cache_lock = threading.Lock()
+
     @abstractmethod
     def match(self, url: str) -> bool:
         """
@@ -57,11 +73,12 @@ class _ISiteSigninHandler(metaclass=ABCMeta):
         :return: 页面源码，错误信息
         """
         if render:
-            return PlaywrightHelper().get_page_source(url=url,
-                                                      cookies=cookie,
-                                                      ua=ua,
-                                                      proxies=settings.PROXY_SERVER if proxy else None,
-                                                      timeout=timeout or 60)
+            with span("fetch"):
+                return PlaywrightHelper().get_page_source(url=url,
+                                                          cookies=cookie,
+                                                          ua=ua,
+                                                          proxies=settings.PROXY_SERVER if proxy else None,
+                                                          timeout=timeout or 60)
         else:
             if token:
                 headers = {
@@ -73,23 +90,26 @@ class _ISiteSigninHandler(metaclass=ABCMeta):
                     "User-Agent": ua,
                     "Cookie": cookie
                 }
-            res = RequestUtils(headers=headers,
-                               proxies=settings.PROXY if proxy else None,
-                               timeout=timeout or 20).get_res(url=url)
+            with span("fetch") as s:
+                res = RequestUtils(headers=headers,
+                                   proxies=settings.PROXY if proxy else None,
+                                   timeout=timeout or 20).get_res(url=url)
+                s.response(res)
             if res is not None:
                 # 使用chardet检测字符编码
                 raw_data = res.content
-                if raw_data:
-                    try:
-                        result = chardet.detect(raw_data)
-                        encoding = result['encoding']
-                        # 解码为字符串
-                        return raw_data.decode(encoding)
-                    except Exception as e:
-                        logger.error(f"chardet解码失败：{str(e)}")
+                with span("decode"):
+                    if raw_data:
+                        try:
+                            result = chardet.detect(raw_data)
+                            encoding = result['encoding']
+                            # 解码为字符串
+                            return raw_data.decode(encoding)
+                        except Exception as e:
+                            logger.error(f"chardet解码失败：{str(e)}")
+                            return res.text
+                    else:
                         return res.text
-                else:
-                    return res.text
             return ""
 
     @staticmethod
@@ -97,34 +117,88 @@ class _ISiteSigninHandler(metaclass=ABCMeta):
         """
         判断是否签到成功
         """
-        html_text = re.sub(r"#\d+", "", re.sub(r"\d+px", "", html_res))
-        for regex in regexs:
-            if re.search(str(regex), html_text):
-                return True
-        return False
+        with span("parse"):
+            html_text = re.sub(r"#\d+", "", re.sub(r"\d+px", "", html_res))
+            for regex in regexs:
+                if re.search(str(regex), html_text):
+                    return True
+            return False
 
     @staticmethod
-    def download_image(img_url, site_cookie, ua, proxy, site):
+    def download_image(img_url, site_cookie, ua, proxy, site, purpose: str = "poster"):
         """
         Download image and convert to base64 data URI.
+        :param purpose: 图片用途（captcha/poster），决定缩放与编码方式，为空时不处理
+        """
+        image, mime_type = _ISiteSigninHandler.fetch_image(img_url, site_cookie, ua, proxy, site)
+        if not image:
+            return False, ''
+
+        return True, _ISiteSigninHandler.prepare_image(image, mime_type, purpose)
+
+    @staticmethod
+    def fetch_image(img_url, site_cookie, ua, proxy, site) -> Tuple[Optional[bytes], str]:
         """
-        img_res = RequestUtils(cookies=site_cookie,
-                               ua=ua,
-                               proxies=proxy).get_res(url=img_url)
+        下载图片
+        :return: 图片内容、MIME 类型，失败时返回 None, ''
+        """
+        with span("fetch") as s:
+            img_res = RequestUtils(cookies=site_cookie,
+                                   ua=ua,
+                                   proxies=settings.PROXY if proxy else None).get_res(url=img_url)
+            s.response(img_res)
         if not img_res or img_res.status_code != 200:
             logger.error(f"{site} 获取图片 {img_url} 请求失败")
-            return False, ''
+            return None, ''
 
         # Get MIME type
         content_type = img_res.headers.get('Content-Type', '')
         mime_type = _ISiteSigninHandler.__detect_mime_type(content_type, img_res.content)
 
         if not mime_type:
-            return False, ''
+            return None, ''
+
+        return img_res.content, mime_type
 
-        # Base64 encoding
-        img_base64 = base64.b64encode(img_res.content).decode('utf-8')
-        return True, f"data:{mime_type};base64,{img_base64}"
+    @staticmethod
+    def prepare_image(data: bytes, mime_type: str, purpose: Optional[str] = None) -> str:
+        """
+        将图片处理为发送给大模型的 data URI：按用途缩放、重新编码并去除元数据，结果按内容哈希缓存
+        处理失败或未安装 Pillow 时使用原图
+        """
+        profile = _ISiteSigninHandler._image_profiles.get(purpose) if purpose else None
+        if not profile:
+            return f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+        cache_key = (hashlib.sha1(data).hexdigest(), purpose)
+        cache = _ISiteSigninHandler._image_cache
+        with _ISiteSigninHandler._image_cache_lock:
+            if cache_key in cache:
+                cache.move_to_end(cache_key)
+                return cache[cache_key]
+
+        try:
+            from PIL import Image
+
+            with Image.open(io.BytesIO(data)) as image:
+                # 动图只取第一帧；统一转为 RGB，丢弃透明通道与 EXIF 等元数据
+                image.seek(0)
+                image = image.convert("RGB")
+                image.thumbnail((profile["max_side"], profile["max_side"]))
+                buffer = io.BytesIO()
+                image.save(buffer, format=profile["format"], **profile["params"])
+            encoded, mime_type = buffer.getvalue(), profile["mime"]
+            logger.debug(f"图片处理完成（{purpose}）：{len(data)} -> {len(encoded)} 字节")
+        except Exception as e:
+            logger.debug(f"图片处理失败，使用原图：{str(e)}")
+            encoded = data
+
+        data_uri = f"data:{mime_type};base64,{base64.b64encode(encoded).decode('utf-8')}"
+        with _ISiteSigninHandler._image_cache_lock:
+            cache[cache_key] = data_uri
+            while len(cache) > _ISiteSigninHandler._image_cache_size:
+                cache.popitem(last=False)
+        return data_uri
 
     @staticmethod
     def __detect_mime_type(content_type: str, data: bytes) -> str:
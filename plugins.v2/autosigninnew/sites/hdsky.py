@@ -1,13 +1,14 @@
 import json
 import time
-from typing import Tuple
+from typing import Optional, Tuple
 
 from ruamel.yaml import CommentedMap
 
 from app.core.config import settings
-from app.helper.ocr import OcrHelper
 from app.log import logger
+from app.plugins.autosigninnew.captcha import CaptchaSolver
 from app.plugins.autosigninnew.sites import _ISiteSigninHandler
+from app.plugins.autosigninnew.tracing import span
 from app.utils.http import RequestUtils
 from app.utils.string import StringUtils
 
@@ -66,76 +67,72 @@ class HDSky(_ISiteSigninHandler):
             logger.info(f"{site} 今日已签到")
             return True, '今日已签到'
 
-        # 获取验证码请求，考虑到网络问题获取失败，多获取几次试试
-        res_times = 0
-        img_hash = None
-        while not img_hash and res_times <= 3:
-            image_res = RequestUtils(cookies=site_cookie,
-                                     ua=ua,
-                                     content_type='application/x-www-form-urlencoded; charset=UTF-8',
-                                     referer="https://hdsky.me/index.php",
-                                     accept_type="*/*",
-                                     proxies=settings.PROXY if proxy else None,
-                                     timeout=timeout
-                                     ).post_res(url='https://hdsky.me/image_code_ajax.php',
-                                                data={'action': 'new'})
-            if image_res and image_res.status_code == 200:
-                image_json = json.loads(image_res.text)
-                if image_json["success"]:
-                    img_hash = image_json["code"]
-                    break
-                res_times += 1
-                logger.info(f"获取 {site} 验证码失败，正在进行重试，目前重试次数：{res_times}")
-                time.sleep(1)
-
-        # 获取到二维码hash
-        if img_hash:
-            # 完整验证码url
-            img_get_url = 'https://hdsky.me/image.php?action=regimage&imagehash=%s' % img_hash
-            logger.info(f"获取到 {site} 验证码链接：{img_get_url}")
-            # ocr识别多次，获取6位验证码
-            times = 0
-            ocr_result = None
-            # 识别几次
-            while times <= 3:
-                # ocr二维码识别
-                ocr_result = OcrHelper().get_captcha_text(image_url=img_get_url,
-                                                          cookie=site_cookie,
-                                                          ua=ua)
-                logger.info(f"OCR识别 {site} 验证码：{ocr_result}")
-                if ocr_result:
-                    if len(ocr_result) == 6:
-                        logger.info(f"OCR识别 {site} 验证码成功：{ocr_result}")
+        # 每次尝试都获取新的验证码：同一张图片已由全部识别器识别过，重复识别没有意义
+        solver = CaptchaSolver(site=site, openai=site_info.get("openai"), length=6)
+        img_hash, ocr_result = None, None
+        for times in range(1, 5):
+            img_hash = self.__new_captcha(site_cookie, ua, proxy, timeout)
+            if img_hash:
+                # 完整验证码url
+                img_get_url = 'https://hdsky.me/image.php?action=regimage&imagehash=%s' % img_hash
+                logger.info(f"获取到 {site} 验证码链接：{img_get_url}")
+                # 按识别器实测准确率与耗时依次识别，获取6位验证码
+                image, mime_type = self.fetch_image(img_get_url, site_cookie, ua, proxy, site)
+                if image:
+                    ocr_result = solver.solve(image, mime_type)
+                    if ocr_result:
                         break
-                times += 1
-                logger.info(f"OCR识别 {site} 验证码失败，正在进行重试，目前重试次数：{times}")
-                time.sleep(1)
+            logger.info(f"获取或识别 {site} 验证码失败，更换验证码重试，目前重试次数：{times}")
+            time.sleep(1)
 
-            if ocr_result:
-                # 组装请求参数
-                data = {
-                    'action': 'showup',
-                    'imagehash': img_hash,
-                    'imagestring': ocr_result
-                }
-                # 访问签到链接
+        if ocr_result:
+            # 组装请求参数
+            data = {
+                'action': 'showup',
+                'imagehash': img_hash,
+                'imagestring': ocr_result
+            }
+            # 访问签到链接
+            with span("submit"):
                 res = RequestUtils(cookies=site_cookie,
                                    ua=ua,
                                    referer=referer,
                                    proxies=settings.PROXY if proxy else None
                                    ).post_res(url='https://hdsky.me/showup.php', data=data)
-                if res and res.status_code == 200:
-                    if json.loads(res.text)["success"]:
-                        logger.info(f"{site} 签到成功")
-                        return True, '签到成功'
-                    elif str(json.loads(res.text)["message"]) == "date_unmatch":
-                        # 重复签到
-                        logger.warn(f"{site} 重复成功")
-                        return True, '今日已签到'
-                    elif str(json.loads(res.text)["message"]) == "invalid_imagehash":
-                        # 验证码错误
-                        logger.warn(f"{site} 签到失败：验证码错误")
-                        return False, '签到失败：验证码错误'
+            if res and res.status_code == 200:
+                if json.loads(res.text)["success"]:
+                    solver.report(True)
+                    logger.info(f"{site} 签到成功")
+                    return True, '签到成功'
+                elif str(json.loads(res.text)["message"]) == "date_unmatch":
+                    # 重复签到
+                    logger.warn(f"{site} 重复成功")
+                    return True, '今日已签到'
+                elif str(json.loads(res.text)["message"]) == "invalid_imagehash":
+                    # 验证码错误
+                    solver.report(False)
+                    logger.warn(f"{site} 签到失败：验证码错误")
+                    return False, '签到失败：验证码错误'
 
         logger.error(f'{site} 签到失败：未获取到验证码')
         return False, '签到失败：未获取到验证码'
+
+    @staticmethod
+    def __new_captcha(site_cookie: str, ua: str, proxy: bool, timeout: int) -> Optional[str]:
+        """请求新的验证码，返回验证码 hash，失败返回 None"""
+        image_res = RequestUtils(cookies=site_cookie,
+                                 ua=ua,
+                                 content_type='application/x-www-form-urlencoded; charset=UTF-8',
+                                 referer="https://hdsky.me/index.php",
+                                 accept_type="*/*",
+                                 proxies=settings.PROXY if proxy else None,
+                                 timeout=timeout
+                                 ).post_res(url='https://hdsky.me/image_code_ajax.php',
+                                            data={'action': 'new'})
+        if not image_res or image_res.status_code != 200:
+            return None
+        try:
+            image_json = json.loads(image_res.text)
+        except ValueError:
+            return None
+        return image_json.get("code") if image_json.get("success") else None
@@ -1,14 +1,15 @@
 import json
 import time
-from typing import Tuple
+from typing import Optional, Tuple
 
 from lxml import etree
 from ruamel.yaml import CommentedMap
 
 from app.core.config import settings
-from app.helper.ocr import OcrHelper
 from app.log import logger
+from app.plugins.autosigninnew.captcha import CaptchaSolver
 from app.plugins.autosigninnew.sites import _ISiteSigninHandler
+from app.plugins.autosigninnew.tracing import span
 from app.utils.http import RequestUtils
 from app.utils.string import StringUtils
 
@@ -74,38 +75,34 @@ class Opencd(_ISiteSigninHandler):
             logger.error(f"{site} 签到失败，请检查站点连通性")
             return False, '签到失败，请检查站点连通性'
 
-        # 没有签到则解析html
-        html = etree.HTML(html_text)
-        if not html:
-            return False, '签到失败'
-
         # 签到参数
-        img_url = html.xpath('//form[@id="frmSignin"]//img/@src')[0]
-        img_hash = html.xpath('//form[@id="frmSignin"]//input[@name="imagehash"]/@value')[0]
+        img_url, img_hash = self.__captcha_params(html_text)
         if not img_url or not img_hash:
             logger.error(f"{site} 签到失败，获取签到参数失败")
             return False, '签到失败，获取签到参数失败'
 
-        # 完整验证码url
-        img_get_url = 'https://www.open.cd/%s' % img_url
-        logger.debug(f"{site} 获取到{site}验证码链接 {img_get_url}")
-
-        # ocr识别多次，获取6位验证码
-        times = 0
+        # 按识别器实测准确率与耗时依次识别，获取6位验证码
+        solver = CaptchaSolver(site=site, openai=site_info.get("openai"), length=6)
         ocr_result = None
-        # 识别几次
-        while times <= 3:
-            # ocr二维码识别
-            ocr_result = OcrHelper().get_captcha_text(image_url=img_get_url,
-                                                      cookie=site_cookie,
-                                                      ua=ua)
-            logger.debug(f"ocr识别{site}验证码 {ocr_result}")
-            if ocr_result:
-                if len(ocr_result) == 6:
-                    logger.info(f"ocr识别{site}验证码成功 {ocr_result}")
-                    break
-            times += 1
-            logger.debug(f"ocr识别{site}验证码失败，正在进行重试，目前重试次数 {times}")
+        for times in range(1, 5):
+            if times > 1:
+                # 同一张验证码已由全部识别器识别过，重新打开签到页获取新的验证码
+                html_text = self.get_page_source(url='https://www.open.cd/plugin_sign-in.php',
+                                                 cookie=site_cookie,
+                                                 ua=ua,
+                                                 proxy=proxy,
+                                                 render=render)
+                img_url, img_hash = self.__captcha_params(html_text)
+            if img_url and img_hash:
+                # 完整验证码url
+                img_get_url = 'https://www.open.cd/%s' % img_url
+                logger.debug(f"{site} 获取到{site}验证码链接 {img_get_url}")
+                image, mime_type = self.fetch_image(img_get_url, site_cookie, ua, proxy, site)
+                if image:
+                    ocr_result = solver.solve(image, mime_type)
+                    if ocr_result:
+                        break
+            logger.debug(f"获取或识别{site}验证码失败，更换验证码重试，目前重试次数 {times}")
             time.sleep(1)
 
         if ocr_result:
@@ -115,20 +112,35 @@ class Opencd(_ISiteSigninHandler):
                 'imagestring': ocr_result
             }
             # 访问签到链接
-            sign_res = RequestUtils(cookies=site_cookie,
-                                    ua=ua,
-                                    proxies=settings.PROXY if proxy else None
-                                    ).post_res(url='https://www.open.cd/plugin_sign-in.php?cmd=signin', data=data)
+            with span("submit"):
+                sign_res = RequestUtils(cookies=site_cookie,
+                                        ua=ua,
+                                        proxies=settings.PROXY if proxy else None
+                                        ).post_res(url='https://www.open.cd/plugin_sign-in.php?cmd=signin', data=data)
             if sign_res and sign_res.status_code == 200:
                 logger.debug(f"sign_res返回 {sign_res.text}")
                 # sign_res.text = '{"state":"success","signindays":"0","integral":"10"}'
                 sign_dict = json.loads(sign_res.text)
                 if sign_dict['state']:
+                    solver.report(True)
                     logger.info(f"{site} 签到成功")
                     return True, '签到成功'
                 else:
+                    solver.report(False)
                     logger.error(f"{site} 签到失败，签到接口返回 {sign_dict}")
                     return False, '签到失败'
 
         logger.error(f'{site} 签到失败：未获取到验证码')
         return False, '签到失败：未获取到验证码'
+
+    @staticmethod
+    def __captcha_params(html_text: str) -> Tuple[Optional[str], Optional[str]]:
+        """从签到页解析验证码图片地址与 imagehash，失败返回 None, None"""
+        html = etree.HTML(html_text) if html_text else None
+        if html is None:
+            return None, None
+        img_url = html.xpath('//form[@id="frmSignin"]//img/@src')
+        img_hash = html.xpath('//form[@id="frmSignin"]//input[@name="imagehash"]/@value')
+        if not img_url or not img_hash:
+            return None, None
+        return img_url[0], img_hash[0]
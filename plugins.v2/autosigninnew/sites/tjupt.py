@@ -102,7 +102,7 @@ class Tjupt(_ISiteSigninHandler):
         answers = list(zip(values, options))
         logger.info(f"获取到所有签到选项 {options}")
 
-        ok, img_base64 = self.download_image(img_url, site_cookie, ua, proxy, site)
+        ok, img_base64 = self.download_image(img_url, site_cookie, ua, proxy, site, purpose="poster")
         if not ok:
             logger.error(f"签到失败，图片获取失败 {img_url}")
             return False, '签到失败，图片获取失败'
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, List
+
+# 签到|登录过程的耗时阶段，序号即存储时的阶段编号
+# wait：发出请求直至收到响应头，即首字节时间（含 DNS、建连、TLS 与站点处理，requests 不单独暴露建连耗时），fetch：下载响应体
+PHASES = ("wait", "fetch", "decode", "parse", "ocr", "llm", "submit")
+PHASE_NAMES = {
+    "wait": "等待响应",
+    "fetch": "下载",
+    "decode": "解码",
+    "parse": "解析",
+    "ocr": "OCR",
+    "llm": "大模型",
+    "submit": "提交",
+}
+
+_local = threading.local()
+
+
+def _ms(seconds: float) -> int:
+    return int(round(seconds * 1000))
+
+
+class SiteTrace:
+    """
+    单个站点一次签到|登录的耗时记录，只在执行该站点的线程中写入
+    """
+    __slots__ = ("site", "started", "total", "spans", "active")
+
+    def __init__(self, site: str):
+        self.site = site
+        self.started = time.perf_counter()
+        self.total = 0.0
+        # [(阶段序号, 相对站点开始的秒数, 耗时秒数)]
+        self.spans: List[tuple] = []
+        # 进行中的阶段，同一阶段嵌套时只记录最外层
+        self.active = set()
+
+    def add(self, phase: str, start: float, duration: float):
+        self.spans.append((PHASES.index(phase), start - self.started, duration))
+
+    def to_row(self, run_started: float, success: bool) -> list:
+        """
+        编码为紧凑的存储行（毫秒）：
+        [站点, 相对本次执行开始, 总耗时, 是否成功, 阶段序号, 相对站点开始, 耗时, 阶段序号, ...]
+        """
+        row = [self.site, _ms(self.started - run_started), _ms(self.total), 1 if success else 0]
+        for idx, offset, duration in self.spans:
+            row += [idx, _ms(offset), _ms(duration)]
+        return row
+
+
+class _Span:
+    __slots__ = ("elapsed",)
+
+    def __init__(self):
+        self.elapsed: Optional[float] = None
+
+    def response(self, res):
+        """记录响应头到达耗时（requests 的 elapsed），这部分计入 wait 阶段"""
+        elapsed = getattr(res, "elapsed", None)
+        if elapsed is not None:
+            self.elapsed = elapsed.total_seconds()
+
+
+@contextmanager
+def site_trace(site: str):
+    """在当前线程中记录一个站点的耗时，结束时写入总耗时"""
+    trace = SiteTrace(site)
+    previous = getattr(_local, "trace", None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        trace.total = time.perf_counter() - trace.started
+        _local.trace = previous
+
+
+@contextmanager
+def span(phase: str):
+    """
+    记录一个阶段的耗时，当前线程没有进行中的站点记录时不做任何事
+    对 HTTP 请求调用 span.response(res)，响应头之前的耗时单独计为 wait
+    """
+    current = _Span()
+    trace: Optional[SiteTrace] = getattr(_local, "trace", None)
+    if trace is None or phase in trace.active:
+        yield current
+        return
+
+    trace.active.add(phase)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        duration = time.perf_counter() - start
+        trace.active.discard(phase)
+        wait = min(current.elapsed, duration) if current.elapsed else 0
+        if wait:
+            trace.add("wait", start, wait)
+        trace.add(phase, start + wait, duration - wait)
@@ -1,23 +1,36 @@
 # 标准库
+import contextlib
+import random
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 # 第三方库
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from fastapi.responses import PlainTextResponse
 
 # 应用程序
 from app.core.config import settings
-from app.core.event import eventmanager
-from app.helper.sites import SitesHelper
+from app.core.event import eventmanager, Event
 from app.helper.module import ModuleHelper
-from app.helper.browser import PlaywrightHelper
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas import NotificationType
 from app.schemas.types import EventType
 from app.utils.http import RequestUtils
+from .metrics import metrics
+from .sitecache import site_cache
+from .sites import _ISiteOpenCheckHandler, SessionPool
+from .ui_components import SiteOpenCheckUIComponents
+
+# 请求录制|回放与自动签到插件共用一份实现，未安装自动签到插件时不可用
+try:
+    from app.plugins.autosigninnew.fixtures import HttpFixture
+except ImportError:
+    HttpFixture = None
 
 
 class SiteOpenCheck(_PluginBase):
@@ -28,7 +41,7 @@ class SiteOpenCheck(_PluginBase):
     # 插件图标
     plugin_icon = "signin.png"
     # 插件版本
-    plugin_version = "2.4"
+    plugin_version = "3.13"
     # 插件作者
     plugin_author = "liheji"
     # 作者主页
@@ -42,11 +55,18 @@ class SiteOpenCheck(_PluginBase):
 
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
-    # 站点助手实例
-    sites: SitesHelper = None
     # 加载的站点处理器
     _site_schema: list = []
 
+    # 异常站点退避基数（秒），每连续失败一次翻倍
+    BACKOFF_BASE = 3600
+    # 异常站点退避上限（秒）
+    BACKOFF_MAX = 7 * 24 * 3600
+    # 状态变更日志最多保留条数
+    MAX_EVENTS = 500
+    # 状态名称
+    STATUS_NAMES = {"open": "开注", "closed": "关闭", "error": "异常", "unknown": "未知"}
+
     # 配置属性
     _enabled: bool = False
     _cron: str = ""
@@ -54,14 +74,22 @@ class SiteOpenCheck(_PluginBase):
     _notify: bool = False
     _timeout: int = 15
     _retry_interval: int = 5
+    # 正常站点最短复查间隔（小时），0 表示每次都检查
+    _check_interval: int = 6
+    # 请求录制|回放：空-关闭，record-录制，replay-回放
+    _fixture_mode: str = ""
+    # (站点快照版本, 过滤后的站点)
+    _filtered_sites: Tuple[int, Dict[str, Any]] = (0, {})
+    # 进行中的检查使用的会话池（含仿真浏览器），停止服务时关闭
+    _active_pools: Set[SessionPool] = set()
+    _active_pools_lock = threading.Lock()
 
     def init_plugin(self, config: dict = None):
         """初始化插件"""
         # 停止现有任务
         self.stop_service()
-
-        # 初始化助手
-        self.sites = SitesHelper()
+        # 旧版本保存的视图状态，视图已改由页面组件自身保存
+        self.del_data('page_view')
 
         # 配置
         if config:
@@ -70,6 +98,8 @@ class SiteOpenCheck(_PluginBase):
             self._onlyonce = config.get("onlyonce")
             self._notify = config.get("notify")
             self._timeout = config.get("timeout", 15)
+            self._check_interval = int(config.get("check_interval", 6) or 0)
+            self._fixture_mode = config.get("fixture_mode") or ""
 
             # 保存配置
             self.__update_config()
@@ -86,6 +116,7 @@ class SiteOpenCheck(_PluginBase):
             self._scheduler = BackgroundScheduler(timezone=settings.TZ)
             logger.info("站点开注检查服务启动，立即运行一次")
             self._scheduler.add_job(func=self.__check_all_sites, trigger='date',
+                                    kwargs={"force": True},
                                     run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(seconds=3),
                                     name="站点开注检查")
 
@@ -109,7 +140,9 @@ class SiteOpenCheck(_PluginBase):
             "onlyonce": self._onlyonce,
             "notify": self._notify,
             "cron": self._cron,
-            "timeout": self._timeout
+            "timeout": self._timeout,
+            "check_interval": self._check_interval,
+            "fixture_mode": self._fixture_mode
         })
 
     def get_service(self) -> List[Dict[str, Any]]:
@@ -125,25 +158,45 @@ class SiteOpenCheck(_PluginBase):
         return []
 
     def __get_all_sites(self) -> Dict[str, Any]:
-        """获取过滤后的站点列表，保留 public=false 的站点"""
-        all_sites = self.sites.get_indexsites()
-        if not all_sites:
+        """获取过滤后的站点列表，保留 public=false 的站点，站点快照未变化时复用上次结果"""
+        snapshot = site_cache.snapshot()
+        if not snapshot.sites:
             logger.error("未获取到站点信息")
             return {}
 
-        # 过滤站点，保留 public=false 的站点
-        filtered_sites = {}
-        for domain, site_info in all_sites.items():
-            # 私有站点 & 没有其他域名
-            if not site_info.get("public", True) and domain in site_info.get("url", ""):
-                filtered_sites[domain] = site_info
+        version, filtered_sites = self._filtered_sites
+        if version != snapshot.version:
+            # 过滤站点，保留 public=false 的站点
+            filtered_sites = {}
+            for domain, site_info in snapshot.by_domain.items():
+                # 私有站点 & 没有其他域名
+                if not site_info.get("public", True) and domain in site_info.get("url", ""):
+                    filtered_sites[domain] = site_info
+            self._filtered_sites = (snapshot.version, filtered_sites)
 
         logger.info(f"获取到 {len(filtered_sites)} 个PT站点")
         return filtered_sites
 
-    def __check_all_sites(self):
-        """检查所有站点的开注状态"""
-        logger.info("开始检查所有站点的开注状态")
+    def __check_all_sites(self, force: bool = False):
+        """
+        检查所有站点的开注状态
+        :param force: 忽略退避计划，强制检查全部站点
+        """
+        fixture_mode = self._fixture_mode
+        if fixture_mode and HttpFixture is None:
+            logger.warn("未安装自动签到插件，请求录制|回放不可用，按正常方式检查")
+            fixture_mode = ""
+        # 回放时检查全部站点，结果只输出日志
+        replay = fixture_mode == "replay"
+        force = force or replay
+        fixture = HttpFixture(self.get_data_path() / "fixtures", fixture_mode) \
+            if HttpFixture and fixture_mode in HttpFixture.MODES else None
+        logger.info(f"开始{'回放' if replay else '检查'}所有站点的开注状态")
+        sweep_start = time.perf_counter()
+        # 本轮检查复用的会话与仿真浏览器
+        sessions = SessionPool(_ISiteOpenCheckHandler._ua)
+        with self._active_pools_lock:
+            self._active_pools.add(sessions)
         try:
             # 获取过滤后的站点
             all_sites = self.__get_all_sites()
@@ -157,81 +210,202 @@ class SiteOpenCheck(_PluginBase):
             closed_sites = []
             error_sites = []
 
-            old_check_results = self.get_data('check_results') or []
-            skip_sites = set()
-            for s in old_check_results:
-                if s.get('status') == 'error' or s.get('status') == 'unknown':
-                    skip_sites.add(s.get("domain"))
-                    check_results.append(s)
-                    error_sites.append(s)
+            # 上次检查结果与下次检查计划
+            old_results = {s.get("domain"): s for s in (self.get_data('check_results') or []) if s.get("domain")}
+            schedule = self.get_data('check_schedule') or {}
+            checked_count = 0
+            # 本次检查发生的状态变更
+            changes = []
 
             # 遍历所有站点
             for domain, site_info in all_sites.items():
+                now_ts = time.time()
+                entry = schedule.get(domain) or {}
                 try:
-                    if domain in skip_sites:
-                        logger.info(f"检测到上次访问该站点时出错，跳过站点 {domain} 的检查")
-                        continue
-
-                    site_name = site_info.get("name", domain)
-                    site_url = site_info.get("url", f"https://{domain}")
-
-                    # 检查站点开注状态（全部委托给处理器）
-                    check_result = self.__check_site_registration(site_info)
-
-                    # 直接使用处理器返回的结果，只添加必要的字段
-                    result = check_result.copy()
-                    result.update({
-                        "domain": domain,
-                        "name": site_name,
-                        "url": site_url,
-                        "check_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    })
-                    check_results.append(result)
-
-                    status = result.get("status", "unknown")
-                    if status == "open":
-                        open_sites.append(result)
-                    elif status == "closed":
-                        closed_sites.append(result)
+                    if not force and domain in old_results and entry.get("next_check", 0) > now_ts:
+                        # 未到检查时间，沿用上次结果
+                        result = old_results[domain]
+                        metrics.inc("site_skips_total")
+                        logger.debug(f"站点 {domain} 未到检查时间，"
+                                     f"下次检查: {datetime.fromtimestamp(entry['next_check']):%Y-%m-%d %H:%M:%S}")
                     else:
-                        error_sites.append(result)
+                        site_name = site_info.get("name", domain)
+                        site_url = site_info.get("url", f"https://{domain}")
+
+                        # 检查站点开注状态（全部委托给处理器）
+                        check_start = time.perf_counter()
+                        with fixture.use(domain) if fixture else contextlib.nullcontext():
+                            check_result = self.__check_site_registration(site_info, entry.get("tier"), sessions)
+                        checked_count += 1
+                        if not replay:
+                            metrics.observe("site_check_duration_seconds", time.perf_counter() - check_start)
+                            metrics.inc("site_checks_total", status=check_result.get("status", "unknown"),
+                                        tier=check_result.get("tier", "http"))
+
+                        # 直接使用处理器返回的结果，只添加必要的字段
+                        result = check_result.copy()
+                        tier = result.pop("tier", "http")
+                        result.update({
+                            "domain": domain,
+                            "name": site_name,
+                            "url": site_url,
+                            "check_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        })
+                        schedule[domain] = self.__next_schedule(entry, result.get("status", "unknown"), now_ts)
+                        # 记录页面获取方式，检查失败时下次重新探测
+                        if tier != "http" and result.get("status") != "error":
+                            schedule[domain]["tier"] = tier
 
                 except Exception as e:
-                    logger.error(f"检查站点 {site_info.get('id', 'unknown')} 时发生错误: {str(e)}")
-                    error_sites.append({
-                        "domain": site_info.get("id", ""),
-                        "name": site_info.get("name", site_info.get("id", "unknown")),
-                        "url": site_info.get("url", f"https://{site_info.get('id', 'unknown')}"),
+                    logger.error(f"检查站点 {domain} 时发生错误: {str(e)}")
+                    result = {
+                        "domain": domain,
+                        "name": site_info.get("name", domain),
+                        "url": site_info.get("url", f"https://{domain}"),
                         "status": "error",
                         "message": f"检查失败: {str(e)}",
                         "check_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    })
+                    }
+                    schedule[domain] = self.__next_schedule(entry, "error", now_ts)
+
+                # 与上次结果对比，记录状态变更
+                if result is not old_results.get(domain):
+                    change = self.__build_change(old_results.get(domain), result)
+                    if change:
+                        changes.append(change)
+
+                check_results.append(result)
+                status = result.get("status", "unknown")
+                if status == "open":
+                    open_sites.append(result)
+                elif status == "closed":
+                    closed_sites.append(result)
+                else:
+                    error_sites.append(result)
+
+            if replay:
+                for result in check_results:
+                    logger.info(f"[回放] {result.get('name')}：{self.STATUS_NAMES.get(result.get('status'), '未知')}，"
+                                f"{result.get('message', '')}")
+                logger.info(f"站点开注回放完成，共 {len(check_results)} 个站点，开注 {len(open_sites)} 个，"
+                            f"关闭 {len(closed_sites)} 个，异常 {len(error_sites)} 个")
+                return
 
-            # 保存检查结果
+            # 保存检查结果，已移除的站点不再保留
             self.save_data('check_results', check_results)
+            self.save_data('page_model', SiteOpenCheckUIComponents.build_page_model(check_results))
+            self.save_data('check_schedule', {d: v for d, v in schedule.items() if d in all_sites})
+            if changes:
+                self.__append_events(changes)
 
-            # 发送通知
-            if self._notify:
-                self.__send_notification(len(check_results), len(open_sites), len(closed_sites), len(error_sites))
+            # 发送通知，仅在状态发生变更时发送
+            if self._notify and changes:
+                self.__send_notification(len(check_results), len(open_sites), len(closed_sites), len(error_sites),
+                                         checked_count, changes)
 
             logger.info(
-                f"站点开注检查完成，共检查 {len(check_results)} 个站点，开注 {len(open_sites)} 个，关闭 {len(closed_sites)} 个，异常 {len(error_sites)} 个")
+                f"站点开注检查完成，共 {len(check_results)} 个站点，本次检查 {checked_count} 个，"
+                f"状态变更 {len(changes)} 个，开注 {len(open_sites)} 个，关闭 {len(closed_sites)} 个，异常 {len(error_sites)} 个")
 
         except Exception as e:
             logger.error(f"检查所有站点时发生错误: {str(e)}")
+        finally:
+            # 关闭本轮检查复用的会话与仿真浏览器
+            with self._active_pools_lock:
+                self._active_pools.discard(sessions)
+            sessions.close()
+            metrics.inc("sweeps_total")
+            metrics.observe("sweep_duration_seconds", time.perf_counter() - sweep_start)
+
+    def __next_schedule(self, entry: Dict[str, Any], status: str, now_ts: float) -> Dict[str, Any]:
+        """
+        计算站点下次检查时间
+        正常站点按复查间隔检查，异常站点按连续失败次数指数退避
+        """
+        if status in ("open", "closed"):
+            failures = 0
+            delay = self._check_interval * 3600
+        else:
+            failures = int(entry.get("failures", 0)) + 1
+            delay = min(self.BACKOFF_BASE * 2 ** (failures - 1), self.BACKOFF_MAX)
+        # 随机提前一部分时间，打散同批站点的检查时刻，且不会晚于预期
+        delay = delay * random.uniform(0.8, 1.0)
+        return {
+            "failures": failures,
+            "next_check": int(now_ts + delay)
+        }
+
+    @staticmethod
+    def __build_change(old_result: Optional[Dict[str, Any]], result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """对比上次结果，状态变化时返回变更记录，首次检查的站点不记录"""
+        if not old_result:
+            return None
+        old_status = old_result.get("status", "unknown")
+        new_status = result.get("status", "unknown")
+        if old_status == new_status:
+            return None
+        return {
+            "domain": result.get("domain"),
+            "name": result.get("name"),
+            "from": old_status,
+            "to": new_status,
+            "message": result.get("message", ""),
+            "signup_url": result.get("signup_url", ""),
+            "time": result.get("check_time")
+        }
 
-    def __check_site_registration(self, site_info: Dict[str, Any]) -> Dict[str, Any]:
-        """检查单个站点的注册状态"""
+    def __append_events(self, changes: List[Dict[str, Any]]):
+        """追加状态变更日志，每条记录分配递增序号作为游标"""
+        events = self.get_data('check_events') or []
+        seq = events[-1].get("seq", 0) if events else 0
+        for change in changes:
+            seq += 1
+            events.append({"seq": seq, **change})
+        self.save_data('check_events', events[-self.MAX_EVENTS:])
+
+    def get_changes(self, cursor: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """
+        获取游标之后的站点状态变更，可由API调用
+        变更日志只保留最近 MAX_EVENTS 条，游标早于最早保留的记录时部分变更已被清理，
+        返回 truncated=true，调用方应重新获取全部站点状态
+        :param cursor: 上次返回的游标，0 表示从最早的记录开始
+        :param limit: 最多返回条数
+        """
+        cursor = int(cursor or 0)
+        events = self.get_data('check_events') or []
+        latest = events[-1].get("seq", 0) if events else 0
+        oldest = events[0].get("seq", 0) if events else 0
+        changes = [e for e in events if e.get("seq", 0) > cursor][:max(int(limit), 1)]
+        return {
+            "success": True,
+            "cursor": changes[-1]["seq"] if changes else latest,
+            # 游标与最早保留的记录之间有被清理的变更，或游标超出最新记录（变更日志已重置）
+            "truncated": oldest > cursor + 1 or cursor > latest,
+            "data": changes
+        }
+
+    def __check_site_registration(self, site_info: Dict[str, Any], tier: str = None,
+                                  sessions: SessionPool = None) -> Dict[str, Any]:
+        """
+        检查单个站点的注册状态
+        :param tier: 上次检查使用的页面获取方式，http 或 browser
+        :param sessions: 本轮检查的会话池
+        """
         signup_url = ''
+        handler = None
         try:
             # 使用处理器执行完整检测
             handler = self.__build_ins(site_info.get("url", ""))
+            handler.tier = tier or "http"
+            handler.sessions = sessions
+            handler.proxy = bool(site_info.get("proxy"))
             signup_url = handler.build_signup_url(site_info)
             status, message = handler.check(site_info)
             return {
                 "status": status,
                 "message": message,
-                "signup_url": signup_url
+                "signup_url": signup_url,
+                "tier": handler.tier
             }
         except Exception as e:
             site_name = site_info.get("name", "unknown")
@@ -239,7 +413,8 @@ class SiteOpenCheck(_PluginBase):
             return {
                 "status": "error",
                 "message": f"检查失败: {str(e)}",
-                "signup_url": signup_url
+                "signup_url": signup_url,
+                "tier": handler.tier if handler else "http"
             }
 
     def __build_ins(self, url) -> Any:
@@ -263,10 +438,17 @@ class SiteOpenCheck(_PluginBase):
         ret_ins.init(self._timeout, self._retry_interval)
         return ret_ins
 
-    def __send_notification(self, total: int, open_count: int, closed_count: int, error_count: int):
+    def __send_notification(self, total: int, open_count: int, closed_count: int, error_count: int,
+                            checked_count: int, changes: List[Dict[str, Any]]):
         """发送通知消息"""
         text_message = f"站点开注检查完成！\n\n"
+        text_message += f"状态变更: {len(changes)}\n"
+        for change in changes:
+            text_message += (f"【{change.get('name')}】{self.STATUS_NAMES.get(change.get('from'), change.get('from'))}"
+                             f" → {self.STATUS_NAMES.get(change.get('to'), change.get('to'))}\n")
+        text_message += "\n"
         text_message += f"总站点数: {total}\n"
+        text_message += f"本次检查: {checked_count}\n"
         text_message += f"开注站点: {open_count}\n"
         text_message += f"关闭注册: {closed_count}\n"
         text_message += f"异常站点: {error_count}\n\n"
@@ -274,7 +456,7 @@ class SiteOpenCheck(_PluginBase):
 
         self.post_message(
             mtype=NotificationType.SiteMessage,
-            title="【站点开注检查】检查完成",
+            title="【站点开注检查】站点状态变更",
             text=text_message
         )
 
@@ -288,6 +470,25 @@ class SiteOpenCheck(_PluginBase):
                 self._scheduler = None
         except Exception as e:
             logger.error("退出插件失败：%s" % str(e))
+        # 关闭进行中检查的仿真浏览器与会话，检查线程随后的请求按失败处理
+        with self._active_pools_lock:
+            pools = list(self._active_pools)
+            self._active_pools.clear()
+        for pool in pools:
+            try:
+                pool.close()
+            except Exception as e:
+                logger.error(f"关闭会话池失败：{str(e)}")
+
+    @eventmanager.register(EventType.SiteUpdated)
+    def site_updated(self, event: Event):
+        """站点更新时刷新站点缓存"""
+        site_cache.invalidate()
+
+    @eventmanager.register(EventType.SiteDeleted)
+    def site_deleted(self, event: Event):
+        """站点删除时刷新站点缓存"""
+        site_cache.invalidate()
 
     def get_api(self) -> List[Dict[str, Any]]:
         """
@@ -298,24 +499,46 @@ class SiteOpenCheck(_PluginBase):
             "endpoint": self.__check_all_sites,
             "methods": ["GET"],
             "summary": "手动检查所有站点开注状态",
-            "description": "立即执行一次站点开注检查",
+            "description": "立即执行一次站点开注检查，force=true 时忽略退避计划检查全部站点",
+        }, {
+            "path": "/check_changes",
+            "endpoint": self.get_changes,
+            "methods": ["GET"],
+            "summary": "获取站点开注状态变更",
+            "description": "返回游标 cursor 之后的状态变更记录（如 关闭→开注），响应中的 cursor 用于下次查询；"
+                           "truncated 为 true 时表示游标之后有记录已被清理，需要重新获取全部站点状态",
+        }, {
+            "path": "/metrics",
+            "endpoint": self.metrics_api,
+            "methods": ["GET"],
+            "auth": "apikey",
+            "summary": "运行指标",
+            "description": "Prometheus 文本格式的开注检查次数、耗时与各站点检查结果统计，使用 apikey 参数认证",
         }]
 
+    @staticmethod
+    def metrics_api(apikey: str = None) -> PlainTextResponse:
+        """API: Prometheus 文本格式的运行指标"""
+        # 接口内再校验 apikey，不依赖主程序版本是否支持路由认证
+        if not apikey or apikey != settings.API_TOKEN:
+            return PlainTextResponse("API密钥错误\n", status_code=401)
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
     def get_page(self) -> list:
         """获取页面数据"""
         try:
-            from .ui_components import SiteOpenCheckUIComponents
-
-            # 获取检查结果
-            check_results = self.get_data('check_results') or []
+            # 获取预先生成的页面模型，旧版本数据则从检查结果生成
+            page_model = self.get_data('page_model')
+            if not page_model:
+                page_model = SiteOpenCheckUIComponents.build_page_model(self.get_data('check_results') or [])
 
             # 创建顶部统计信息
-            top_row = SiteOpenCheckUIComponents.create_top_stats(check_results)
+            top_row = SiteOpenCheckUIComponents.create_top_stats(page_model)
 
-            # 创建站点列表
+            # 创建站点列表，分页、展开与搜索状态由页面组件自身保存
             site_rows = []
-            if check_results:
-                site_rows = SiteOpenCheckUIComponents.create_site_list(check_results)
+            if page_model.get('total'):
+                site_rows = SiteOpenCheckUIComponents.create_site_list(page_model)
 
             # 页面结构
             return [top_row] + site_rows
@@ -502,7 +725,7 @@ class SiteOpenCheck(_PluginBase):
                                                 'component': 'VCol',
                                                 'props': {
                                                     'cols': 12,
-                                                    'sm': 6
+                                                    'sm': 4
                                                 },
                                                 'content': [
                                                     {
@@ -522,7 +745,7 @@ class SiteOpenCheck(_PluginBase):
                                                 'component': 'VCol',
                                                 'props': {
                                                     'cols': 12,
-                                                    'sm': 6
+                                                    'sm': 4
                                                 },
                                                 'content': [
                                                     {
@@ -541,6 +764,58 @@ class SiteOpenCheck(_PluginBase):
                                                         }
                                                     }
                                                 ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'sm': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VSelect',
+                                                        'props': {
+                                                            'model': 'check_interval',
+                                                            'label': '正常站点复查间隔',
+                                                            'hint': '异常站点按失败次数指数退避，最长7天',
+                                                            'persistent-hint': True,
+                                                            'items': [
+                                                                {'title': '每次检查', 'value': 0},
+                                                                {'title': '1小时', 'value': 1},
+                                                                {'title': '6小时', 'value': 6},
+                                                                {'title': '12小时', 'value': 12},
+                                                                {'title': '24小时', 'value': 24}
+                                                            ],
+                                                            'variant': 'outlined',
+                                                            'color': 'primary'
+                                                        }
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'sm': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VSelect',
+                                                        'props': {
+                                                            'model': 'fixture_mode',
+                                                            'label': '请求录制|回放',
+                                                            'hint': '录制保存在插件数据目录，包含站点页面内容；回放不访问站点，只输出日志；需同时安装自动签到插件',
+                                                            'persistent-hint': True,
+                                                            'items': [
+                                                                {'title': '关闭', 'value': ''},
+                                                                {'title': '录制', 'value': 'record'},
+                                                                {'title': '回放', 'value': 'replay'}
+                                                            ],
+                                                            'variant': 'outlined',
+                                                            'color': 'primary'
+                                                        }
+                                                    }
+                                                ]
                                             }
                                         ]
                                     }
@@ -555,5 +830,7 @@ class SiteOpenCheck(_PluginBase):
             "onlyonce": False,
             "notify": False,
             "cron": "0 9 * * *",
-            "timeout": 15
+            "timeout": 15,
+            "check_interval": 6,
+            "fixture_mode": ""
         }
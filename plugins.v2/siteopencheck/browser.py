@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+站点开注检查仿真浏览器池
+1. 同一轮检查复用一个浏览器实例，首次需要时启动，按站点缓存上下文，Cloudflare 验证通过后的 Cookie 在本轮内持续有效。
+2. 上下文数量有上限，超出时关闭最久未使用的上下文。
+3. playwright 同步接口不能跨线程使用，浏览器只在池自己的线程中创建、使用和关闭，检查线程提交任务后等待结果。
+"""
+import concurrent.futures
+import importlib.util
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple, Any, Optional
+
+from app.helper.cloudflare import under_challenge
+from app.log import logger
+from app.utils.string import StringUtils
+
+
+class BrowserPool:
+    """仿真浏览器上下文池"""
+
+    def __init__(self, ua: str, max_contexts: int = 2, headless: bool = True):
+        self._ua = ua
+        self._max_contexts = max(max_contexts, 1)
+        self._headless = headless
+        self._playwright = None
+        self._browser = None
+        # {(domain, 代理): BrowserContext}，按最近使用排序，只在浏览器线程中访问
+        self._contexts: OrderedDict = OrderedDict()
+        self._tasks: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @staticmethod
+    def available() -> bool:
+        """是否安装了 playwright，未安装时由调用方改用 PlaywrightHelper"""
+        return importlib.util.find_spec("playwright") is not None
+
+    def get_page_source(self, url: str, proxy: Optional[dict] = None, timeout: int = 30) -> Tuple[str, str]:
+        """
+        使用仿真浏览器获取页面，等待 Cloudflare 验证完成
+        :param proxy: playwright 代理设置，如 {"server": "http://127.0.0.1:7890"}
+        :return: 页面源码，最终URL
+        """
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("仿真浏览器已关闭")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.__run, name="SiteOpenCheck-browser", daemon=True)
+                self._thread.start()
+            self._tasks.put((url, proxy, timeout, future))
+        # 排队等待其他站点的时间也计入，超时后放弃
+        return future.result(timeout=timeout * 2 + 30)
+
+    def close(self):
+        """关闭全部上下文与浏览器，等待进行中的任务结束"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._tasks.put(None)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=60)
+
+    def __run(self):
+        """浏览器线程：依次处理提交的任务，收到关闭信号后释放浏览器"""
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                url, proxy, timeout, future = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self.__fetch(url, proxy, timeout))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            self.__shutdown()
+
+    def __get_context(self, url: str, proxy: Optional[dict]) -> Any:
+        """获取站点的浏览器上下文，不存在时创建，超出上限时关闭最久未使用的上下文"""
+        if not self._browser:
+            from playwright.sync_api import sync_playwright
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=self._headless)
+            logger.info("仿真浏览器已启动")
+
+        key = (StringUtils.get_url_domain(url), (proxy or {}).get("server"))
+        context = self._contexts.pop(key, None)
+        if context is None:
+            while len(self._contexts) >= self._max_contexts:
+                _, oldest = self._contexts.popitem(last=False)
+                oldest.close()
+            context = self._browser.new_context(user_agent=self._ua, proxy=proxy or None)
+        self._contexts[key] = context
+        return context
+
+    def __fetch(self, url: str, proxy: Optional[dict], timeout: int) -> Tuple[str, str]:
+        page = self.__get_context(url, proxy).new_page()
+        try:
+            page.goto(url, wait_until="domcontentloaded", timeout=timeout * 1000)
+            deadline = time.time() + timeout
+            source = page.content()
+            while under_challenge(source) and time.time() < deadline:
+                page.wait_for_timeout(1000)
+                source = page.content()
+            if under_challenge(source):
+                raise RuntimeError("仿真浏览器无法通过Cloudflare验证")
+            return source, page.url
+        finally:
+            page.close()
+
+    def __shutdown(self):
+        for context in self._contexts.values():
+            try:
+                context.close()
+            except Exception as e:
+                logger.debug(f"关闭浏览器上下文失败：{str(e)}")
+        self._contexts.clear()
+        try:
+            if self._browser:
+                self._browser.close()
+            if self._playwright:
+                self._playwright.stop()
+        except Exception as e:
+            logger.debug(f"关闭仿真浏览器失败：{str(e)}")
+        self._browser = None
+        self._playwright = None
+        # 关闭前仍在排队的任务
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None and task[3].set_running_or_notify_cancel():
+                task[3].set_exception(RuntimeError("仿真浏览器已关闭"))
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# autosigninnew、siteopencheck、tangpinghelper 各有一份相同的 metrics.py：插件独立安装，不能互相导入。
+# 修改 Metrics 时同步三份（tests/test_metrics.py 校验一致），文件末尾的指标声明各插件不同。
+import bisect
+import threading
+from typing import Dict, Tuple, List
+
+# 默认耗时分桶（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Metrics:
+    """
+    进程内计数器与直方图，按 Prometheus 文本格式导出。
+    写入只修改当前线程独占的分片，热路径上不加锁；导出时汇总全部分片，
+    已结束线程的分片并入累计值后丢弃（线程池每次执行都会新建线程）。
+    """
+
+    def __init__(self, namespace: str):
+        self._namespace = namespace
+        # {名称: (类型, 说明, 分桶)}
+        self._meta: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}
+        self._local = threading.local()
+        # [(线程, 分片)]，只在线程首次写入与导出时加锁
+        self._shards: List[Tuple[threading.Thread, dict]] = []
+        # 已结束线程的累计值
+        self._retired: dict = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str):
+        """声明计数器"""
+        self._meta[name] = ("counter", documentation, ())
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """声明直方图"""
+        self._meta[name] = ("histogram", documentation, tuple(sorted(buckets)))
+
+    def __shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器增加 value"""
+        shard = self.__shard()
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """直方图记录一个观测值"""
+        buckets = self._meta[name][2]
+        shard = self.__shard()
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        data = shard.get(key)
+        if data is None:
+            # 各分桶计数（最后一个为 +Inf），末尾为观测值总和
+            data = shard[key] = [0] * (len(buckets) + 1) + [0.0]
+        data[bisect.bisect_left(buckets, value)] += 1
+        data[-1] += value
+
+    @staticmethod
+    def __merge(target: dict, source: dict):
+        for key, value in source.items():
+            if isinstance(value, list):
+                current = target.get(key)
+                target[key] = [a + b for a, b in zip(current, value)] if current else list(value)
+            else:
+                target[key] = target.get(key, 0) + value
+
+    def __collect(self) -> dict:
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self.__merge(self._retired, shard)
+            self._shards = alive
+            total = {}
+            self.__merge(total, self._retired)
+            for _, shard in alive:
+                # 复制后再汇总，写入线程可能同时新增键
+                self.__merge(total, dict(shard))
+        return total
+
+    @staticmethod
+    def __num(value: float) -> str:
+        if value == float("inf"):
+            return "+Inf"
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+    @staticmethod
+    def __labels(labels: tuple) -> str:
+        if not labels:
+            return ""
+        escaped = (f'{k}="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+                   for k, v in labels)
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        series: Dict[str, list] = {}
+        for (name, labels), value in self.__collect().items():
+            series.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, documentation, buckets) in self._meta.items():
+            full_name = f"{self._namespace}_{name}"
+            lines.append(f"# HELP {full_name} {documentation}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in sorted(series.get(name, []), key=lambda item: item[0]):
+                if kind == "counter":
+                    lines.append(f"{full_name}{self.__labels(labels)} {self.__num(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float("inf"),), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{self.__labels(labels + (('le', self.__num(bound)),))} "
+                                 f"{cumulative}")
+                lines.append(f"{full_name}_sum{self.__labels(labels)} {self.__num(value[-1])}")
+                lines.append(f"{full_name}_count{self.__labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics("siteopencheck")
+metrics.counter("sweeps_total", "开注检查执行次数")
+metrics.histogram("sweep_duration_seconds", "一次开注检查的总耗时",
+                  buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200))
+metrics.counter("site_checks_total", "站点开注检查次数，按结果与页面获取方式")
+metrics.histogram("site_check_duration_seconds", "单个站点开注检查耗时")
+metrics.counter("site_skips_total", "未到复查时间、沿用上次结果的站点数")
@@ -1,8 +1,61 @@
 from abc import ABCMeta, abstractmethod
+import threading
 import time
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 
+import requests
+
+from app.core.config import settings
+from app.helper.browser import PlaywrightHelper
+from app.helper.cloudflare import under_challenge
+from app.log import logger
+from app.plugins.siteopencheck.browser import BrowserPool
 from app.utils.http import RequestUtils
+from app.utils.string import StringUtils
+
+
+class SessionPool:
+    """
+    一轮检查复用的会话池 {domain: (会话, 站点状态)}，以及本轮共用的仿真浏览器
+    每轮检查单独创建并在结束时关闭，同时进行的多轮检查互不影响
+    """
+    # 仿真浏览器同时保留的站点上下文数量
+    BROWSER_CONTEXTS = 2
+
+    def __init__(self, ua: str):
+        self._ua = ua
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[requests.Session, Dict[str, Any]]] = {}
+        self._browser: Optional[BrowserPool] = None
+
+    def entry(self, url: str) -> Tuple[requests.Session, Dict[str, Any]]:
+        """获取站点的会话与状态，不存在则创建"""
+        domain = StringUtils.get_url_domain(url)
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry is None:
+                session = requests.Session()
+                session.headers.update({"User-Agent": self._ua})
+                entry = (session, {})
+                self._entries[domain] = entry
+            return entry
+
+    def browser(self) -> Optional[BrowserPool]:
+        """本轮检查共用的仿真浏览器，首次使用时创建；未安装 playwright 时返回 None"""
+        with self._lock:
+            if self._browser is None and BrowserPool.available():
+                self._browser = BrowserPool(self._ua, max_contexts=self.BROWSER_CONTEXTS)
+            return self._browser
+
+    def close(self):
+        """关闭全部会话与仿真浏览器"""
+        with self._lock:
+            for session, _ in self._entries.values():
+                session.close()
+            self._entries.clear()
+            browser, self._browser = self._browser, None
+        if browser:
+            browser.close()
 
 
 class _ISiteOpenCheckHandler(metaclass=ABCMeta):
@@ -12,12 +65,23 @@ class _ISiteOpenCheckHandler(metaclass=ABCMeta):
     - init: 初始化通用配置参数
     - build_signup_url: 返回站点注册页URL，默认 {base_url}/signup.php
     - check: 返回 (status, message)
+    - get_session: 获取本轮检查中该站点复用的会话，会话池由检查流程创建并在结束时关闭
+    - get_page_source: 分层获取页面，普通请求遇到 Cloudflare 验证时改用本轮共用的仿真浏览器池
+      （未安装 playwright 时使用 PlaywrightHelper），所用方式记录在 tier 中，下次检查直接使用；
+      站点设置了代理时两种方式都使用系统代理
     """
 
     site_url = ""
     _timeout = 15
     _retry_interval = 5
     _ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    # 本轮检查的会话池，由检查流程设置，同一轮的处理器共享
+    sessions: Optional[SessionPool] = None
+    # 站点是否使用代理，由检查流程按站点信息设置
+    proxy = False
+
+    # 页面获取方式：http 普通请求，browser 仿真浏览器
+    tier = "http"
 
     @classmethod
     def init(cls, timeout: int = 15, retry_interval: int = 5):
@@ -27,25 +91,75 @@ class _ISiteOpenCheckHandler(metaclass=ABCMeta):
 
     @classmethod
     def match(cls, url: str) -> bool:
-        from app.utils.string import StringUtils
         if not cls.site_url:
             return False
         return StringUtils.url_equal(url, cls.site_url)
 
+    def __pool_entry(self, url: str) -> Tuple[requests.Session, Dict[str, Any]]:
+        """获取站点的会话池条目，未设置会话池时（单独使用处理器）创建处理器自己的会话池"""
+        if self.sessions is None:
+            self.sessions = SessionPool(self._ua)
+        entry = self.sessions.entry(url)
+        if self.proxy and settings.PROXY:
+            entry[0].proxies.update(settings.PROXY)
+        return entry
+
+    def get_session(self, url: str) -> requests.Session:
+        """获取站点在本轮检查中复用的会话，重试与重复检查共用连接"""
+        return self.__pool_entry(url)[0]
+
+    def get_session_state(self, url: str) -> Dict[str, Any]:
+        """获取与站点会话绑定的状态（如 csrf token），随会话一起失效"""
+        return self.__pool_entry(url)[1]
+
+    def get_browser_page_source(self, url: str) -> Tuple[str, str]:
+        """
+        使用仿真浏览器获取页面，等待 Cloudflare 验证完成
+        优先使用本轮检查共用的浏览器池（浏览器与站点上下文常驻），未安装 playwright 时改用 PlaywrightHelper
+        """
+        proxy_server = settings.PROXY_SERVER if self.proxy else None
+        timeout = max(self._timeout, 30)
+        if self.sessions is None:
+            self.sessions = SessionPool(self._ua)
+        browser = self.sessions.browser()
+        if browser:
+            return browser.get_page_source(url, proxy=proxy_server, timeout=timeout)
+
+        page_source = PlaywrightHelper().get_page_source(url=url,
+                                                         ua=self._ua,
+                                                         proxies=proxy_server,
+                                                         timeout=timeout)
+        if not page_source:
+            raise RuntimeError("仿真浏览器获取页面失败")
+        if under_challenge(page_source):
+            raise RuntimeError("仿真浏览器无法通过Cloudflare验证")
+        return page_source, url
+
     def get_page_source(self, url: str) -> Tuple[str, str]:
-        """默认页面获取逻辑：先请求一次，失败重试一次。"""
+        """默认页面获取逻辑：先请求一次，失败重试一次；遇到 Cloudflare 验证时改用仿真浏览器。"""
+        if self.tier == "browser":
+            return self.get_browser_page_source(url)
+
         last_error = None
         for attempt in range(2):
             try:
-                res = RequestUtils(ua=self._ua, timeout=self._timeout).get_res(url=url)
+                res = RequestUtils(ua=self._ua, timeout=self._timeout,
+                                   proxies=settings.PROXY if self.proxy else None,
+                                   session=self.get_session(url)).get_res(url=url)
                 if res is None:
                     raise RuntimeError("无法访问页面，响应为空")
+                if under_challenge(res.text):
+                    logger.info(f"{url} 需要通过Cloudflare验证，改用仿真浏览器获取")
+                    self.tier = "browser"
+                    break
                 if res.status_code != 200:
                     raise RuntimeError(f"无法访问页面，状态码: {res.status_code}")
                 return res.text, str(res.url)
             except Exception as e:
                 last_error = str(e)
                 time.sleep(self._retry_interval)
+        if self.tier == "browser":
+            return self.get_browser_page_source(url)
         raise RuntimeError(last_error or "未知错误")
 
     @abstractmethod
@@ -18,7 +18,8 @@ class TjuptOpenCheckHandler(_ISiteOpenCheckHandler):
         signup_url = self.build_signup_url(site_info)
 
         # 获取页面
-        res = RequestUtils(ua=self._ua, timeout=self._timeout).get_res(url=signup_url)
+        res = RequestUtils(ua=self._ua, timeout=self._timeout,
+                           session=self.get_session(signup_url)).get_res(url=signup_url)
         if res is None:
             raise RuntimeError("无法访问页面，响应为空")
         if res.status_code != 200:
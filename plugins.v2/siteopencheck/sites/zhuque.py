@@ -1,8 +1,15 @@
 from typing import Dict, Any, Tuple
 
 import re
-import requests
+import threading
+import time
 from app.plugins.siteopencheck.sites import _ISiteOpenCheckHandler
+from app.utils.string import StringUtils
+
+# csrf token 缓存 {域名: (token, 会话 Cookie, 过期时间)}，跨多轮检查复用
+# token 与会话 Cookie 绑定，复用时把 Cookie 放回本轮检查的新会话
+_csrf_cache: Dict[str, Tuple[str, dict, float]] = {}
+_csrf_lock = threading.Lock()
 
 
 class ZhuqueOpenCheckHandler(_ISiteOpenCheckHandler):
@@ -10,32 +17,52 @@ class ZhuqueOpenCheckHandler(_ISiteOpenCheckHandler):
 
     site_url = "https://zhuque.in/"
 
+    # csrf token 缓存有效期（秒）
+    _csrf_ttl = 30 * 60
+
     def build_signup_url(self, site_info: Dict[str, Any]) -> str:
         site_url = site_info.get("url", "")
         return f"{site_url.rstrip('/')}/api/user/registStatus"
 
-    def check(self, site_info: Dict[str, Any]) -> Tuple[str, str]:
-        # 构建注册URL
-        signup_url = self.build_signup_url(site_info)
+    def __get_csrf_token(self, site_info: Dict[str, Any], refresh: bool = False) -> str:
+        """获取 csrf token，缓存直到过期（跨多轮检查），服务端拒绝时刷新"""
+        site_url = site_info.get("url", "")
+        domain = StringUtils.get_url_domain(site_url)
+        session = self.get_session(site_url)
+        with _csrf_lock:
+            cached = _csrf_cache.get(domain)
+            if refresh or (cached and cached[2] <= time.time()):
+                _csrf_cache.pop(domain, None)
+                cached = None
+        if cached:
+            token, cookies, _ = cached
+            session.cookies.update(cookies)
+            return token
 
-        # 获取页面
-        session = requests.Session()
-        session.headers.update({
-            "Host": "zhuque.in",
-            "User-Agent": self._ua,
-        })
-        page_res = session.get('https://zhuque.in/entry/regist')
+        page_res = session.get(f"{site_url.rstrip('/')}/entry/regist", timeout=self._timeout)
         if page_res.status_code != 200:
             raise RuntimeError(f"无法访问注册页，状态码: {page_res.status_code}")
 
         match = re.search(r'name="x-csrf-token" content="(.+?)"', page_res.text)
         if not match:
             raise RuntimeError("未能在页面中找到 csrf-token")
-        csrf_token = match.group(1)
-        session.headers.update({
-            "x-csrf-token": csrf_token,
-        })
-        res = session.get(signup_url)
+        token = match.group(1)
+        with _csrf_lock:
+            _csrf_cache[domain] = (token, session.cookies.get_dict(), time.time() + self._csrf_ttl)
+        return token
+
+    def check(self, site_info: Dict[str, Any]) -> Tuple[str, str]:
+        # 构建注册URL
+        signup_url = self.build_signup_url(site_info)
+
+        # 获取页面，token 失效时刷新一次
+        session = self.get_session(signup_url)
+        res = None
+        for refresh in (False, True):
+            csrf_token = self.__get_csrf_token(site_info, refresh=refresh)
+            res = session.get(signup_url, headers={"x-csrf-token": csrf_token}, timeout=self._timeout)
+            if res is None or res.status_code not in (401, 403, 419):
+                break
         if res is None:
             raise RuntimeError("无法访问页面，响应为空")
         if res.status_code != 200:
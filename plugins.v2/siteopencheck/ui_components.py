@@ -1,40 +1,64 @@
 # -*- coding: utf-8 -*-
 """
-站点开注检查UI组件生成器 (修复版)
-1. 修复点击分页无数据问题：确保 VRow 被包裹在 List 中。
-2. 分页逻辑内嵌。
+站点开注检查UI组件生成器
+1. 页面模型在每次检查后按状态分组预先生成，打开页面时无需重新分组，站点卡片按内容指纹缓存复用。
+2. 分页、分组展开与搜索由页面组件自身保存状态（详情页请求不带参数，服务端不保存任何视图状态，
+   各用户、各标签页互不影响），每组按页拆分，只渲染当前页的站点卡片。
 3. 网格布局：一行4个。
 """
-from typing import List, Dict
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Any
 
 
 class SiteOpenCheckUIComponents:
     """站点开注检查UI组件生成器"""
 
     # 每页显示数量，建议设为4的倍数
-    PAGE_SIZE = 4
+    PAGE_SIZE = 12
+    # 状态分组：状态、标题、颜色、图标
+    GROUPS = [
+        ('open', '开注站点', 'success', 'mdi-check-circle'),
+        ('closed', '关闭注册', 'error', 'mdi-close-circle'),
+        ('error', '异常站点', 'warning', 'mdi-alert-circle'),
+        ('unknown', '未知状态', 'info', 'mdi-help-circle'),
+    ]
+    # 页面模型中保留的站点字段
+    CARD_FIELDS = ('domain', 'name', 'status', 'message', 'signup_url', 'url', 'check_time')
+    # 默认展开的分组
+    EXPANDED_GROUPS = ('open', 'error')
+    # 站点卡片缓存 {domain: (卡片指纹, 卡片)}，按最近使用淘汰，站点数据变化后指纹不同，不会命中旧卡片
+    CARD_CACHE_SIZE = 256
+    _card_cache: "OrderedDict[str, Tuple[tuple, Dict]]" = OrderedDict()
+    _card_lock = threading.Lock()
 
     @staticmethod
-    def create_top_stats(sites: List[Dict]) -> Dict:
-        """创建顶部统计信息"""
-        total, open, closed, error, unknown = len(sites), 0, 0, 0, 0
+    def build_page_model(sites: List[Dict]) -> Dict[str, Any]:
+        """按状态分组生成页面模型，检查完成后保存，打开页面时直接使用"""
+        groups = {group[0]: [] for group in SiteOpenCheckUIComponents.GROUPS}
+        for site in sites:
+            status = site.get('status') if site.get('status') in groups else 'unknown'
+            groups[status].append({k: site.get(k) for k in SiteOpenCheckUIComponents.CARD_FIELDS
+                                   if site.get(k) is not None})
+        for items in groups.values():
+            items.sort(key=lambda x: str(x.get('name') or x.get('domain') or ''))
+        return {
+            'total': len(sites),
+            'counts': {status: len(items) for status, items in groups.items()},
+            'groups': groups
+        }
 
-        for s in sites:
-            if s.get('status') == 'open':
-                open += 1
-            elif s.get('status') == 'closed':
-                closed += 1
-            elif s.get('status') == 'error':
-                error += 1
-            else:
-                unknown += 1
+    @staticmethod
+    def create_top_stats(model: Dict[str, Any]) -> Dict:
+        """创建顶部统计信息"""
+        counts = model.get('counts') or {}
 
         top_stats = [
-            {'icon': 'mdi-web', 'color': '#16b1ff', 'value': total, 'label': '站点总数'},
-            {'icon': 'mdi-check-circle', 'color': '#4caf50', 'value': open, 'label': '开注站点'},
-            {'icon': 'mdi-close-circle', 'color': '#f44336', 'value': closed, 'label': '关闭注册'},
-            {'icon': 'mdi-alert-circle', 'color': '#ff9800', 'value': error, 'label': '异常站点'},
-            {'icon': 'mdi-help-circle', 'color': '#16B1FF', 'value': unknown, 'label': '未知状态'},
+            {'icon': 'mdi-web', 'color': '#16b1ff', 'value': model.get('total', 0), 'label': '站点总数'},
+            {'icon': 'mdi-check-circle', 'color': '#4caf50', 'value': counts.get('open', 0), 'label': '开注站点'},
+            {'icon': 'mdi-close-circle', 'color': '#f44336', 'value': counts.get('closed', 0), 'label': '关闭注册'},
+            {'icon': 'mdi-alert-circle', 'color': '#ff9800', 'value': counts.get('error', 0), 'label': '异常站点'},
+            {'icon': 'mdi-help-circle', 'color': '#16B1FF', 'value': counts.get('unknown', 0), 'label': '未知状态'},
         ]
 
         return {
@@ -70,9 +94,12 @@ class SiteOpenCheckUIComponents:
         }
 
     @staticmethod
-    def create_site_list(sites: List[Dict]) -> List[Dict]:
-        """创建站点列表"""
-        if not sites:
+    def create_site_list(model: Dict[str, Any]) -> List[Dict]:
+        """
+        创建站点列表：搜索框与按状态分组的可折叠面板，每组按页拆分
+        :param model: 页面模型，见 build_page_model
+        """
+        if not model or not model.get('total'):
             return [{
                 'component': 'VAlert',
                 'props': {
@@ -84,44 +111,76 @@ class SiteOpenCheckUIComponents:
                 }
             }]
 
-        # 按状态分组
-        open_sites = [s for s in sites if s.get('status') == 'open']
-        closed_sites = [s for s in sites if s.get('status') == 'closed']
-        error_sites = [s for s in sites if s.get('status') == 'error']
-        unknown_sites = [s for s in sites if s.get('status') == 'unknown']
-
-        site_rows = []
-
-        if open_sites:
-            site_rows.append(
-                SiteOpenCheckUIComponents._create_site_group("开注站点", open_sites, "success", "mdi-check-circle"))
-        if closed_sites:
-            site_rows.append(
-                SiteOpenCheckUIComponents._create_site_group("关闭注册", closed_sites, "error", "mdi-close-circle"))
-        if error_sites:
-            site_rows.append(
-                SiteOpenCheckUIComponents._create_site_group("异常站点", error_sites, "warning", "mdi-alert-circle"))
-        if unknown_sites:
-            site_rows.append(
-                SiteOpenCheckUIComponents._create_site_group("未知状态", unknown_sites, "info", "mdi-help-circle"))
-
-        return site_rows
+        groups = [(status, title, color, icon, model.get('groups', {}).get(status) or [])
+                  for status, title, color, icon in SiteOpenCheckUIComponents.GROUPS]
+        groups = [group for group in groups if group[4]]
+        panels = [SiteOpenCheckUIComponents._create_site_group(*group) for group in groups]
+        expanded = [group[0] for group in groups if group[0] in SiteOpenCheckUIComponents.EXPANDED_GROUPS]
+        return [
+            SiteOpenCheckUIComponents._create_search_box(groups),
+            {
+                'component': 'VExpansionPanels',
+                # 只提供初始值，展开状态由组件自身保存
+                'props': {'multiple': True, 'variant': 'accordion', 'model-value': expanded},
+                'content': panels
+            }
+        ]
 
     @staticmethod
-    def _create_site_group(title: str, sites: List[Dict], color: str, icon: str) -> Dict:
-        """创建站点分组（外层：只包含一个总览面板）"""
+    def _create_search_box(groups: List[tuple]) -> Dict:
+        """创建搜索框：在输入框中按站点名称或域名筛选，下拉列表中显示站点的开注状态"""
+        items = [{
+            'title': f"{site.get('name') or site.get('domain')} · {title}",
+            'subtitle': site.get('domain') or '',
+            'value': site.get('domain') or site.get('name')
+        } for status, title, _, _, sites in groups for site in sites]
         return {
-            'component': 'VCard',
+            'component': 'VAutocomplete',
             'props': {
-                'variant': 'flat',
-                'color': 'surface',
+                'items': items,
+                'placeholder': '搜索站点名称或域名',
+                'prepend-inner-icon': 'mdi-magnify',
+                'density': 'compact',
+                'variant': 'outlined',
+                'hide-details': True,
+                'clearable': True,
                 'class': 'mb-3',
-                'style': 'border-radius: 14px; box-shadow: 0 1px 4px rgba(22,177,255,0.04); padding: 12px 12px 6px 12px;'
-            },
+                'style': 'max-width: 360px;'
+            }
+        }
+
+    @staticmethod
+    def _create_site_group(status: str, title: str, color: str, icon: str, sites: List[Dict]) -> Dict:
+        """创建站点分组面板，多页时每页一个窗口，只渲染当前页"""
+        size = SiteOpenCheckUIComponents.PAGE_SIZE
+        pages = [sites[start:start + size] for start in range(0, len(sites), size)]
+        if len(pages) == 1:
+            content = SiteOpenCheckUIComponents._render_site_grid(pages[0])
+        else:
+            content = [{
+                'component': 'VWindow',
+                # 只提供初始页，翻页状态由组件自身保存
+                'props': {'model-value': 0, 'show-arrows': 'hover', 'continuous': False},
+                'content': [{
+                    'component': 'VWindowItem',
+                    'props': {'value': idx},
+                    'content': [
+                        *SiteOpenCheckUIComponents._render_site_grid(page),
+                        {
+                            'component': 'div',
+                            'props': {'class': 'text-caption text-center mt-2', 'style': 'color: #666;'},
+                            'text': f'第 {idx + 1} / {len(pages)} 页'
+                        }
+                    ]
+                } for idx, page in enumerate(pages)]
+            }]
+
+        return {
+            'component': 'VExpansionPanel',
+            'props': {'value': status},
             'content': [
                 {
-                    'component': 'VCardTitle',
-                    'props': {'class': 'd-flex align-center pa-4'},
+                    'component': 'VExpansionPanelTitle',
                     'content': [
                         {'component': 'VIcon', 'props': {'color': color, 'class': 'mr-2', 'size': 'small'},
                          'text': icon},
@@ -130,97 +189,20 @@ class SiteOpenCheckUIComponents:
                     ]
                 },
                 {
-                    'component': 'VCardText',
-                    'props': {'class': 'pa-3'},
-                    'content': [
-                        {
-                            'component': 'VExpansionPanels',
-                            'props': {'variant': 'accordion', 'class': 'mt-2'},
-                            'content': [
-                                {
-                                    'component': 'VExpansionPanel',
-                                    'props': {'class': 'elevation-0', 'style': 'background:transparent;'},
-                                    'content': [
-                                        {
-                                            'component': 'VExpansionPanelTitle',
-                                            'props': {'class': 'py-2',
-                                                      'style': 'font-weight:500; font-size:1rem; color:#666;'},
-                                            'content': [
-                                                {'component': 'span', 'props': {'class': 'font-weight-bold'},
-                                                 'text': f'查看 {len(sites)} 个站点详情'}
-                                            ]
-                                        },
-                                        {
-                                            'component': 'VExpansionPanelText',
-                                            'props': {'class': 'py-2',
-                                                      'style': 'background:#f7f8fa; border-radius:12px; padding:12px;'},
-                                            'content': SiteOpenCheckUIComponents._create_inner_content(sites)
-                                        }
-                                    ]
-                                }
-                            ]
-                        }
-                    ]
+                    'component': 'VExpansionPanelText',
+                    'content': content
                 }
             ]
         }
 
-    @staticmethod
-    def _create_inner_content(sites: List[Dict]) -> List[Dict]:
-        """
-        生成内部内容（处理分页逻辑）
-        如果站点数 > PAGE_SIZE，则嵌套一层 VExpansionPanels 用于分页
-        否则直接显示网格
-        """
-        if len(sites) > SiteOpenCheckUIComponents.PAGE_SIZE:
-            # 需要分页
-            chunks = [sites[i:i + SiteOpenCheckUIComponents.PAGE_SIZE] for i in
-                      range(0, len(sites), SiteOpenCheckUIComponents.PAGE_SIZE)]
-
-            panels = []
-            for idx, chunk in enumerate(chunks):
-                start_num = idx * SiteOpenCheckUIComponents.PAGE_SIZE + 1
-                end_num = start_num + len(chunk) - 1
-
-                panels.append({
-                    'component': 'VExpansionPanel',
-                    'props': {'class': 'mb-2', 'style': 'background: #ffffff; border: 1px solid #eee;'},
-                    'content': [
-                        {
-                            'component': 'VExpansionPanelTitle',
-                            'props': {'class': 'py-1 px-2', 'style': 'min-height: 36px; font-size: 0.9rem;'},
-                            'content': [
-                                {'component': 'span', 'props': {'style': 'color: #555;'},
-                                 'text': f'第 {idx + 1} 页 ({start_num}-{end_num})'}
-                            ]
-                        },
-                        {
-                            'component': 'VExpansionPanelText',
-                            'props': {'class': 'py-2', 'eager': True},  # eager 确保内容加载
-                            # _render_site_grid 返回一个列表，这里直接赋值给 content
-                            'content': SiteOpenCheckUIComponents._render_site_grid(chunk)
-                        }
-                    ]
-                })
-
-            return [{
-                'component': 'VExpansionPanels',
-                'props': {'variant': 'accordion', 'class': 'elevation-0'},
-                'content': panels
-            }]
-        else:
-            # 不需要分页，直接渲染网格
-            return SiteOpenCheckUIComponents._render_site_grid(sites)
-
     @staticmethod
     def _render_site_grid(sites: List[Dict]) -> List[Dict]:
         """
         渲染站点网格布局 (一行4个)
-        【关键修复】返回值必须是 List，不能是单个 Dict
+        返回值必须是 List，不能是单个 Dict
         """
-        cards = [SiteOpenCheckUIComponents._create_site_card(site) for site in sites]
+        cards = [SiteOpenCheckUIComponents._get_site_card(site) for site in sites]
 
-        # 将 VRow 包裹在列表中返回，VExpansionPanelText 的 content 才能正确渲染
         return [
             {
                 'component': 'VRow',
@@ -228,6 +210,25 @@ class SiteOpenCheckUIComponents:
             }
         ]
 
+    @staticmethod
+    def _get_site_card(site: Dict) -> Dict:
+        """获取站点卡片，站点数据未变化时复用上次生成的卡片"""
+        key = site.get('domain') or site.get('name')
+        fingerprint = tuple(site.get(k) for k in SiteOpenCheckUIComponents.CARD_FIELDS)
+        cache = SiteOpenCheckUIComponents._card_cache
+        with SiteOpenCheckUIComponents._card_lock:
+            cached = cache.get(key)
+            if cached and cached[0] == fingerprint:
+                cache.move_to_end(key)
+                return cached[1]
+        card = SiteOpenCheckUIComponents._create_site_card(site)
+        with SiteOpenCheckUIComponents._card_lock:
+            cache[key] = (fingerprint, card)
+            cache.move_to_end(key)
+            while len(cache) > SiteOpenCheckUIComponents.CARD_CACHE_SIZE:
+                cache.popitem(last=False)
+        return card
+
     @staticmethod
     def _create_site_card(site: Dict) -> Dict:
         """创建单个站点的竖向卡片"""
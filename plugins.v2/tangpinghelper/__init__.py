@@ -1,27 +1,104 @@
 import re
+import sys
+import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, TypedDict
 
 import pytz
+import requests
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from fastapi.responses import PlainTextResponse
+from lxml import etree
+from requests.adapters import HTTPAdapter
 
 from app.core.config import settings
+from app.core.event import eventmanager, Event
+from app.db.site_oper import SiteOper
 from app.helper.sites import SitesHelper
 from app.log import logger
 from app.plugins import _PluginBase
+from app.plugins.tangpinghelper.metrics import metrics
 from app.schemas import NotificationType
+from app.schemas.types import EventType
 from app.utils.http import RequestUtils
 
+# 抽奖权益汇总行：key：数值 单位（可选注释）
+_SUMMARY_LINE_RE = re.compile(r'^([^：:]+?)\s*[：:]\s*(\d+(?:\.\d+)?)\s*([^\s（(]+)(?:\s*[（(][^)）]*[)）])?\s*$')
+# 兼容：已发放X个
+_SUMMARY_ISSUED_RE = re.compile(r'已发放\s*(\d+(?:\.\d+)?)\s*个')
+
+
+class _TaskRecord(TypedDict):
+    """任务页面中的一条任务"""
+    name: str
+    exam_id: int
+    claimable: bool
+    claimed: bool
+
+
+class _TokenBucket:
+    """令牌桶限速器：每秒补充 rate 个令牌，最多积累 capacity 个"""
+
+    def __init__(self, rate: float, capacity: int):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop: threading.Event = None) -> bool:
+        """获取一个令牌，令牌不足时等待；stop 被置位时立即返回 False"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self._rate
+            if stop is None:
+                time.sleep(wait)
+            elif stop.wait(wait):
+                return False
+
+
+class _LotteryPacer:
+    """
+    抽奖节奏控制器：根据服务器响应耗时与限流响应动态调整请求间隔。
+    间隔跟随响应耗时的平滑均值，遇到限流时加倍，之后逐步回落。
+    """
+
+    def __init__(self, initial: float, min_delay: float, max_delay: float):
+        self._min = min_delay
+        self._max = max_delay
+        self._latency: Optional[float] = None
+        self.delay = initial
+
+    def observe(self, latency: float, limited: bool = False):
+        """记录一次请求的耗时与是否被限流"""
+        self._latency = latency if self._latency is None else 0.7 * self._latency + 0.3 * latency
+        if limited:
+            self.delay = min(self._max, max(self.delay, self._min) * 2)
+            return
+        # 目标间隔为两倍平滑耗时，从限流退避中逐步回落而不是直接跳回
+        target = min(self._max, max(self._min, self._latency * 2))
+        self.delay = target if self.delay <= target else max(target, self.delay * 0.7)
+
+    def wait(self):
+        time.sleep(self.delay)
+
 
 class TangPingHelper(_PluginBase):
     # ==================== 插件元数据 ====================
     plugin_name = "躺平PT助手"
     plugin_desc = "躺平PT自动领红包、抽奖累加器与任务领取。\n支持自动领取红包、循环抽奖、智能任务领取三个独立功能，每日统计数据按天清除。"
     plugin_icon = "tangping.png"
-    plugin_version = "1.0.0"
+    plugin_version = "1.18.0"
     plugin_author = "yilee"
     author_url = "https://github.com/yilee"
     plugin_config_prefix = "tangpinghelper_"
@@ -31,12 +108,41 @@ class TangPingHelper(_PluginBase):
     # ==================== 常量 ====================
     REDPACKET_LATEST_PATH = "/api/redpacket/latest"
     REDPACKET_CLAIM_PATH = "/api/redpacket/claim"
+    REDPACKET_CONCURRENCY = 3  # 同时领取的红包数
+    REDPACKET_RATE = 2.0  # 红包请求限速（次/秒）
+    REDPACKET_BURST = 3  # 红包请求突发上限
+    REDPACKET_WATCH_MIN_INTERVAL = 3  # 监听模式：发现红包后的轮询间隔（秒）
+    REDPACKET_WATCH_MAX_INTERVAL = 60  # 监听模式：空闲时最长轮询间隔（秒）
     LOTTERY_PAGE_PATH = "/omnibot_lottery.php"
     LOTTERY_DRAW_PATH = "/web/omnibot/lottery/draw"
-    LOTTERY_DELAY = 5  # 固定每轮间隔（秒）
+    LOTTERY_DELAY = 2  # 抽奖初始间隔（秒），之后随响应耗时自适应
+    LOTTERY_MIN_DELAY = 1  # 抽奖最短间隔（秒）
+    LOTTERY_MAX_DELAY = 30  # 抽奖限流退避最长间隔（秒）
+    LOTTERY_MAX_LIMITED = 5  # 连续限流次数上限
+    # 合法的抽奖档位（服务器仅接受这些值），从大到小
+    VALID_DRAW_COUNTS = (100, 50, 20, 10, 1)
+    SUMMARY_CACHE_SIZE = 512  # 权益汇总行解析缓存条数
+    LOTTERY_CHECKPOINT_EVERY = 5  # 抽奖每 N 次请求写一次检查点
+    LOTTERY_HISTORY_DAYS = 30  # 抽奖跨天汇总保留天数
+    # 按天存储的统计数据键前缀，键格式为 {prefix}_{YYYY-MM-DD}
+    DAILY_DATA_PREFIXES = ("redpacket_stats", "lottery_stats", "lottery_ledger", "task_stats")
 
     # ==================== 私有属性 ====================
     _scheduler: Optional[BackgroundScheduler] = None
+    # 最近一次清理旧数据的日期
+    _last_cleaned: Optional[str] = None
+    # 权益汇总行解析缓存 {行文本: (名称, 数值, 单位) | None}，各实例共享
+    _summary_line_cache: Dict[str, Optional[Tuple[str, float, str]]] = {}
+    # 躺平PT站点缓存 {域名: 站点信息}，站点更新/删除或 Cookie、UA 变化时失效
+    _site_cache: Dict[str, Dict] = {}
+    _site_cache_lock = threading.Lock()
+    # 任务领取窗口调度器
+    _task_scheduler: Optional[BackgroundScheduler] = None
+    # 红包监听线程
+    _watch_thread: Optional[threading.Thread] = None
+    _watch_stop: Optional[threading.Event] = None
+    # 红包领取锁：监听、定时与立即执行都会读改写当日红包统计，同一时间只允许一处领取
+    _redpacket_lock = threading.Lock()
 
     # 配置属性
     _enabled: bool = False
@@ -57,6 +163,11 @@ class TangPingHelper(_PluginBase):
     _onlyonce_redpacket: bool = False
     _onlyonce_task: bool = False
 
+    # 红包持续监听（替代定时领红包）
+    _redpacket_watch: bool = False
+    # 任务按领取窗口调度（替代定时领任务），默认关闭，升级后沿用原有的定时领任务
+    _task_window: bool = False
+
     # 任务相关常量
     TASK_PAGE_PATH = "/task.php"
     TASK_AJAX_PATH = "/ajax.php"
@@ -64,6 +175,10 @@ class TangPingHelper(_PluginBase):
     TASK_PRIORITY_EOM = ["BUG", "VIP", "苍蝇腿"]
     # 普通时间 → 只领苍蝇腿（VIP/BUG 仅限月末）
     TASK_PRIORITY_NORMAL = ["苍蝇腿"]
+    # 领取窗口调度：每日开放时刻（时, 分）、距当日结束的安全余量、失败重试间隔
+    TASK_WINDOW_OPEN = (0, 5)
+    TASK_WINDOW_MARGIN = timedelta(hours=2, minutes=5)
+    TASK_WINDOW_RETRY = timedelta(minutes=30)
 
     # ==================== 生命周期 ====================
 
@@ -87,8 +202,21 @@ class TangPingHelper(_PluginBase):
             self._onlyonce_redpacket = config.get("onlyonce_redpacket", False)
             self._onlyonce_task = config.get("onlyonce_task", False)
 
+            self._redpacket_watch = config.get("redpacket_watch", False)
+            self._task_window = config.get("task_window", False)
+
             self.__update_config()
 
+        # 红包监听
+        if self._enabled and self._enabled_redpacket and self._redpacket_watch:
+            self._start_redpacket_watcher()
+
+        # 任务领取窗口
+        if self._enabled and self._enabled_task and self._task_window:
+            self._task_scheduler = BackgroundScheduler(timezone=settings.TZ)
+            self._task_scheduler.start()
+            self._schedule_task_window()
+
         # 检查是否需要立即运行
         any_onlyonce = self._onlyonce_lottery or self._onlyonce_redpacket or self._onlyonce_task
         if self._enabled or any_onlyonce:
@@ -111,7 +239,7 @@ class TangPingHelper(_PluginBase):
                     func=self._run_immediate,
                     kwargs={"do_lottery": do_lottery, "do_redpacket": do_redpacket, "do_task": do_task},
                     trigger='date',
-                    run_date=datetime.now(tz=pytz.timezone(settings.TZ)) + timedelta(seconds=3),
+                    run_date=self._now() + timedelta(seconds=3),
                     name="躺平PT助手"
                 )
                 if self._scheduler.get_jobs():
@@ -124,6 +252,12 @@ class TangPingHelper(_PluginBase):
     def stop_service(self):
         """退出插件"""
         try:
+            self._stop_redpacket_watcher()
+            if self._task_scheduler:
+                self._task_scheduler.remove_all_jobs()
+                if self._task_scheduler.running:
+                    self._task_scheduler.shutdown(wait=False)
+                self._task_scheduler = None
             if self._scheduler:
                 self._scheduler.remove_all_jobs()
                 if self._scheduler.running:
@@ -148,6 +282,8 @@ class TangPingHelper(_PluginBase):
             "onlyonce_lottery": self._onlyonce_lottery,
             "onlyonce_redpacket": self._onlyonce_redpacket,
             "onlyonce_task": self._onlyonce_task,
+            "redpacket_watch": self._redpacket_watch,
+            "task_window": self._task_window,
         })
 
     # ==================== 站点信息获取 ====================
@@ -160,7 +296,48 @@ class TangPingHelper(_PluginBase):
         return "tangpt.top" in url or "tangpt.top" in domain
 
     def _get_site_info(self) -> Optional[Dict]:
-        """自动从站点助手匹配躺平PT站点（含 Cookie），无需手动选择"""
+        """
+        自动从站点助手匹配躺平PT站点（含 Cookie），无需手动选择。
+        命中缓存且数据库中 Cookie/UA 未变化时直接返回，不再扫描索引器。
+        """
+        with self._site_cache_lock:
+            for domain, site in list(self._site_cache.items()):
+                if self._site_fingerprint_valid(domain, site):
+                    return site
+                logger.info(f"躺平PT站点 {domain} 的 Cookie/UA 已变化，重新匹配")
+                self._site_cache.pop(domain, None)
+
+        site = self.__scan_site_info()
+        if site:
+            with self._site_cache_lock:
+                self._site_cache[site.get("domain") or "tangpt.top"] = site
+        return site
+
+    @staticmethod
+    def _site_fingerprint_valid(domain: str, site: Dict) -> bool:
+        """核对数据库中站点的 Cookie 与 UA 是否与缓存一致（单条查询，代替扫描全部索引器）"""
+        try:
+            db_site = SiteOper().get_by_domain(domain)
+        except Exception as e:
+            logger.debug(f"查询站点 {domain} 失败: {str(e)}")
+            return False
+        if not db_site or db_site.cookie != site.get("cookie"):
+            return False
+        # 站点未设置 UA 时索引器使用默认 UA，此时不比较
+        return not db_site.ua or db_site.ua == site.get("ua")
+
+    def _invalidate_site_cache(self, domain: str = None, site_id: Any = None):
+        """站点变更时清除缓存，未指定域名和站点 ID 时全部清除"""
+        with self._site_cache_lock:
+            for key, site in list(self._site_cache.items()):
+                if (not domain and not site_id) \
+                        or (domain and domain == key) \
+                        or (site_id and str(site_id) == str(site.get("id"))):
+                    self._site_cache.pop(key, None)
+                    logger.debug(f"躺平PT站点缓存已失效: {key}")
+
+    def __scan_site_info(self) -> Optional[Dict]:
+        """扫描站点助手的全部索引器，匹配躺平PT站点"""
         try:
             indexers = SitesHelper().get_indexers()
             for site in indexers:
@@ -184,23 +361,36 @@ class TangPingHelper(_PluginBase):
             url = url.rstrip("/")
         return url or "https://www.tangpt.top"
 
-    def _make_get_request(self, site_info: Dict, path: str):
-        """使用站点 Cookie 发起 GET 请求"""
+    def _open_session(self) -> requests.Session:
+        """创建一次执行内各模块共享的会话，复用连接池与服务端下发的 Cookie"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.REDPACKET_CONCURRENCY + 2)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _make_get_request(self, site_info: Dict, path: str, headers: dict = None):
+        """使用站点 Cookie 发起 GET 请求，headers 为附加请求头；site_info 带有 session 时复用该会话"""
         base_url = self._get_base_url(site_info)
         full_url = f"{base_url}{path}"
         cookies = site_info.get("cookie")
         ua = site_info.get("ua")
         proxies = settings.PROXY if site_info.get("proxy") else None
 
-        return RequestUtils(
+        start = time.perf_counter()
+        res = RequestUtils(
             cookies=cookies,
             ua=ua,
             proxies=proxies,
+            headers={"User-Agent": ua, **headers} if headers else None,
+            session=site_info.get("session"),
             timeout=30
         ).get_res(url=full_url)
+        self._observe_request(path, res, start)
+        return res
 
     def _make_post_request(self, site_info: Dict, path: str, data: dict = None):
-        """使用站点 Cookie 发起 POST 请求"""
+        """使用站点 Cookie 发起 POST 请求；site_info 带有 session 时复用该会话"""
         base_url = self._get_base_url(site_info)
         full_url = f"{base_url}{path}"
         cookies = site_info.get("cookie")
@@ -213,13 +403,23 @@ class TangPingHelper(_PluginBase):
             'Accept': 'application/json, text/javascript, */*; q=0.01',
         }
 
-        return RequestUtils(
+        start = time.perf_counter()
+        res = RequestUtils(
             cookies=cookies,
             ua=ua,
             proxies=proxies,
             headers=headers,
+            session=site_info.get("session"),
             timeout=30
         ).post_res(url=full_url, data=data)
+        self._observe_request(path, res, start)
+        return res
+
+    @staticmethod
+    def _observe_request(path: str, res, start: float):
+        """记录请求次数与耗时指标"""
+        metrics.inc("requests_total", path=path, status=res.status_code if res is not None else "error")
+        metrics.observe("request_duration_seconds", time.perf_counter() - start, path=path)
 
     # ==================== 数据键（按天） ====================
 
@@ -229,23 +429,41 @@ class TangPingHelper(_PluginBase):
         m = re.search(r'每天最多领\s*(\d+)\s*个', msg)
         return int(m.group(1)) if m else None
 
+    @staticmethod
+    def _now() -> datetime:
+        """当前时间（系统时区），按天数据、任务窗口与领取条件统一使用，避免容器时区与设置不一致时错位"""
+        return datetime.now(tz=pytz.timezone(settings.TZ))
+
     def _today_key(self, prefix: str) -> str:
         """生成按天的存储键"""
-        today = datetime.now().strftime("%Y-%m-%d")
+        today = self._now().strftime("%Y-%m-%d")
         return f"{prefix}_{today}"
 
     def _clear_old_data(self):
-        """清除非今日的统计数据"""
-        prefixes = ["redpacket_stats", "lottery_stats", "task_stats"]
-        for prefix in prefixes:
-            # 获取所有相关键（通过尝试昨天及以前的模式）
-            for days_ago in range(1, 32):
-                old_date = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
-                old_key = f"{prefix}_{old_date}"
-                old_data = self.get_data(old_key)
-                if old_data is not None:
-                    self.del_data(old_key)
-                    logger.debug(f"已清除旧数据: {old_key}")
+        """清除非今日的统计数据，每天最多执行一次"""
+        today = self._now().strftime("%Y-%m-%d")
+        if self._last_cleaned == today:
+            return
+        if self.get_data("last_cleaned") == today:
+            self._last_cleaned = today
+            return
+
+        start = time.perf_counter()
+        removed = 0
+        # 一次读取插件全部数据键，只删除非今日的按天数据
+        for item in self.get_data() or []:
+            key = getattr(item, "key", None)
+            if not key or "_" not in key:
+                continue
+            prefix, date_str = key.rsplit("_", 1)
+            if prefix in self.DAILY_DATA_PREFIXES and date_str != today:
+                self.del_data(key)
+                removed += 1
+                logger.debug(f"已清除旧数据: {key}")
+
+        self.save_data("last_cleaned", today)
+        self._last_cleaned = today
+        logger.info(f"清除旧数据完成，共 {removed} 条，耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
 
     # ==================== 任务模块 ====================
 
@@ -257,45 +475,38 @@ class TangPingHelper(_PluginBase):
             return None
         return res.text
 
-    def _parse_tasks(self, html: str) -> List[Dict]:
+    def _parse_tasks(self, html: str) -> List[_TaskRecord]:
         """
         解析任务页面 HTML，提取任务列表。
-        返回: [{"name": str, "exam_id": int, "claimable": bool, "claimed": bool}, ...]
+        一次解析为 DOM 后按行定位：任务行为含 td.nowrap/strong 的 tr，认领按钮为行内带 data-id 的 input。
         """
         if not html:
             return []
 
-        tasks = []
-        # 匹配每个任务行：任务名 + 按钮信息
-        pattern = re.compile(
-            r'<td class="nowrap"><strong>([^<]+)</strong></td>'
-            r'.*?'
-            r'<input type="button" class="([^"]*)" data-id="(\d+)" value="([^"]*)"'
-            r'(\s+disabled)?\s*>',
-            re.DOTALL
-        )
+        tasks: List[_TaskRecord] = []
+        rows = etree.HTML(html).xpath('//tr[td[@class="nowrap"]/strong][.//input[@type="button"][@data-id]]')
+        for row in rows:
+            name = "".join(row.xpath('./td[@class="nowrap"]/strong[1]//text()')).strip()
+            button = row.xpath('.//input[@type="button"][@data-id]')[0]
+            try:
+                exam_id = int(button.get("data-id"))
+            except (TypeError, ValueError):
+                logger.warning(f"[任务] 任务 {name} 的 data-id 无效: {button.get('data-id')}")
+                continue
 
-        for m in pattern.finditer(html):
-            name = m.group(1).strip()
-            btn_class = m.group(2).strip()
-            exam_id = int(m.group(3))
-            btn_value = m.group(4).strip()
-            has_disabled = bool(m.group(5))  # 捕获 disabled 属性存在与否
-
-            claimed = "已经认领" in btn_value
-            claimable = btn_class == "claim" and not claimed and not has_disabled
-
-            tasks.append({
-                "name": name,
-                "exam_id": exam_id,
-                "claimable": claimable,
-                "claimed": claimed,
-            })
+            claimed = "已经认领" in (button.get("value") or "")
+            claimable = (button.get("class") or "").strip() == "claim" \
+                and not claimed and button.get("disabled") is None
+
+            tasks.append(_TaskRecord(name=name, exam_id=exam_id, claimable=claimable, claimed=claimed))
             logger.info(
                 f"[任务] 发现任务: {name} (ID={exam_id}) "
                 f"状态={'可领取' if claimable else '已认领' if claimed else '不可领取'}"
             )
 
+        if not tasks and "data-id" in html:
+            logger.warning("[任务] 页面包含任务按钮但未能解析出任务，任务页面结构可能已变化")
+
         logger.info(f"[任务] 共解析到 {len(tasks)} 个任务，可领取 {sum(1 for t in tasks if t['claimable'])} 个")
         return tasks
 
@@ -334,7 +545,7 @@ class TangPingHelper(_PluginBase):
         月末最后一天 → BUG > VIP > 苍蝇腿（距今日结束≥2h已在入口处检查）
         其他时间 → 只领苍蝇腿
         """
-        now = datetime.now()
+        now = self._now()
         tomorrow = now + timedelta(days=1)
         is_last_day_of_month = tomorrow.month != now.month
 
@@ -345,6 +556,45 @@ class TangPingHelper(_PluginBase):
             logger.info("[任务] 非月底最后一天，优先级: 只领苍蝇腿")
             return self.TASK_PRIORITY_NORMAL
 
+    def _next_task_window(self, retry: bool = False) -> Tuple[datetime, str]:
+        """
+        计算下一个有意义的任务领取时刻。
+        今日尚未领取且距今日结束仍大于安全余量 → 立即（失败重试时延后），否则 → 次日开放时刻。
+        返回 (时刻, 窗口说明)，领取日为月末最后一天时按 BUG > VIP > 苍蝇腿 领取。
+        """
+        now = self._now()
+        deadline = now.replace(hour=23, minute=59, second=59, microsecond=0) - self.TASK_WINDOW_MARGIN
+        run_at = now + (self.TASK_WINDOW_RETRY if retry else timedelta(seconds=10))
+        if self.get_data(self._today_key("task_stats")) or run_at > deadline:
+            hour, minute = self.TASK_WINDOW_OPEN
+            run_at = (now + timedelta(days=1)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+        if (run_at + timedelta(days=1)).month != run_at.month:
+            return run_at, "月末（BUG > VIP > 苍蝇腿）"
+        return run_at, "每日（苍蝇腿）"
+
+    def _schedule_task_window(self, retry: bool = False):
+        """为下一个领取窗口注册一次性任务"""
+        if not self._task_scheduler:
+            return
+        run_at, kind = self._next_task_window(retry)
+        self._task_scheduler.add_job(
+            func=self._run_task_window,
+            trigger='date',
+            run_date=run_at,
+            id="TangPingHelper.TaskWindow",
+            name="躺平PT-领任务窗口",
+            replace_existing=True
+        )
+        logger.info(f"[任务] 下次领取窗口: {run_at.strftime('%Y-%m-%d %H:%M')} {kind}")
+
+    def _run_task_window(self):
+        """领取窗口到达：领取一次，然后注册下一个窗口（今日未成功记录时延后重试）"""
+        try:
+            self.run_task_service()
+        finally:
+            self._schedule_task_window(retry=not self.get_data(self._today_key("task_stats")))
+
     def _run_task_claim(self, site_info: Dict) -> Dict:
         """
         自动领取任务核心逻辑。
@@ -372,8 +622,8 @@ class TangPingHelper(_PluginBase):
             return stats
 
         # 检查距今日结束是否 >= 2 小时（所有任务都要求此条件）
-        now = datetime.now()
-        end_of_today = datetime(now.year, now.month, now.day, 23, 59, 59)
+        now = self._now()
+        end_of_today = now.replace(hour=23, minute=59, second=59, microsecond=0)
         hours_until_eod = (end_of_today - now).total_seconds() / 3600
         if hours_until_eod < 2:
             logger.info(
@@ -407,7 +657,7 @@ class TangPingHelper(_PluginBase):
                 "claimed_id": selected["exam_id"],
                 "message": "已认领（页面检测）",
                 "errors": [],
-                "claim_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "claim_time": self._now().strftime("%Y-%m-%d %H:%M:%S"),
             })
             stats["claimed"] = True
             stats["claimed_task"] = selected["name"]
@@ -459,13 +709,22 @@ class TangPingHelper(_PluginBase):
             "claimed_id": selected["exam_id"],
             "message": msg,
             "errors": stats["errors"],
-            "claim_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "claim_time": self._now().strftime("%Y-%m-%d %H:%M:%S"),
         })
 
         logger.info(f"[任务] 本次完成: {'✅' if success else '❌'} {selected['name']} - {msg}")
         return stats
 
-    def _run_redpacket(self, site_info: Dict) -> Dict:
+    def _run_redpacket(self, site_info: Dict, latest: Optional[Dict] = None) -> Dict:
+        """
+        自动领红包，与其他入口的领取串行执行，等待期间其他入口更新的统计在开始时重新读取。
+        :param latest: 调用方已获取的最新红包列表响应，首轮直接使用，不再重复请求
+        返回统计信息字典。
+        """
+        with self._redpacket_lock:
+            return self.__run_redpacket(site_info, latest)
+
+    def __run_redpacket(self, site_info: Dict, latest: Optional[Dict] = None) -> Dict:
         """
         自动领红包核心逻辑。
         返回统计信息字典。
@@ -511,129 +770,103 @@ class TangPingHelper(_PluginBase):
 
         max_rounds = 50  # 安全上限，避免无限循环
         round_num = 0
-
-        while round_num < max_rounds and not daily_limit:
-            round_num += 1
-            logger.info(f"[红包] 第 {round_num} 轮查询...")
-
-            # 1. 获取最新红包
-            res = self._make_get_request(site_info, self.REDPACKET_LATEST_PATH)
-            if res is None:
-                msg = "获取红包列表失败：无响应"
-                logger.warning(f"[红包] {msg}")
-                stats["errors"].append(msg)
-                break
-
-            if res.status_code != 200:
-                msg = f"获取红包列表失败：HTTP {res.status_code}"
-                logger.warning(f"[红包] {msg}")
-                stats["errors"].append(msg)
-                break
-
-            try:
-                data = res.json()
-            except Exception as e:
-                msg = f"解析红包响应失败: {str(e)}"
-                logger.warning(f"[红包] {msg}")
-                stats["errors"].append(msg)
-                break
-
-            if not data or not data.get("ok"):
-                logger.info("[红包] 当前无可用红包，结束查询")
-                break
-
-            items = data.get("items", [])
-            if not isinstance(items, list) or len(items) == 0:
-                logger.info("[红包] 红包列表为空，结束查询")
-                break
-
-            # 2. 取第一个红包领取
-            packet = items[0]
-            packet_id = packet.get("id")
-            sender = packet.get("sender", "未知")
-            logger.info(f"[红包] 发现红包 ID={packet_id} 发送者={sender}")
-
-            claim_res = self._make_post_request(
-                site_info,
-                self.REDPACKET_CLAIM_PATH,
-                data={"packet_id": packet_id}
-            )
-
-            if claim_res is None:
-                msg = f"领取红包 {packet_id} 失败：无响应"
-                logger.warning(f"[红包] {msg}")
-                stats["errors"].append(msg)
-                break
-
-            # 3. 处理领取结果
-            if claim_res.status_code == 422:
-                # 每日上限（HTTP 422）
-                try:
-                    resp_data = claim_res.json()
-                    limit_msg = resp_data.get("message", "每日上限（HTTP 422）")
-                except Exception:
-                    limit_msg = "每日上限（HTTP 422）"
-                logger.warning(f"[红包] 每日上限已达到: {limit_msg}")
-                stats["daily_limit_reached"] = True
-                stats["limit_reason"] = limit_msg
-                stats["daily_max"] = self._parse_daily_max(limit_msg) or 100
-                daily_limit = True
-                break
-
-            if claim_res.status_code != 200:
-                msg = f"领取红包 {packet_id} 失败：HTTP {claim_res.status_code}"
-                logger.warning(f"[红包] {msg}")
-                stats["errors"].append(msg)
-                # 短暂等待后继续
-                time.sleep(1)
-                continue
-
-            try:
-                claim_data = claim_res.json()
-            except Exception as e:
-                msg = f"解析领取响应失败: {str(e)}"
-                logger.warning(f"[红包] {msg}")
-                stats["errors"].append(msg)
-                continue
-
-            # 4. 判断领取结果
-            if claim_data.get("ok"):
-                magic = claim_data.get("magic_amount", 0)
-                remain = claim_data.get("remain_count", 0)
-                claimed_count += 1
-                total_magic += magic
-                logger.info(
-                    f"[红包] ✅ 领取成功，获得魔力:{magic}，剩余次数:{remain}，累计:{claimed_count}个/{total_magic}魔力")
-
-                if remain == 0:
-                    logger.info("[红包] 剩余次数为0，结束本轮领取")
-                    break
-            else:
-                msg = claim_data.get("message", "")
-                logger.info(f"[红包] ⚠️ 领取返回异常: {msg}")
-
-                if "每天最多领" in msg:
+        # 置位后所有领取立即停止（每日上限 / 剩余次数为0 / 未知错误）
+        stop = threading.Event()
+        bucket = _TokenBucket(self.REDPACKET_RATE, self.REDPACKET_BURST)
+        lock = threading.Lock()
+        seen_ids = set()
+        run_claimed = 0
+        started = time.perf_counter()
+
+        def claim(packet: Dict):
+            nonlocal claimed_count, total_magic, run_claimed
+            if not bucket.acquire(stop) or stop.is_set():
+                return
+            outcome, msg, magic, remain = self._claim_redpacket(site_info, packet)
+            with lock:
+                if outcome == "ok":
+                    claimed_count += 1
+                    run_claimed += 1
+                    total_magic += magic
+                    logger.info(f"[红包] ✅ 红包 ID={packet.get('id')} 领取成功，获得魔力:{magic}，"
+                                f"剩余次数:{remain}，累计:{claimed_count}个/{total_magic}魔力")
+                    if remain == 0:
+                        logger.info("[红包] 剩余次数为0，结束领取")
+                        stop.set()
+                elif outcome == "limit":
+                    logger.warning(f"[红包] 每日上限已达到: {msg}")
                     stats["daily_limit_reached"] = True
                     stats["limit_reason"] = msg
                     stats["daily_max"] = self._parse_daily_max(msg) or 100
-                    daily_limit = True
+                    stop.set()
+                elif outcome == "skip":
+                    logger.info(f"[红包] 红包 {packet.get('id')} 已处理: {msg}")
+                else:
+                    logger.warning(f"[红包] {msg}")
+                    stats["errors"].append(msg)
+                    if outcome == "fatal":
+                        stop.set()
+
+        with ThreadPoolExecutor(max_workers=self.REDPACKET_CONCURRENCY) as executor:
+            while round_num < max_rounds and not stop.is_set():
+                round_num += 1
+                logger.info(f"[红包] 第 {round_num} 轮查询...")
+
+                # 1. 获取最新红包，首轮使用调用方已获取的列表
+                if latest is not None:
+                    data, latest = latest, None
+                else:
+                    if not bucket.acquire(stop):
+                        break
+                    res = self._make_get_request(site_info, self.REDPACKET_LATEST_PATH)
+                    if res is None:
+                        msg = "获取红包列表失败：无响应"
+                        logger.warning(f"[红包] {msg}")
+                        stats["errors"].append(msg)
+                        break
+
+                    if res.status_code != 200:
+                        msg = f"获取红包列表失败：HTTP {res.status_code}"
+                        logger.warning(f"[红包] {msg}")
+                        stats["errors"].append(msg)
+                        break
+
+                    try:
+                        data = res.json()
+                    except Exception as e:
+                        msg = f"解析红包响应失败: {str(e)}"
+                        logger.warning(f"[红包] {msg}")
+                        stats["errors"].append(msg)
+                        break
+
+                if not isinstance(data, dict) or not data.get("ok"):
+                    logger.info("[红包] 当前无可用红包，结束查询")
                     break
 
-                if any(kw in msg for kw in ["已经领取", "已达上限", "已过期"]):
-                    logger.info(f"[红包] 红包 {packet_id} 已处理，继续下一轮")
-                else:
-                    stats["errors"].append(f"领取失败: {msg}")
+                items = data.get("items", [])
+                if not isinstance(items, list) or len(items) == 0:
+                    logger.info("[红包] 红包列表为空，结束查询")
                     break
 
-            # 5. 间隔等待
-            time.sleep(1.2)
+                # 2. 本次列表中的新红包全部并发领取
+                packets = [p for p in items if isinstance(p, dict) and p.get("id") not in seen_ids]
+                if not packets:
+                    logger.info("[红包] 没有新的红包，结束查询")
+                    break
+                seen_ids.update(p.get("id") for p in packets)
+                logger.info(f"[红包] 发现 {len(packets)} 个红包，开始领取")
+                list(executor.map(claim, packets))
 
         if round_num >= max_rounds:
             logger.warning("[红包] 达到最大轮次限制，强制停止")
 
+        elapsed = time.perf_counter() - started
+        stats["run_claimed"] = run_claimed
+        stats["claims_per_second"] = round(run_claimed / elapsed, 2) if elapsed > 0 else 0
+
         stats["claimed_count"] = claimed_count
         stats["total_magic"] = total_magic
-        stats["last_run"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        stats["last_run"] = self._now().strftime("%Y-%m-%d %H:%M:%S")
 
         # 保存今日累计数据（复用入口处固定的键）
         self.save_data(date_key, {
@@ -644,9 +877,161 @@ class TangPingHelper(_PluginBase):
             "last_run": stats["last_run"],
         })
 
-        logger.info(f"[红包] 本次完成：领取 {stats['claimed_count']} 个，魔力 +{stats['total_magic']}")
+        logger.info(f"[红包] 本次完成：领取 {stats['claimed_count']} 个，魔力 +{stats['total_magic']}，"
+                    f"速率 {stats['claims_per_second']} 个/秒")
         return stats
 
+    # ==================== 红包监听 ====================
+
+    def _start_redpacket_watcher(self):
+        """启动红包监听线程"""
+        self._watch_stop = threading.Event()
+        self._watch_thread = threading.Thread(target=self._watch_redpacket,
+                                              args=(self._watch_stop,),
+                                              name="TangPingHelper.RedpacketWatcher",
+                                              daemon=True)
+        self._watch_thread.start()
+
+    def _stop_redpacket_watcher(self):
+        """停止红包监听线程"""
+        if self._watch_stop:
+            self._watch_stop.set()
+        if self._watch_thread and self._watch_thread.is_alive():
+            self._watch_thread.join(timeout=5)
+        self._watch_thread = None
+        self._watch_stop = None
+
+    def _redpacket_limit_reached(self) -> bool:
+        """今日红包是否已达上限（上限标记或累计达到服务端每日上限）"""
+        today_stats = self.get_data(self._today_key("redpacket_stats")) or {}
+        daily_max = today_stats.get("daily_max", 0)
+        return today_stats.get("daily_limit_reached", False) \
+            or (daily_max > 0 and today_stats.get("claimed_count", 0) >= daily_max)
+
+    def _seconds_until_tomorrow(self) -> float:
+        """距次日 00:00:05 的秒数"""
+        now = self._now()
+        tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=5, microsecond=0)
+        return (tomorrow - now).total_seconds()
+
+    def _watch_redpacket(self, stop: threading.Event):
+        """
+        持续监听红包。
+        发现新红包后立即领取并加快轮询，空闲时逐步放慢；
+        使用 ETag / Last-Modified 条件请求，内容未变化时服务端只需返回 304；
+        达到每日上限后暂停至次日。
+        """
+        logger.info("[红包] 监听已启动")
+        interval = self.REDPACKET_WATCH_MIN_INTERVAL
+        etag = last_modified = None
+        seen_ids = set()
+
+        while not stop.is_set():
+            try:
+                if self._redpacket_limit_reached():
+                    wait = self._seconds_until_tomorrow()
+                    logger.info(f"[红包] 今日已达领取上限，监听暂停 {wait / 3600:.1f} 小时")
+                    seen_ids.clear()
+                    etag = last_modified = None
+                    interval = self.REDPACKET_WATCH_MIN_INTERVAL
+                    stop.wait(wait)
+                    continue
+
+                # 每次都从站点缓存读取，站点 Cookie 更新后立即生效
+                site_info = self._get_site_info()
+                if not site_info:
+                    stop.wait(self.REDPACKET_WATCH_MAX_INTERVAL)
+                    continue
+
+                headers = {}
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+                res = self._make_get_request(site_info, self.REDPACKET_LATEST_PATH, headers=headers)
+
+                new_ids = []
+                data = None
+                if res is not None and res.status_code == 200:
+                    etag = res.headers.get("ETag")
+                    last_modified = res.headers.get("Last-Modified")
+                    try:
+                        data = res.json()
+                    except ValueError:
+                        # 非JSON响应（如登录页、维护页），不缓存条件请求标识，下次完整请求
+                        logger.warning("[红包] 监听响应不是有效的JSON，稍后重试")
+                        data = None
+                        etag = last_modified = None
+                    if not isinstance(data, dict):
+                        data = {}
+                    items = data.get("items") if data.get("ok") else []
+                    if isinstance(items, list):
+                        new_ids = [p.get("id") for p in items if isinstance(p, dict) and p.get("id") not in seen_ids]
+                elif res is None or res.status_code != 304:
+                    logger.warning(f"[红包] 监听请求失败: HTTP {res.status_code if res is not None else '无响应'}")
+
+                if new_ids:
+                    seen_ids.update(new_ids)
+                    logger.info(f"[红包] 监听到 {len(new_ids)} 个新红包，立即领取")
+                    stats = self._run_redpacket(site_info, latest=data)
+                    if self._notify and stats.get("run_claimed"):
+                        self._send_notification(site_info.get("name", "躺平PT"), redpacket_stats=stats)
+                    interval = self.REDPACKET_WATCH_MIN_INTERVAL
+                else:
+                    interval = min(interval * 1.5, self.REDPACKET_WATCH_MAX_INTERVAL)
+            except Exception as e:
+                logger.error(f"[红包] 监听异常: {str(e)}")
+                interval = self.REDPACKET_WATCH_MAX_INTERVAL
+            stop.wait(interval)
+
+        logger.info("[红包] 监听已停止")
+
+    def _claim_redpacket(self, site_info: Dict, packet: Dict) -> Tuple[str, str, int, Optional[int]]:
+        """
+        领取单个红包。
+        返回: (结果, 消息, 魔力, 剩余次数)，结果为 ok / limit / skip / error / fatal
+        """
+        packet_id = packet.get("id")
+        claim_res = self._make_post_request(
+            site_info,
+            self.REDPACKET_CLAIM_PATH,
+            data={"packet_id": packet_id}
+        )
+
+        if claim_res is None:
+            return "error", f"领取红包 {packet_id} 失败：无响应", 0, None
+
+        if claim_res.status_code == 422:
+            # 每日上限（HTTP 422）
+            try:
+                limit_msg = claim_res.json().get("message", "每日上限（HTTP 422）")
+            except Exception:
+                limit_msg = "每日上限（HTTP 422）"
+            return "limit", limit_msg, 0, None
+
+        if claim_res.status_code != 200:
+            return "error", f"领取红包 {packet_id} 失败：HTTP {claim_res.status_code}", 0, None
+
+        try:
+            claim_data = claim_res.json()
+        except Exception as e:
+            return "error", f"解析领取响应失败: {str(e)}", 0, None
+        if not isinstance(claim_data, dict):
+            return "error", f"解析领取响应失败: {str(claim_data)[:100]}", 0, None
+
+        if claim_data.get("ok"):
+            magic = claim_data.get("magic_amount", 0)
+            metrics.inc("redpacket_claimed_total")
+            metrics.inc("redpacket_magic_total", magic or 0)
+            return "ok", "", magic, claim_data.get("remain_count", 0)
+
+        msg = claim_data.get("message", "")
+        if "每天最多领" in msg:
+            return "limit", msg, 0, None
+        if any(kw in msg for kw in ["已经领取", "已达上限", "已过期"]):
+            return "skip", msg, 0, None
+        return "fatal", f"领取失败: {msg}", 0, None
+
     # ==================== 抽奖模块 ====================
 
     def _parse_summary_lines(self, lines):
@@ -665,27 +1050,32 @@ class TangPingHelper(_PluginBase):
             line = line.strip()
             if not line:
                 continue
-
-            # 匹配 "key：数值 单位（可选注释）"
-            m = re.match(r'^(.+?)[：:]\s*([\d.]+)\s*(\S+?)(?:\s*[（(]([^)]*)[)）])?\s*$', line)
-            if m:
-                label = m.group(1).strip()
-                val = float(m.group(2))
-                unit = m.group(3)
-                if not parsed.get(label):
-                    parsed[label] = {"value": 0, "unit": unit}
-                parsed[label]["value"] += val
+            item = self._parse_summary_line(line)
+            if not item:
                 continue
+            label, val, unit = item
+            if label not in parsed:
+                parsed[label] = {"value": 0, "unit": unit}
+            parsed[label]["value"] += val
+        return parsed
 
-            # 兼容：已发放X个
-            issued_m = re.match(r'已发放\s*([\d.]+)\s*个', line)
-            if issued_m:
-                key = "邀请已发放"
-                if key not in parsed:
-                    parsed[key] = {"value": 0, "unit": "个"}
-                parsed[key]["value"] += float(issued_m.group(1))
+    def _parse_summary_line(self, line: str) -> Optional[Tuple[str, float, str]]:
+        """解析单行权益汇总，按行文本缓存结果（抽奖结果中大量行完全相同），名称与单位做字符串驻留"""
+        cache = self._summary_line_cache
+        if line in cache:
+            return cache[line]
 
-        return parsed
+        m = _SUMMARY_LINE_RE.match(line)
+        if m:
+            item = (sys.intern(m.group(1)), float(m.group(2)), sys.intern(m.group(3)))
+        else:
+            m = _SUMMARY_ISSUED_RE.match(line)
+            item = ("邀请已发放", float(m.group(1)), "个") if m else None
+
+        if len(cache) >= self.SUMMARY_CACHE_SIZE:
+            cache.clear()
+        cache[line] = item
+        return item
 
     def _parse_lottery_remaining(self, html: str) -> int:
         """从抽奖页面 HTML 解析今日剩余可抽次数"""
@@ -710,34 +1100,37 @@ class TangPingHelper(_PluginBase):
         """
         抽奖累加器核心逻辑。
         1. 先抓 omnibot_lottery.php 解析今日剩余次数
-        2. 每次请求抽 100 次，循环直到 ok=false（次数用完）
-        3. 固定间隔 5 秒
+        2. 本地跟踪剩余次数，每次请求选 ≤ 剩余次数的最大合法档位，剩余为 0 时直接结束
+        3. 请求间隔随响应耗时自适应，遇到限流时退避
+        4. 每批结果追加到当日账本并增量累加统计，每 N 次请求写一次检查点，中断后从检查点恢复账本与累计，
+           剩余次数总是重新从抽奖页面获取
         """
-        # 加载今日已有累计（固定键，避免跨午夜不一致）
+        # 加载今日已有累计与账本（固定键，避免跨午夜不一致）
         date_key = self._today_key("lottery_stats")
+        ledger_key = self._today_key("lottery_ledger")
         today_stats = self.get_data(date_key) or {}
-        total_draws = today_stats.get("total_draws", 0)
-        total_cost = today_stats.get("total_cost", 0)
-        total_compensated = today_stats.get("total_compensated", 0)
-        total_awarded = today_stats.get("total_awarded", 0)
-        summary_acc = today_stats.get("summary", {})
+        ledger = self.get_data(ledger_key) or {"labels": [], "units": [], "rows": []}
 
         stats = {
             "request_count": today_stats.get("request_count", 0),
-            "total_draws": total_draws,
-            "total_cost": total_cost,
-            "total_compensated": total_compensated,
-            "total_awarded": total_awarded,
+            "total_draws": today_stats.get("total_draws", 0),
+            "total_cost": today_stats.get("total_cost", 0),
+            "total_compensated": today_stats.get("total_compensated", 0),
+            "total_awarded": today_stats.get("total_awarded", 0),
             "first_bonus_after": today_stats.get("first_bonus_after"),
             "last_bonus_after": today_stats.get("last_bonus_after"),
-            "summary": summary_acc,
-            "net_change": total_awarded - total_cost,
+            "summary": today_stats.get("summary", {}),
+            "net_change": today_stats.get("net_change", 0),
             "errors": [],
             "stopped_early": False,
             "stop_reason": "",
-            "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "start_time": self._now().strftime("%Y-%m-%d %H:%M:%S"),
         }
 
+        if today_stats.get("in_progress"):
+            # 上次运行中断，账本与累计从检查点恢复；检查点之后可能还有已完成的抽奖，剩余次数以服务端为准
+            logger.info(f"[抽奖] 从检查点恢复，已记录 {len(ledger['rows'])} 批")
+
         # 先获取抽奖页面，检查剩余次数
         logger.info("[抽奖] 获取抽奖页面...")
         page_html = None
@@ -752,29 +1145,34 @@ class TangPingHelper(_PluginBase):
         if remaining == 0:
             logger.info("[抽奖] 今日剩余抽奖次数为 0，跳过")
             stats["stop_reason"] = "今日次数已用完"
+            if today_stats.get("in_progress"):
+                # 中断后次数已在其他地方用完，清除运行中标记，避免之后每次都从检查点恢复
+                stats["end_time"] = self._now().strftime("%Y-%m-%d %H:%M:%S")
+                self._lottery_checkpoint(date_key, ledger_key, stats, ledger, remaining, in_progress=False)
             return stats
         if remaining > 0:
             logger.info(f"[抽奖] 今日还可抽 {remaining} 次，开始循环")
 
-        # 合法的抽奖档位（服务器仅接受这些值）
-        VALID_DRAW_COUNTS = [100, 50, 20, 10, 1]
+        pacer = _LotteryPacer(self.LOTTERY_DELAY, self.LOTTERY_MIN_DELAY, self.LOTTERY_MAX_DELAY)
+        limited_count = 0
 
         i = 0
         while True:
             i += 1
-            # 根据剩余次数自适应 count：选 ≤ remaining 的最大合法档位
+            # 选 ≤ remaining 的最大合法档位；剩余次数未知时按最大档位
             if remaining > 0:
-                batch = next((c for c in VALID_DRAW_COUNTS if c <= remaining), 1)
+                batch = next(c for c in self.VALID_DRAW_COUNTS if c <= remaining)
             else:
-                batch = 100
+                batch = self.VALID_DRAW_COUNTS[0]
             logger.info(f"[抽奖] 第 {i} 次请求（count={batch}）...")
 
+            started = time.monotonic()
             res = self._make_post_request(
                 site_info,
                 self.LOTTERY_DRAW_PATH,
                 data={"count": batch}
             )
-            remaining = -1  # 仅首轮使用解析值
+            latency = time.monotonic() - started
 
             if res is None:
                 msg = f"第 {i} 次请求失败：无响应"
@@ -787,6 +1185,21 @@ class TangPingHelper(_PluginBase):
                 time.sleep(3)
                 continue
 
+            # 限流：退避后以相同档位重试
+            if res.status_code == 429:
+                limited_count += 1
+                metrics.inc("lottery_limited_total")
+                pacer.observe(latency, limited=True)
+                if limited_count >= self.LOTTERY_MAX_LIMITED:
+                    stats["stopped_early"] = True
+                    stats["stop_reason"] = "请求持续被限流，停止抽奖"
+                    break
+                logger.info(f"[抽奖] 请求被限流，{pacer.delay:.1f} 秒后重试")
+                pacer.wait()
+                continue
+            limited_count = 0
+            pacer.observe(latency)
+
             stats["request_count"] += 1
 
             try:
@@ -802,36 +1215,26 @@ class TangPingHelper(_PluginBase):
             ok = data.get("ok")
 
             if ok is True:
-                draw_count = data.get("draw_count", 0)
-                cost = data.get("total_cost", 0)
-                compensated = data.get("total_compensated_bonus", 0)
-                awarded = data.get("total_awarded_bonus", 0)
-                bonus_after = data.get("user_bonus_after")
-
-                total_draws += draw_count
-                total_cost += cost
-                total_compensated += compensated
-                total_awarded += awarded
-
-                if stats["first_bonus_after"] is None and bonus_after is not None:
-                    stats["first_bonus_after"] = bonus_after
-                if bonus_after is not None:
-                    stats["last_bonus_after"] = bonus_after
-
-                # 解析权益汇总
-                summary_src = data.get("summary_lines") or data.get("summary_text")
-                if summary_src:
-                    parsed = self._parse_summary_lines(summary_src)
-                    for key, item in parsed.items():
-                        if key not in summary_acc:
-                            summary_acc[key] = {"value": 0, "unit": item.get("unit", "")}
-                        summary_acc[key]["value"] += item["value"]
+                row = self._ledger_append(ledger, data)
+                self._ledger_apply(stats, ledger, row)
+                _, draw_count, cost, awarded, compensated = row[:5]
+                metrics.inc("lottery_draws_total", draw_count or 0)
+                if remaining > 0:
+                    remaining = max(remaining - draw_count, 0)
 
                 logger.info(
                     f"[抽奖] ✅ 第{i}次 抽奖{draw_count}次 "
                     f"消耗:{cost} 获得:{awarded} 补偿:{compensated}"
                 )
 
+                # 本地剩余次数用完即结束，省去最后一次必然失败的请求
+                if remaining == 0:
+                    stats["stop_reason"] = "今日次数已用完"
+                    break
+                # 服务端未返回有效抽奖数时回退为未知，按最大档位继续
+                if draw_count <= 0:
+                    remaining = -1
+
             elif ok is False:
                 fail_msg = data.get("message") or data.get("msg") or "服务器返回失败"
                 logger.info(f"[抽奖] ⏹ 停止: {fail_msg}")
@@ -857,39 +1260,95 @@ class TangPingHelper(_PluginBase):
                 stats["stop_reason"] = f"未知响应状态: ok={ok}"
                 break
 
-            # 固定 5 秒间隔
-            time.sleep(self.LOTTERY_DELAY)
+            if stats["request_count"] % self.LOTTERY_CHECKPOINT_EVERY == 0:
+                self._lottery_checkpoint(date_key, ledger_key, stats, ledger, remaining, in_progress=True)
 
-        stats["total_draws"] = total_draws
-        stats["total_cost"] = total_cost
-        stats["total_compensated"] = total_compensated
-        stats["total_awarded"] = total_awarded
-        stats["summary"] = summary_acc
-        stats["end_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        stats["net_change"] = total_awarded - total_cost
+            pacer.wait()
 
-        # 保存今日累计数据（复用入口处固定的键）
+        stats["end_time"] = self._now().strftime("%Y-%m-%d %H:%M:%S")
+        self._lottery_checkpoint(date_key, ledger_key, stats, ledger, remaining, in_progress=False)
+
+        logger.info(
+            f"[抽奖] 本次完成：请求{stats['request_count']}次 "
+            f"抽奖{stats['total_draws']}次 消耗{stats['total_cost']} 获得{stats['total_awarded']} "
+            f"净变化{stats['net_change']:+}"
+        )
+        return stats
+
+    def _ledger_append(self, ledger: Dict, data: Dict) -> list:
+        """
+        将一次抽奖响应编码为紧凑的账本行并追加到账本：
+        [当日秒数, 抽奖数, 消耗, 获得, 补偿, 余额, 权益序号, 数值, 权益序号, 数值, ...]
+        权益名称与单位只在 labels / units 中各存一份
+        """
+        now = self._now()
+        row = [now.hour * 3600 + now.minute * 60 + now.second,
+               data.get("draw_count", 0),
+               data.get("total_cost", 0),
+               data.get("total_awarded_bonus", 0),
+               data.get("total_compensated_bonus", 0),
+               data.get("user_bonus_after")]
+
+        summary_src = data.get("summary_lines") or data.get("summary_text")
+        if summary_src:
+            labels = ledger["labels"]
+            for label, item in self._parse_summary_lines(summary_src).items():
+                if label not in labels:
+                    labels.append(label)
+                    ledger["units"].append(item.get("unit", ""))
+                row += [labels.index(label), item["value"]]
+
+        ledger["rows"].append(row)
+        return row
+
+    @staticmethod
+    def _ledger_apply(stats: Dict, ledger: Dict, row: list):
+        """将一行账本增量累加到统计数据"""
+        _, draws, cost, awarded, compensated, bonus_after = row[:6]
+        stats["total_draws"] += draws
+        stats["total_cost"] += cost
+        stats["total_awarded"] += awarded
+        stats["total_compensated"] += compensated
+        stats["net_change"] = stats["total_awarded"] - stats["total_cost"]
+
+        if bonus_after is not None:
+            if stats["first_bonus_after"] is None:
+                stats["first_bonus_after"] = bonus_after
+            stats["last_bonus_after"] = bonus_after
+
+        summary = stats["summary"]
+        for idx, value in zip(row[6::2], row[7::2]):
+            item = summary.setdefault(ledger["labels"][idx], {"value": 0, "unit": ledger["units"][idx]})
+            item["value"] += value
+
+    def _lottery_checkpoint(self, date_key: str, ledger_key: str, stats: Dict, ledger: Dict,
+                            remaining: int, in_progress: bool):
+        """写入抽奖检查点：当日账本、当日累计与跨天汇总"""
+        self.save_data(ledger_key, ledger)
         self.save_data(date_key, {
             "request_count": stats["request_count"],
-            "total_draws": total_draws,
-            "total_cost": total_cost,
-            "total_compensated": total_compensated,
-            "total_awarded": total_awarded,
+            "total_draws": stats["total_draws"],
+            "total_cost": stats["total_cost"],
+            "total_compensated": stats["total_compensated"],
+            "total_awarded": stats["total_awarded"],
             "first_bonus_after": stats["first_bonus_after"],
             "last_bonus_after": stats["last_bonus_after"],
-            "summary": summary_acc,
+            "summary": stats["summary"],
             "net_change": stats["net_change"],
             "start_time": stats["start_time"],
-            "end_time": stats["end_time"],
+            "end_time": stats.get("end_time"),
             "stop_reason": stats["stop_reason"],
+            "remaining": remaining,
+            "in_progress": in_progress,
         })
 
-        logger.info(
-            f"[抽奖] 本次完成：请求{stats['request_count']}次 "
-            f"抽奖{total_draws}次 消耗{total_cost} 获得{total_awarded} "
-            f"净变化{stats['net_change']:+}"
-        )
-        return stats
+        # 跨天汇总：{日期: [抽奖数, 消耗, 获得, 补偿]}，不随按天数据清除
+        history = self.get_data("lottery_history") or {}
+        history[date_key.rsplit("_", 1)[1]] = [stats["total_draws"], stats["total_cost"],
+                                               stats["total_awarded"], stats["total_compensated"]]
+        for day in sorted(history)[:-self.LOTTERY_HISTORY_DAYS]:
+            history.pop(day)
+        self.save_data("lottery_history", history)
 
     # ==================== 统一调度 ====================
 
@@ -923,36 +1382,40 @@ class TangPingHelper(_PluginBase):
         site_name = site_info.get("name", "躺平PT")
         logger.info(f"使用站点: {site_name} (auto-matched)")
 
-        redpacket_stats = None
-        lottery_stats = None
-        task_stats = None
-
+        # 各模块并发执行，共享同一会话（连接池与 Cookie），限速由各模块自行控制
+        jobs = []
         if do_redpacket:
-            logger.info("[红包] 立即领取...")
-            try:
-                redpacket_stats = self._run_redpacket(site_info)
-            except Exception as e:
-                logger.error(f"[红包] 异常: {str(e)}")
-                traceback.print_exc()
-
+            jobs.append(("redpacket_stats", "红包", self._run_redpacket))
         if do_lottery:
-            logger.info("[抽奖] 立即抽奖...")
-            try:
-                lottery_stats = self._run_lottery(site_info)
-            except Exception as e:
-                logger.error(f"[抽奖] 异常: {str(e)}")
-                traceback.print_exc()
-
+            jobs.append(("lottery_stats", "抽奖", self._run_lottery))
         if do_task:
-            logger.info("[任务] 立即领取...")
-            try:
-                task_stats = self._run_task_claim(site_info)
-            except Exception as e:
-                logger.error(f"[任务] 异常: {str(e)}")
-                traceback.print_exc()
+            jobs.append(("task_stats", "任务", self._run_task_claim))
+        if not jobs:
+            return
 
-        if self._notify and (redpacket_stats or lottery_stats or task_stats):
-            self._send_notification(site_name, redpacket_stats, lottery_stats, task_stats)
+        session = self._open_session()
+        shared_site_info = {**site_info, "session": session}
+        results = {}
+        try:
+            with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="TangPingHelper") as pool:
+                futures = {}
+                for key, name, func in jobs:
+                    logger.info(f"[{name}] 立即执行...")
+                    futures[pool.submit(func, shared_site_info)] = (key, name)
+                for future in as_completed(futures):
+                    key, name = futures[future]
+                    try:
+                        results[key] = future.result()
+                        logger.info(f"[{name}] 执行完成")
+                    except Exception as e:
+                        logger.error(f"[{name}] 异常: {str(e)}")
+                        traceback.print_exc()
+        finally:
+            session.close()
+
+        # 全部模块结束后合并发送一次通知
+        if self._notify and any(results.values()):
+            self._send_notification(site_name, **results)
 
         logger.info("躺平PT助手 立即执行完成")
         logger.info("=" * 50)
@@ -967,6 +1430,8 @@ class TangPingHelper(_PluginBase):
             parts.append("🧧 红包领取:")
             parts.append(f"  · 本次领取: {rp.get('claimed_count', 0)} 个")
             parts.append(f"  · 获得魔力: {rp.get('total_magic', 0)}")
+            if rp.get("claims_per_second"):
+                parts.append(f"  · 领取速率: {rp['claims_per_second']} 个/秒")
             if rp.get("daily_limit_reached"):
                 parts.append(f"  · 状态: 已达到每日上限 ({rp.get('limit_reason', '')})")
             if rp.get("errors"):
@@ -1041,8 +1506,8 @@ class TangPingHelper(_PluginBase):
                     "func": self.run_lottery_service,
                     "kwargs": {}
                 })
-        # 红包
-        if self._enabled_redpacket:
+        # 红包（开启持续监听时由监听线程负责）
+        if self._enabled_redpacket and not self._redpacket_watch:
             trigger = self._parse_cron(self._cron_redpacket)
             if trigger:
                 services.append({
@@ -1052,8 +1517,8 @@ class TangPingHelper(_PluginBase):
                     "func": self.run_redpacket_service,
                     "kwargs": {}
                 })
-        # 任务
-        if self._enabled_task:
+        # 任务（开启按领取窗口调度时由窗口调度器负责）
+        if self._enabled_task and not self._task_window:
             trigger = self._parse_cron(self._cron_task)
             if trigger:
                 services.append({
@@ -1101,6 +1566,22 @@ class TangPingHelper(_PluginBase):
             self._send_notification(site_info.get("name", "躺平PT"), **kwargs)
         logger.info(f"[{name}] 定时任务完成")
 
+    # ==================== 事件响应 ====================
+
+    @eventmanager.register(EventType.SiteUpdated)
+    def site_updated(self, event: Event):
+        """站点更新时清除站点缓存"""
+        if not event or not event.event_data:
+            return
+        self._invalidate_site_cache(domain=event.event_data.get("domain"))
+
+    @eventmanager.register(EventType.SiteDeleted)
+    def site_deleted(self, event: Event):
+        """站点删除时清除站点缓存"""
+        if not event or not event.event_data:
+            return
+        self._invalidate_site_cache(site_id=event.event_data.get("site_id"))
+
     # ==================== API 接口 ====================
 
     def get_api(self) -> List[Dict[str, Any]]:
@@ -1112,8 +1593,23 @@ class TangPingHelper(_PluginBase):
             "auth": "bear",
             "summary": "自动领取躺平PT任务",
             "description": "获取任务列表并按照优先级规则自动领取当日任务",
+        }, {
+            "path": "/metrics",
+            "endpoint": self.metrics_api,
+            "methods": ["GET"],
+            "auth": "apikey",
+            "summary": "运行指标",
+            "description": "Prometheus 文本格式的请求次数、耗时与红包 / 抽奖统计，使用 apikey 参数认证",
         }]
 
+    @staticmethod
+    def metrics_api(apikey: str = None) -> PlainTextResponse:
+        """API: Prometheus 文本格式的运行指标"""
+        # 接口内再校验 apikey，不依赖主程序版本是否支持路由认证
+        if not apikey or apikey != settings.API_TOKEN:
+            return PlainTextResponse("API密钥错误\n", status_code=401)
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
     def claim_task_api(self) -> dict:
         """API: 手动触发任务领取"""
         site_info = self._get_site_info()
@@ -1229,7 +1725,7 @@ class TangPingHelper(_PluginBase):
                             },
                         ]
                     },
-                    # 第三排：自动领任务 | 任务周期 | 立即领任务
+                    # 第三排：自动领任务 | 任务周期 | 按窗口调度 | 立即领任务
                     {
                         'component': 'VRow',
                         'content': [
@@ -1248,7 +1744,7 @@ class TangPingHelper(_PluginBase):
                             },
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12, 'md': 6},
+                                'props': {'cols': 12, 'md': 3},
                                 'content': [
                                     {
                                         'component': 'VCronField',
@@ -1260,6 +1756,21 @@ class TangPingHelper(_PluginBase):
                                     }
                                 ]
                             },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'task_window',
+                                            'label': '按领取窗口调度',
+                                            'hint': '每天开放后领取一次，月末优先 BUG/VIP，忽略领任务周期',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
                             {
                                 'component': 'VCol',
                                 'props': {'cols': 12, 'md': 3},
@@ -1275,7 +1786,7 @@ class TangPingHelper(_PluginBase):
                             },
                         ]
                     },
-                    # 第四排：自动领红包 | 红包周期 | 立即领红包
+                    # 第四排：自动领红包 | 红包周期 | 持续监听 | 立即领红包
                     {
                         'component': 'VRow',
                         'content': [
@@ -1294,7 +1805,7 @@ class TangPingHelper(_PluginBase):
                             },
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12, 'md': 6},
+                                'props': {'cols': 12, 'md': 3},
                                 'content': [
                                     {
                                         'component': 'VCronField',
@@ -1306,6 +1817,21 @@ class TangPingHelper(_PluginBase):
                                     }
                                 ]
                             },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'redpacket_watch',
+                                            'label': '持续监听红包',
+                                            'hint': '开启后持续轮询红包并立即领取，忽略领红包周期',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
                             {
                                 'component': 'VCol',
                                 'props': {'cols': 12, 'md': 3},
@@ -1339,8 +1865,10 @@ class TangPingHelper(_PluginBase):
                                             'text': '自动匹配 tangpt.top 站点（需先在站点管理中配置）。'
                                                     '抽奖默认每6h执行一次（0 */6 * * *），红包默认每10min执行一次（*/10 * * * *），'
                                                     '任务默认每6h执行一次（0 */6 * * *），留空则不定时执行。'
-                                                    '抽奖固定循环至次数用完（间隔5s）；红包循环领取至无红包；'
-                                                    '任务距今日结束≥2h可领，月末 BUG>VIP>苍蝇腿，平时只领苍蝇腿。'
+                                                    '抽奖按剩余次数选最大档位循环至用完，间隔随服务器响应自适应；红包循环领取至无红包，'
+                                                    '开启持续监听后发现红包即领取，达到每日上限后暂停至次日；'
+                                                    '任务距今日结束≥2h可领，月末 BUG>VIP>苍蝇腿，平时只领苍蝇腿；'
+                                                    '按领取窗口调度时每天 00:05 领取一次，失败时每 30 分钟重试直至当日截止。'
                                         }
                                     }
                                 ]
@@ -1361,13 +1889,15 @@ class TangPingHelper(_PluginBase):
             "onlyonce_lottery": False,
             "onlyonce_redpacket": False,
             "onlyonce_task": False,
+            "redpacket_watch": False,
+            "task_window": False,
         }
 
     # ==================== 统计详情页面 ====================
 
     def get_page(self) -> List[dict]:
         """拼装插件详情页面，展示当日统计数据（现代化全宽设计）"""
-        date_str = datetime.now().strftime("%Y-%m-%d")
+        date_str = self._now().strftime("%Y-%m-%d")
         redpacket_data = self.get_data(f"redpacket_stats_{date_str}") or {}
         lottery_data = self.get_data(f"lottery_stats_{date_str}") or {}
         task_data = self.get_data(f"task_stats_{date_str}") or {}
@@ -1487,6 +2017,12 @@ class TangPingHelper(_PluginBase):
                         }]
                     })
 
+        # ── 抽奖近期趋势 ──
+        history = self.get_data("lottery_history") or {}
+        if len(history) > 1:
+            page.append(self._section_header('📈', f'近 {len(history)} 天抽奖', '#8b5cf6'))
+            page.append(self._lottery_history_chart(history))
+
         return page
 
     # ── 页面组件辅助方法 ──
@@ -1559,6 +2095,35 @@ class TangPingHelper(_PluginBase):
             'content': cols,
         }
 
+    def _lottery_history_chart(self, history: Dict) -> dict:
+        """按天展示抽奖次数条形图与魔力净变化"""
+        max_draws = max((v[0] for v in history.values()), default=0) or 1
+        rows = []
+        for day in sorted(history, reverse=True):
+            draws, cost, awarded, _ = history[day]
+            net = awarded - cost
+            rows.append({
+                'component': 'div',
+                'props': {'class': 'd-flex align-center mb-1'},
+                'content': [
+                    {'component': 'span', 'props': {'class': 'text-caption text-grey', 'style': 'width: 90px'},
+                     'text': day},
+                    {'component': 'VProgressLinear',
+                     'props': {'model-value': draws * 100 / max_draws, 'color': '#8b5cf6',
+                               'height': 10, 'rounded': True, 'class': 'flex-grow-1 mx-2'}},
+                    {'component': 'span', 'props': {'class': 'text-caption', 'style': 'width: 70px'},
+                     'text': f'{self._fmt_num(draws)} 次'},
+                    {'component': 'span',
+                     'props': {'class': 'text-caption text-right',
+                               'style': f"width: 80px; color: {'#22c55e' if net >= 0 else '#ef4444'}"},
+                     'text': f"{'+' if net > 0 else ''}{self._fmt_num(net)}"},
+                ]
+            })
+        return {
+            'component': 'VRow',
+            'content': [{'component': 'VCol', 'props': {'cols': 12}, 'content': rows}]
+        }
+
     @staticmethod
     def _fmt_num(val) -> str:
         """格式化数字：超过千位使用 K/M/B，否则直接展示"""
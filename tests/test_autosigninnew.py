@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import requires_moviepilot
+
+pytestmark = requires_moviepilot
+
+
+@pytest.fixture
+def llm():
+    from app.plugins.autosigninnew.openai import OpenAi
+
+    client = OpenAi(api_key="test", api_url="http://127.0.0.1:9/v1", concurrency=1, timeout=0.5)
+    yield client
+    client.close()
+
+
+def _completion(text: str):
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def test_llm_timeout_releases_concurrency_slot(llm, monkeypatch):
+    cancelled = []
+
+    async def create(messages, **kwargs):
+        if messages[-1]["content"] == "slow":
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return _completion("ok")
+
+    monkeypatch.setattr(llm._client.chat.completions, "create", create)
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        llm._chat("slow")
+    # 等待时间受 timeout 限制，而不是 timeout 的两倍
+    assert time.perf_counter() - start < 1.5
+    # 超时的请求已取消，唯一的并发名额可以继续使用
+    assert llm._chat("fast") == "ok"
+    assert cancelled == [True]
+    assert not llm._inflight
+
+
+def test_hdsky_retry_fetches_fresh_captcha(routed, monkeypatch):
+    from app.plugins.autosigninnew.captcha import CaptchaSolver
+    from app.plugins.autosigninnew.sites.hdsky import HDSky
+
+    answers = [None, None, "abcdef"]
+    monkeypatch.setattr(CaptchaSolver, "solve", lambda self, image, mime_type=None: answers.pop(0))
+    monkeypatch.setattr("time.sleep", lambda _: None)
+    state, message = HDSky().signin({"name": "HDSky", "url": "https://hdsky.me/", "cookie": "c=1",
+                                     "ua": "test", "timeout": 5})
+    assert state, message
+    # 每次重试都更换验证码，而不是重复识别同一张图片
+    assert routed.hits["/image_code_ajax.php"] == 3
+    assert routed.hits["/image.php"] == 3
+    assert routed.hits["/showup.php"] == 1
+
+
+def test_span_splits_time_to_first_byte_into_wait():
+    from datetime import timedelta
+    from app.plugins.autosigninnew.tracing import PHASES, site_trace, span
+
+    with site_trace("test") as trace:
+        with span("fetch") as current:
+            time.sleep(0.05)
+            current.response(SimpleNamespace(elapsed=timedelta(seconds=0.02)))
+    phases = [PHASES[idx] for idx, _, _ in trace.spans]
+    assert phases == ["wait", "fetch"]
+    assert trace.spans[0][2] == pytest.approx(0.02)
+
+
+@pytest.fixture
+def signin(monkeypatch):
+    """不访问站点的签到插件：站点来自 SitesHelper，签到结果由 fake 函数给出"""
+    from app.helper.sites import SitesHelper
+    from app.plugins.autosigninnew import AutoSignInNew
+    from app.plugins.autosigninnew.sitecache import site_cache
+
+    sites = [{"id": i, "name": f"site{i}", "url": f"https://site{i}.example.org/", "public": False}
+             for i in range(1, 46)]
+    monkeypatch.setattr(SitesHelper, "indexers", sites)
+    site_cache.invalidate()
+    plugin = AutoSignInNew()
+    plugin._queue_cnt = 4
+    plugin.del_data(key=f"{datetime.now().month}月{datetime.now().day}日")
+    yield plugin
+    plugin.del_data(key=f"{datetime.now().month}月{datetime.now().day}日")
+
+
+def _fake_site(plugin, gate=None):
+    """返回替代 signin_site|login_site 的函数，gate 设置前阻塞"""
+    from app.plugins.autosigninnew.result import SiteResult
+    from app.plugins.autosigninnew.tracing import site_trace
+
+    def run_site(site_info, run=None):
+        with site_trace(site_info.get("name")) as trace:
+            if gate:
+                gate.wait(5)
+        result = SiteResult(site_info, True, "签到成功")
+        plugin._AutoSignInNew__record_trace(run, trace, result.ok)
+        return result
+
+    return run_site
+
+
+def test_details_are_saved_in_batches(signin, monkeypatch):
+    key = f"{datetime.now().month}月{datetime.now().day}日"
+    saves = []
+    save_data = type(signin).save_data
+
+    def counting_save(self, *args, **kwargs):
+        if (kwargs.get("key") or args[0]) == key:
+            saves.append(len(kwargs.get("value") or args[1]))
+        return save_data(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(signin), "save_data", counting_save)
+    monkeypatch.setattr(signin, "signin_site", _fake_site(signin))
+    signin._AutoSignInNew__do(datetime.now(), "签到", [])
+    # 45 个站点，每 20 个保存一次，结束时保存剩余部分
+    assert saves == [20, 40, 45]
+    assert len(signin.get_data(key)) == 45
+
+
+def test_concurrent_runs_keep_separate_progress_and_traces(signin, monkeypatch):
+    import threading
+
+    gate = threading.Event()
+    monkeypatch.setattr(signin, "signin_site", _fake_site(signin, gate))
+    monkeypatch.setattr(signin, "login_site", _fake_site(signin, gate))
+    today = datetime.now()
+    threads = [threading.Thread(target=signin._AutoSignInNew__do, args=(today, type_str, sites))
+               for type_str, sites in (("签到", [1, 2, 3]), ("登录", [4, 5]))]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while len(signin._AutoSignInNew__progress_card()) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    # 两次执行同时进行，各自显示进度
+    cards = signin._AutoSignInNew__progress_card()
+    assert sorted(card["content"][0]["text"][:2] for card in cards) == ["登录", "签到"]
+    gate.set()
+    for thread in threads:
+        thread.join(10)
+    assert not signin._AutoSignInNew__progress_card()
+    runs = signin.get_data(key=f"trace-{today.strftime('%Y-%m-%d')}")
+    assert sorted((run["type"], sorted(row[0] for row in run["sites"])) for run in runs[-2:]) == [
+        ("登录", ["site4", "site5"]),
+        ("签到", ["site1", "site2", "site3"]),
+    ]
+
+
+def test_stop_service_closes_llm_after_running_runs(signin, monkeypatch):
+    import threading
+
+    gate = threading.Event()
+    closed = threading.Event()
+    signin._openai = SimpleNamespace(reset_metrics=lambda: None, close=closed.set)
+    monkeypatch.setattr(signin, "STOP_WAIT_TIMEOUT", 0.1)
+    monkeypatch.setattr(signin, "signin_site", _fake_site(signin, gate))
+    thread = threading.Thread(target=signin._AutoSignInNew__do, args=(datetime.now(), "签到", [1, 2]))
+    thread.start()
+    deadline = time.time() + 5
+    while not signin._AutoSignInNew__progress_card() and time.time() < deadline:
+        time.sleep(0.01)
+
+    signin.stop_service()
+    # 执行中不关闭大模型客户端，之后开始的站点不再使用
+    assert signin._openai is None
+    assert not closed.is_set()
+    gate.set()
+    thread.join(10)
+    assert closed.wait(5)
+
+
+def test_init_keeps_selection_when_site_list_is_empty(monkeypatch):
+    from app.db.site_oper import SiteOper
+    from app.plugins.autosigninnew import AutoSignInNew
+
+    config = {"sign_sites": [1, 2], "login_sites": [2]}
+    monkeypatch.setattr(SiteOper, "rows", [])
+    plugin = AutoSignInNew()
+    plugin.update_config(dict(config))
+    plugin.init_plugin(dict(config))
+    # 读取不到站点时不清空、不保存已选站点
+    assert plugin._sign_sites == [1, 2] and plugin._login_sites == [2]
+    assert plugin.get_config()["sign_sites"] == [1, 2]
+
+    monkeypatch.setattr(SiteOper, "rows", [SimpleNamespace(id=2, name="b")])
+    plugin.init_plugin(dict(config))
+    assert plugin._sign_sites == [2] and plugin._login_sites == [2]
+    assert plugin.get_config()["sign_sites"] == [2]
+    plugin.stop_service()
+
+
+def test_form_site_options_follow_priority_order(monkeypatch):
+    from app.db.site_oper import SiteOper
+    from app.plugins.autosigninnew import AutoSignInNew
+
+    # list_order_by_pri 已按优先级排序，选项保持该顺序
+    rows = [SimpleNamespace(id=3, name="c"), SimpleNamespace(id=1, name="a"), SimpleNamespace(id=2, name="b")]
+    monkeypatch.setattr(SiteOper, "rows", rows)
+    form = AutoSignInNew().get_form()[0]
+
+    def find_items(node):
+        if isinstance(node, dict):
+            if node.get("props", {}).get("model") == "sign_sites":
+                return node["props"]["items"]
+            node = node.get("content") or []
+        for child in node if isinstance(node, list) else []:
+            items = find_items(child)
+            if items is not None:
+                return items
+        return None
+
+    assert [item["value"] for item in find_items(form)] == [3, 1, 2]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+from conftest import PLUGINS_DIR, requires_moviepilot
+
+
+def test_fixtures_single_copy():
+    assert (PLUGINS_DIR / "autosigninnew" / "fixtures.py").exists()
+    assert not (PLUGINS_DIR / "siteopencheck" / "fixtures.py").exists()
+
+
+@requires_moviepilot
+def test_session_request_restored_after_use(tmp_path):
+    import requests
+    from app.plugins.autosigninnew.fixtures import HttpFixture
+
+    original = requests.Session.request
+    outer = HttpFixture(tmp_path, "replay")
+    with outer.use("a"):
+        assert requests.Session.request is not original
+        with outer.use("b"):
+            pass
+        # 嵌套的录制|回放结束后，外层仍在拦截
+        assert requests.Session.request is not original
+    assert requests.Session.request is original
+
+
+def _round_trip(fixture_cls, root, name, standin, run):
+    """录制一次后回放：回放结果与录制时相同，且不访问站点"""
+    with fixture_cls(root, "record").use(name):
+        recorded = run()
+    assert (root / f"{name}.json.gz").exists()
+    hits = dict(standin.hits)
+    with fixture_cls(root, "replay").use(name) as session:
+        replayed = run()
+    assert replayed == recorded
+    assert standin.hits == hits
+    assert session.exchanges
+    return recorded
+
+
+@requires_moviepilot
+def test_signin_handler_replay(routed, tmp_path):
+    from app.plugins.autosigninnew.fixtures import HttpFixture
+
+    handler = importlib.import_module("app.plugins.autosigninnew.sites.52pt").Pt52()
+    site_info = {"name": "52pt", "url": "https://52pt.site/", "cookie": "c=1", "ua": "test", "timeout": 5}
+    state, message = _round_trip(HttpFixture, tmp_path, "52pt.site", routed, lambda: handler.signin(site_info))
+    assert state, message
+
+
+@requires_moviepilot
+def test_open_check_handler_replay(routed, tmp_path):
+    from app.plugins.siteopencheck import HttpFixture
+    from app.plugins.siteopencheck.sites import SessionPool
+    from app.plugins.siteopencheck.sites.base import DefaultOpenCheckHandler
+
+    site_info = {"name": "example", "url": "https://pt.example.org/"}
+
+    def check():
+        handler = DefaultOpenCheckHandler()
+        handler.sessions = SessionPool(handler._ua)
+        try:
+            return handler.check(site_info)
+        finally:
+            handler.sessions.close()
+
+    status, _ = _round_trip(HttpFixture, tmp_path, "pt.example.org", routed, check)
+    assert status in ("open", "closed")
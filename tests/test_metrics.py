@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import PLUGINS_DIR, requires_moviepilot
+
+PLUGINS = ("autosigninnew", "siteopencheck", "tangpinghelper")
+
+
+def _shared_part(plugin: str) -> str:
+    """metrics.py 中各插件共用的部分，即指标声明之前的内容"""
+    text = (PLUGINS_DIR / plugin / "metrics.py").read_text(encoding="utf-8")
+    return text.split(f'\nmetrics = Metrics("{plugin}")')[0]
+
+
+@pytest.mark.parametrize("plugin", PLUGINS[1:])
+def test_metrics_copies_identical(plugin):
+    assert _shared_part(plugin) == _shared_part(PLUGINS[0])
+
+
+@requires_moviepilot
+@pytest.mark.parametrize("module, cls", [("autosigninnew", "AutoSignInNew"),
+                                         ("siteopencheck", "SiteOpenCheck"),
+                                         ("tangpinghelper", "TangPingHelper")])
+def test_metrics_api_requires_apikey(module, cls):
+    import importlib
+    from app.core.config import settings
+
+    plugin = getattr(importlib.import_module(f"app.plugins.{module}"), cls)
+    route = next(api for api in plugin().get_api() if api["path"] == "/metrics")
+    assert route["auth"] == "apikey"
+    assert plugin.metrics_api().status_code == 401
+    assert plugin.metrics_api(apikey="wrong").status_code == 401
+    res = plugin.metrics_api(apikey=settings.API_TOKEN)
+    assert res.status_code == 200
+    assert f"# TYPE {module}_" in res.body.decode("utf-8")
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+插件版本与插件市场清单一致性检查，不需要 MoviePilot 运行环境
+"""
+import ast
+import json
+
+import pytest
+
+from conftest import PLUGINS_DIR, REPO_ROOT
+
+PACKAGE_FILES = ("package.json", "package.v2.json")
+
+
+def _plugin_versions() -> dict:
+    """从各插件 __init__.py 读取 {插件类名: plugin_version}"""
+    versions = {}
+    for init_file in sorted(PLUGINS_DIR.glob("*/__init__.py")):
+        tree = ast.parse(init_file.read_text(encoding="utf-8"))
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            for stmt in node.body:
+                if isinstance(stmt, ast.Assign) and any(getattr(t, "id", None) == "plugin_version"
+                                                        for t in stmt.targets):
+                    versions[node.name] = ast.literal_eval(stmt.value)
+    return versions
+
+
+PLUGIN_VERSIONS = _plugin_versions()
+
+
+def test_all_plugins_found():
+    assert {p.name for p in PLUGINS_DIR.iterdir() if (p / "__init__.py").exists()} \
+           == {name.lower() for name in PLUGIN_VERSIONS}
+
+
+@pytest.mark.parametrize("package_file", PACKAGE_FILES)
+@pytest.mark.parametrize("plugin", sorted(PLUGIN_VERSIONS))
+def test_plugin_version_matches_package(package_file, plugin):
+    package = json.loads((REPO_ROOT / package_file).read_text(encoding="utf-8"))
+    entry = package[plugin]
+    assert entry["version"] == PLUGIN_VERSIONS[plugin]
+    # 最新的更新记录对应当前版本
+    assert next(iter(entry["history"])) == f"v{PLUGIN_VERSIONS[plugin]}"
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+import pytest
+
+from conftest import PLUGINS_DIR, requires_moviepilot
+
+
+def _shared_part(plugin: str) -> str:
+    """sitecache.py 中各插件共用的部分：SiteSnapshot 与 SiteCache"""
+    text = (PLUGINS_DIR / plugin / "sitecache.py").read_text(encoding="utf-8")
+    start = text.index("\nclass SiteSnapshot")
+    return text[start:text.index("\n\n\n", text.index("def invalidate", start))]
+
+
+def test_sitecache_copies_identical():
+    assert _shared_part("autosigninnew") == _shared_part("siteopencheck")
+
+
+@requires_moviepilot
+@pytest.mark.parametrize("module, cls", [("autosigninnew", "AutoSignInNew"), ("siteopencheck", "SiteOpenCheck")])
+@pytest.mark.parametrize("handler", ["site_updated", "site_deleted"])
+def test_site_events_invalidate_cache(module, cls, handler, monkeypatch):
+    from app.core.event import Event
+    from app.helper.sites import SitesHelper
+
+    site = {"id": 1, "name": "old", "url": "https://old.example.org/", "public": False}
+    monkeypatch.setattr(SitesHelper, "indexers", [site])
+    monkeypatch.setattr(SitesHelper, "indexsites", {"old.example.org": site})
+    site_cache = importlib.import_module(f"app.plugins.{module}.sitecache").site_cache
+    plugin = getattr(importlib.import_module(f"app.plugins.{module}"), cls)()
+
+    before = site_cache.snapshot(refresh=True)
+    assert site_cache.snapshot() is before
+
+    renamed = dict(site, name="new")
+    monkeypatch.setattr(SitesHelper, "indexers", [renamed])
+    monkeypatch.setattr(SitesHelper, "indexsites", {"old.example.org": renamed})
+    # 事件之前沿用快照，事件之后重新加载
+    assert site_cache.snapshot().sites[0]["name"] == "old"
+    getattr(plugin, handler)(Event(event_data={"site_id": 1, "domain": "old.example.org"}))
+    after = site_cache.snapshot()
+    assert after.version == before.version + 1
+    assert after.sites[0]["name"] == "new"
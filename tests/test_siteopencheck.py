@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import requires_moviepilot
+
+pytestmark = requires_moviepilot
+
+
+@pytest.fixture
+def plugin():
+    from app.plugins.siteopencheck import SiteOpenCheck
+
+    plugin = SiteOpenCheck()
+    plugin.del_data('check_events')
+    yield plugin
+    plugin.del_data('check_events')
+
+
+def _append(plugin, count: int):
+    plugin._SiteOpenCheck__append_events([{"domain": f"site{i}.example", "from": "closed", "to": "open"}
+                                          for i in range(count)])
+
+
+def test_changes_follow_cursor(plugin):
+    _append(plugin, 3)
+    first = plugin.get_changes(cursor=0, limit=2)
+    assert [e["seq"] for e in first["data"]] == [1, 2]
+    assert first["cursor"] == 2 and not first["truncated"]
+    rest = plugin.get_changes(cursor=first["cursor"])
+    assert [e["seq"] for e in rest["data"]] == [3]
+    assert not rest["truncated"]
+
+
+def test_changes_truncated_when_cursor_behind_retained_events(plugin):
+    _append(plugin, plugin.MAX_EVENTS + 20)
+    result = plugin.get_changes(cursor=5)
+    assert result["truncated"]
+    assert result["data"][0]["seq"] == 21
+    # 游标刚好在最早保留的记录之前时没有丢失
+    assert not plugin.get_changes(cursor=20)["truncated"]
+
+
+def test_changes_truncated_when_log_reset(plugin):
+    _append(plugin, 2)
+    result = plugin.get_changes(cursor=10)
+    assert result["truncated"]
+    assert result["cursor"] == 2
+
+
+def _sites(count: int, status: str = "open"):
+    return [{"domain": f"site{i:03d}.example", "name": f"站点{i:03d}", "status": status, "message": "ok"}
+            for i in range(count)]
+
+
+def _find(components, name):
+    """深度遍历页面组件，返回指定组件"""
+    for component in components:
+        if component.get('component') == name:
+            yield component
+        yield from _find(component.get('content') or [], name)
+
+
+def test_page_keeps_no_view_state_on_server():
+    from app.plugins.siteopencheck.ui_components import SiteOpenCheckUIComponents as UI
+
+    model = UI.build_page_model(_sites(30) + _sites(5, status="closed"))
+    rows = UI.create_site_list(model)
+    # 视图状态只有组件初始值，没有调用服务端接口的事件
+    assert not [c for c in _find(rows, 'VBtn') if 'events' in c]
+    panels = next(_find(rows, 'VExpansionPanels'))
+    assert panels['props']['model-value'] == ['open']
+    # 开注站点 30 个分 3 页，关闭注册的 5 个只有 1 页
+    windows = list(_find(rows, 'VWindow'))
+    assert len(windows) == 1 and len(windows[0]['content']) == 3
+    assert len(list(_find(windows[0]['content'][:1], 'VCard'))) == UI.PAGE_SIZE
+    assert UI.create_site_list(model) == rows
+
+
+def test_page_renders_search_box():
+    from app.plugins.siteopencheck.ui_components import SiteOpenCheckUIComponents as UI
+
+    model = UI.build_page_model(_sites(3) + _sites(2, status="closed"))
+    search = next(_find(UI.create_site_list(model), 'VAutocomplete'))
+    assert len(search['props']['items']) == 5
+    assert {item['title'].split(' · ')[1] for item in search['props']['items']} == {"开注站点", "关闭注册"}
+
+
+def test_card_cache_reused_across_page_models(monkeypatch):
+    from app.plugins.siteopencheck.ui_components import SiteOpenCheckUIComponents as UI
+
+    monkeypatch.setattr(UI, '_card_cache', type(UI._card_cache)())
+    monkeypatch.setattr(UI, 'CARD_CACHE_SIZE', 10)
+    UI.create_site_list(UI.build_page_model(_sites(40)))
+    assert len(UI._card_cache) == 10
+
+    sites = _sites(3)
+    first = UI.create_site_list(UI.build_page_model(sites))
+    card = next(_find(first, 'VCol'))
+    # 新一轮检查后数据未变化的卡片直接复用，变化的卡片按指纹重新生成
+    second = UI.create_site_list(UI.build_page_model(sites))
+    assert next(_find(second, 'VCol')) is card
+    sites[0]["message"] = "changed"
+    third = UI.create_site_list(UI.build_page_model(sites))
+    assert next(_find(third, 'VCol')) is not card
+
+
+def test_session_pools_are_per_sweep():
+    from app.plugins.siteopencheck.sites import SessionPool
+    from app.plugins.siteopencheck.sites.base import DefaultOpenCheckHandler
+
+    first, second = SessionPool("ua"), SessionPool("ua")
+    handler_a, handler_b = DefaultOpenCheckHandler(), DefaultOpenCheckHandler()
+    handler_a.sessions, handler_b.sessions = first, second
+    session = handler_a.get_session("https://a.example/signup.php")
+    handler_a.get_session_state("https://a.example/")["csrf_token"] = "token"
+    assert handler_a.get_session("https://a.example/index.php") is session
+    assert handler_b.get_session("https://a.example/signup.php") is not session
+
+    # 另一轮检查结束不影响本轮的会话
+    second.close()
+    assert handler_a.get_session("https://a.example/") is session
+    assert handler_a.get_session_state("https://a.example/")["csrf_token"] == "token"
+    first.close()
+    assert handler_a.get_session_state("https://a.example/") == {}
+
+
+def test_browser_tier_uses_playwright_helper_with_proxy(monkeypatch):
+    from app.core.config import settings
+    from app.helper.browser import PlaywrightHelper
+    from app.plugins.siteopencheck.browser import BrowserPool
+    from app.plugins.siteopencheck.sites.base import DefaultOpenCheckHandler
+
+    # 未安装 playwright 时改用 PlaywrightHelper
+    monkeypatch.setattr(BrowserPool, "available", staticmethod(lambda: False))
+    url = "https://proxied.example/signup.php"
+    monkeypatch.setattr(settings, "PROXY_SERVER", {"server": "http://127.0.0.1:7890"})
+    calls = []
+
+    def get_page_source(self, url, ua=None, proxies=None, timeout=20, **kwargs):
+        calls.append({"url": url, "proxies": proxies, "timeout": timeout})
+        return "<html>注册</html>"
+
+    monkeypatch.setattr(PlaywrightHelper, "get_page_source", get_page_source)
+    handler = DefaultOpenCheckHandler()
+    handler.tier = "browser"
+    handler.proxy = True
+    assert handler.get_page_source(url) == ("<html>注册</html>", url)
+    assert calls == [{"url": url, "proxies": settings.PROXY_SERVER, "timeout": 30}]
+
+    handler.proxy = False
+    handler.get_page_source(url)
+    assert calls[-1]["proxies"] is None
+
+
+def test_zhuque_csrf_token_outlives_sweep(monkeypatch):
+    import json
+    import requests
+    from app.plugins.siteopencheck.sites import SessionPool, zhuque
+    from app.plugins.siteopencheck.sites.zhuque import ZhuqueOpenCheckHandler
+
+    calls, reject, issued = [], [], []
+
+    def request(session, method, url, *args, **kwargs):
+        calls.append(url.rsplit("/", 1)[-1])
+        res = requests.Response()
+        res.url, res.encoding = url, "utf-8"
+        if url.endswith("/entry/regist"):
+            issued.append(f"token{len(issued) + 1}")
+            res.status_code = 200
+            res._content = f'<meta name="x-csrf-token" content="{issued[-1]}">'.encode()
+            res.headers["Set-Cookie"] = "sid=1"
+        else:
+            ok = kwargs["headers"]["x-csrf-token"] not in reject
+            res.status_code = 200 if ok else 419
+            res._content = json.dumps({"data": {"registOpen": False}}).encode()
+        return res
+
+    monkeypatch.setattr(requests.Session, "request", request)
+    monkeypatch.setattr(zhuque, "_csrf_cache", {})
+    site_info = {"url": "https://zhuque.in/"}
+
+    def sweep():
+        handler = ZhuqueOpenCheckHandler()
+        handler.sessions = SessionPool("ua")
+        try:
+            return handler.check(site_info)[0]
+        finally:
+            handler.sessions.close()
+
+    # 第二轮检查复用上一轮获取的 token
+    assert sweep() == "closed" and sweep() == "closed"
+    assert calls == ["regist", "registStatus", "registStatus"]
+    # 服务端拒绝时刷新
+    calls.clear()
+    reject.append("token1")
+    assert sweep() == "closed"
+    assert calls == ["registStatus", "regist", "registStatus"]
+    # 过期后刷新
+    calls.clear()
+    token, cookies, _ = zhuque._csrf_cache["zhuque.in"]
+    zhuque._csrf_cache["zhuque.in"] = (token, cookies, 0)
+    assert sweep() == "closed"
+    assert calls == ["regist", "registStatus"]
+
+
+class _FakePlaywright:
+    """记录调用线程与次数的 playwright 替身"""
+
+    def __init__(self):
+        self.threads, self.launches, self.contexts, self.closed = set(), 0, [], []
+
+    def sync_playwright(self):
+        fake = self
+
+        class Page:
+            def __init__(self, context):
+                self.context, self.url = context, None
+
+            def goto(self, url, **kwargs):
+                fake.threads.add(threading.get_ident())
+                self.url = url
+
+            def content(self):
+                return f"<html>注册 {self.context.proxy}</html>"
+
+            def wait_for_timeout(self, ms):
+                pass
+
+            def close(self):
+                pass
+
+        class Context:
+            def __init__(self, proxy):
+                self.proxy = (proxy or {}).get("server")
+                fake.contexts.append(self)
+
+            def new_page(self):
+                return Page(self)
+
+            def close(self):
+                fake.closed.append(self)
+
+        class Browser:
+            def new_context(self, user_agent=None, proxy=None):
+                return Context(proxy)
+
+            def close(self):
+                fake.closed.append(self)
+
+        class Playwright:
+            class chromium:
+                @staticmethod
+                def launch(**kwargs):
+                    fake.launches += 1
+                    return Browser()
+
+            def stop(self):
+                pass
+
+        return SimpleNamespace(start=lambda: Playwright())
+
+
+def test_browser_pool_is_warm_and_bounded(monkeypatch):
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+    from app.plugins.siteopencheck.browser import BrowserPool
+    from app.plugins.siteopencheck.sites import SessionPool
+    from app.plugins.siteopencheck.sites.base import DefaultOpenCheckHandler
+
+    fake = _FakePlaywright()
+    monkeypatch.setitem(sys.modules, "playwright", SimpleNamespace())
+    monkeypatch.setitem(sys.modules, "playwright.sync_api", SimpleNamespace(sync_playwright=fake.sync_playwright))
+    monkeypatch.setattr(BrowserPool, "available", staticmethod(lambda: True))
+
+    sessions = SessionPool("ua")
+
+    def fetch(idx):
+        handler = DefaultOpenCheckHandler()
+        handler.sessions, handler.tier = sessions, "browser"
+        return handler.get_page_source(f"https://site{idx % 3}.example/signup.php")
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(fetch, range(9)))
+    assert all("注册" in source for source, _ in results)
+    # 一轮检查只启动一次浏览器，所有浏览器操作都在同一个线程中
+    assert fake.launches == 1
+    assert len(fake.threads) == 1
+    # 上下文数量不超过上限
+    assert len(fake.contexts) - len([c for c in fake.closed if c in fake.contexts]) <= SessionPool.BROWSER_CONTEXTS
+    sessions.close()
+    assert len(fake.closed) == len(fake.contexts) + 1
+
+
+def test_stop_service_closes_running_sweep_pools(monkeypatch):
+    from app.plugins.siteopencheck import SiteOpenCheck
+    from app.plugins.siteopencheck.sites import SessionPool
+
+    closed = []
+    pool = SessionPool("ua")
+    monkeypatch.setattr(pool, "close", lambda: closed.append(pool))
+    plugin = SiteOpenCheck()
+    monkeypatch.setattr(SiteOpenCheck, "_active_pools", {pool})
+    plugin.stop_service()
+    assert closed == [pool]
+    assert not SiteOpenCheck._active_pools
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+import json
+import re
+import threading
+
+import pytest
+
+from conftest import FIXTURES_DIR, requires_moviepilot
+
+pytestmark = requires_moviepilot
+
+
+@pytest.fixture
+def tangping():
+    from app.plugins.tangpinghelper import TangPingHelper
+
+    plugin = TangPingHelper()
+    plugin.init_plugin({"enabled": False, "notify": False})
+    plugin.REDPACKET_RATE = 1000.0
+    plugin.REDPACKET_BURST = 1000
+    plugin.LOTTERY_DELAY = 0
+    plugin.LOTTERY_MIN_DELAY = 0
+
+    def clear():
+        for prefix in plugin.DAILY_DATA_PREFIXES:
+            plugin.del_data(plugin._today_key(prefix))
+
+    clear()
+    yield plugin
+    clear()
+    plugin.stop_service()
+
+
+def _site(standin) -> dict:
+    return {"name": "躺平PT", "url": f"{standin.base_url}/", "cookie": "c_secure_uid=1", "ua": "pytest"}
+
+
+def test_concurrent_redpacket_runs_keep_daily_total(tangping, standin):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(tangping._run_redpacket(_site(standin))))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    saved = tangping.get_data(tangping._today_key("redpacket_stats"))
+    assert sum(r.get("run_claimed", 0) for r in results) == standin.config.redpackets
+    assert saved["claimed_count"] == standin.config.redpackets
+
+
+def test_watcher_ignores_non_json_response(tangping, monkeypatch):
+    class _Response:
+        status_code = 200
+        headers = {"ETag": "abc"}
+
+        @staticmethod
+        def json():
+            raise ValueError("Expecting value")
+
+    stop = threading.Event()
+    calls = []
+
+    def get_request(site_info, path, headers=None):
+        calls.append(headers)
+        if len(calls) >= 2:
+            stop.set()
+        return _Response()
+
+    monkeypatch.setattr(tangping, "_get_site_info", lambda: {"url": "https://tangpt.example/"})
+    monkeypatch.setattr(tangping, "_make_get_request", get_request)
+    monkeypatch.setattr(tangping, "_run_redpacket", lambda site_info: pytest.fail("不应领取"))
+    monkeypatch.setattr(tangping, "REDPACKET_WATCH_MIN_INTERVAL", 0)
+    tangping._watch_redpacket(stop)
+    # 非JSON响应不记录条件请求标识
+    assert calls == [{}, {}]
+
+
+def test_watcher_claims_fetched_list_with_current_site(tangping, monkeypatch):
+    class _Response:
+        status_code = 200
+        headers = {}
+
+        def __init__(self, payload):
+            self._payload = payload
+
+        def json(self):
+            return self._payload
+
+    stop = threading.Event()
+    sites = [{"name": "躺平PT", "cookie": "old"}, {"name": "躺平PT", "cookie": "new"}]
+    payloads = [{"ok": True, "items": []}, {"ok": True, "items": [{"id": 7}]}, {"ok": False}]
+    fetched, claimed = [], []
+
+    def get_request(site_info, path, headers=None):
+        fetched.append(site_info["cookie"])
+        if len(fetched) == len(payloads):
+            stop.set()
+        return _Response(payloads[len(fetched) - 1])
+
+    def claim(site_info, packet):
+        claimed.append((site_info["cookie"], packet["id"]))
+        return "ok", "", 1, None
+
+    # 第二次读取站点缓存时 Cookie 已更新
+    monkeypatch.setattr(tangping, "_get_site_info", lambda: sites.pop(0) if len(sites) > 1 else sites[0])
+    monkeypatch.setattr(tangping, "_make_get_request", get_request)
+    monkeypatch.setattr(tangping, "_claim_redpacket", claim)
+    monkeypatch.setattr(tangping, "REDPACKET_WATCH_MIN_INTERVAL", 0)
+    tangping._watch_redpacket(stop)
+
+    # 监听获取的列表直接用于领取，之后只为下一轮查询一次
+    assert fetched == ["old", "new", "new"]
+    assert claimed == [("new", 7)]
+
+
+def test_lottery_resume_refetches_remaining(tangping, standin):
+    site_info = _site(standin)
+    # 检查点之后又完成了若干次抽奖，检查点中的剩余次数已过期
+    tangping.LOTTERY_CHECKPOINT_EVERY = 1
+    standin.config.lottery_draws = 30
+    standin.reset()
+    ledger_key = tangping._today_key("lottery_ledger")
+    tangping._lottery_checkpoint(tangping._today_key("lottery_stats"), ledger_key,
+                                 {"request_count": 1, "total_draws": 20, "total_cost": 2000,
+                                  "total_compensated": 0, "total_awarded": 1500, "first_bonus_after": 1,
+                                  "last_bonus_after": 2, "summary": {}, "net_change": -500,
+                                  "start_time": "", "stop_reason": ""},
+                                 {"labels": [], "units": [], "rows": [[0, 20, 2000, 1500, 0, 2]]},
+                                 remaining=50, in_progress=True)
+
+    stats = tangping._run_lottery(site_info)
+
+    # 按服务端剩余的 30 次抽完，而不是按检查点的 50 次请求后被拒绝
+    assert stats["stop_reason"] == "今日次数已用完"
+    assert not stats["stopped_early"]
+    assert stats["total_draws"] == 20 + 30
+    assert standin.hits.get("/omnibot_lottery.php") == 1
+    saved = tangping.get_data(tangping._today_key("lottery_stats"))
+    assert saved["remaining"] == 0 and not saved["in_progress"]
+    assert len(tangping.get_data(ledger_key)["rows"]) == 3
+
+
+def test_lottery_resume_with_no_draws_left_clears_checkpoint(tangping, standin):
+    site_info = _site(standin)
+    standin.config.lottery_draws = 0
+    standin.reset()
+    date_key = tangping._today_key("lottery_stats")
+    tangping._lottery_checkpoint(date_key, tangping._today_key("lottery_ledger"),
+                                 {"request_count": 1, "total_draws": 20, "total_cost": 2000,
+                                  "total_compensated": 0, "total_awarded": 1500, "first_bonus_after": 1,
+                                  "last_bonus_after": 2, "summary": {}, "net_change": -500,
+                                  "start_time": "", "stop_reason": ""},
+                                 {"labels": [], "units": [], "rows": [[0, 20, 2000, 1500, 0, 2]]},
+                                 remaining=50, in_progress=True)
+
+    stats = tangping._run_lottery(site_info)
+
+    assert stats["stop_reason"] == "今日次数已用完"
+    assert not standin.hits.get("/web/omnibot/lottery/draw")
+    saved = tangping.get_data(date_key)
+    # 运行中标记已清除，累计保持检查点中的值
+    assert not saved["in_progress"] and saved["remaining"] == 0
+    assert saved["total_draws"] == 20
+
+
+_LEGACY_TASK_RE = re.compile(
+    r'<td class="nowrap"><strong>([^<]+)</strong></td>'
+    r'.*?'
+    r'<input type="button" class="([^"]*)" data-id="(\d+)" value="([^"]*)"'
+    r'(\s+disabled)?\s*>',
+    re.DOTALL
+)
+
+
+def _legacy_parse_tasks(html: str) -> list:
+    """改用 lxml 之前的正则解析，作为对照"""
+    tasks = []
+    for m in _LEGACY_TASK_RE.finditer(html):
+        claimed = "已经认领" in m.group(4).strip()
+        tasks.append({
+            "name": m.group(1).strip(),
+            "exam_id": int(m.group(3)),
+            "claimable": m.group(2).strip() == "claim" and not claimed and not m.group(5),
+            "claimed": claimed,
+        })
+    return tasks
+
+
+@pytest.mark.parametrize("page", sorted(p.name for p in (FIXTURES_DIR / "tangpinghelper").glob("task_*.html")))
+def test_parse_tasks_matches_legacy_parser(tangping, page):
+    html = (FIXTURES_DIR / "tangpinghelper" / page).read_text(encoding="utf-8")
+    tasks = tangping._parse_tasks(html)
+    assert tasks
+    assert tasks == _legacy_parse_tasks(html)
+
+
+def test_parse_tasks_states(tangping):
+    html = (FIXTURES_DIR / "tangpinghelper" / "task_normal.html").read_text(encoding="utf-8")
+    assert [(t["name"], t["exam_id"], t["claimable"], t["claimed"]) for t in tangping._parse_tasks(html)] == [
+        ("苍蝇腿", 101, True, False), ("VIP", 102, False, False), ("BUG", 103, False, False)]
+
+
+def test_task_window_defaults_off_for_existing_configs(tangping):
+    tangping.init_plugin({"enabled": True, "enabled_task": True, "cron_task": "0 */6 * * *"})
+    assert tangping._task_window is False
+    assert tangping._task_scheduler is None
+    assert [s["id"] for s in tangping.get_service()] == ["TangPingHelper.Task"]
+
+
+def test_day_boundaries_follow_configured_timezone(tangping, monkeypatch):
+    from datetime import datetime
+
+    import pytz
+    from app.core.config import settings
+
+    # 与容器时区相差最大的时区，日期通常与本地日期不同
+    monkeypatch.setattr(settings, "TZ", "Pacific/Kiritimati")
+    today = datetime.now(tz=pytz.timezone("Pacific/Kiritimati")).strftime("%Y-%m-%d")
+    assert tangping._today_key("task_stats") == f"task_stats_{today}"
+    run_at, _ = tangping._next_task_window()
+    assert run_at.tzinfo is not None
+    assert run_at.strftime("%Y-%m-%d") >= today
+
+
+def test_parse_tasks_full_page(tangping):
+    """完整页面：导航、用户信息栏与认领记录表中的 nowrap 单元格不影响任务表解析"""
+    html = (FIXTURES_DIR / "tangpinghelper" / "task_full.html").read_text(encoding="utf-8")
+    assert [(t["exam_id"], t["claimable"], t["claimed"]) for t in tangping._parse_tasks(html)] == [
+        (101, True, False), (104, False, True), (105, True, False), (106, True, False),
+        (107, False, True), (102, False, False), (103, False, False), (108, False, False)]
+
+
+def _legacy_parse_summary_lines(lines) -> dict:
+    """预编译解析之前的逐行解析，作为对照"""
+    if isinstance(lines, str):
+        lines = lines.split("\n")
+    parsed = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        m = re.match(r'^(.+?)[：:]\s*([\d.]+)\s*(\S+?)(?:\s*[（(]([^)]*)[)）])?\s*$', line)
+        if m:
+            parsed.setdefault(m.group(1).strip(), {"value": 0, "unit": m.group(3)})["value"] += float(m.group(2))
+            continue
+        issued_m = re.match(r'已发放\s*([\d.]+)\s*个', line)
+        if issued_m:
+            parsed.setdefault("邀请已发放", {"value": 0, "unit": "个"})["value"] += float(issued_m.group(1))
+    return parsed
+
+
+def _lottery_payloads() -> list:
+    return json.loads((FIXTURES_DIR / "tangpinghelper" / "lottery_draw.json").read_text(encoding="utf-8"))
+
+
+def test_parse_summary_lines_matches_legacy_parser(tangping):
+    payloads = [p for p in _lottery_payloads() if p.get("ok")]
+    assert payloads
+    for payload in payloads:
+        lines = payload.get("summary_lines") or payload.get("summary_text")
+        # 第二次解析命中按行缓存
+        for _ in range(2):
+            assert tangping._parse_summary_lines(lines) == _legacy_parse_summary_lines(lines)
+
+
+def test_ledger_totals_from_recorded_draws(tangping):
+    ledger = {"labels": [], "units": [], "rows": []}
+    stats = {"total_draws": 0, "total_cost": 0, "total_awarded": 0, "total_compensated": 0, "net_change": 0,
+             "first_bonus_after": None, "last_bonus_after": None, "summary": {}}
+    payloads = [p for p in _lottery_payloads() if p.get("ok")]
+    expected = {}
+    for payload in payloads:
+        tangping._ledger_apply(stats, ledger, tangping._ledger_append(ledger, payload))
+        for label, item in _legacy_parse_summary_lines(payload.get("summary_lines")
+                                                       or payload.get("summary_text")).items():
+            expected.setdefault(label, {"value": 0, "unit": item["unit"]})["value"] += item["value"]
+
+    assert stats["total_draws"] == sum(p["draw_count"] for p in payloads)
+    assert stats["net_change"] == sum(p["total_awarded_bonus"] - p["total_cost"] for p in payloads)
+    assert stats["first_bonus_after"] == payloads[0]["user_bonus_after"]
+    assert stats["last_bonus_after"] == payloads[-1]["user_bonus_after"]
+    assert stats["summary"] == expected